@@ -0,0 +1,116 @@
+"""
+Google_images_download_async adaptive concurrency module.
+"""
+
+# Builtin imports:
+import asyncio
+import time
+from collections import deque
+
+
+class AdaptiveLimiter():
+    """
+    In-flight request limit of a single host adjusted with additive increase,
+    multiplicative decrease (AIMD).
+
+    While the p95 latency of the recent window stays within
+    latency_tolerance times the baseline p95 and the error rate stays under
+    max_error_rate, the limit grows by roughly one per limit successes. The
+    baseline follows a lower p95 at once and moves baseline_rise of the way
+    toward a higher one per request, so a host that got slower for good is
+    not held to its best latency forever.
+    Overload errors or a p95 above the tolerance halve the limit, at most once
+    per latency period so a burst of failures only cuts it once. When
+    min_limit equals max_limit the limit is fixed.
+    """
+    def __init__(self, initial_limit: int, min_limit: int = 1, max_limit: int = 64, window: int = 50,
+                 latency_tolerance: float = 2.0, max_error_rate: float = 0.1, baseline_rise: float = 0.01):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = float(min(self.max_limit, max(self.min_limit, int(initial_limit))))
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.baseline_rise = baseline_rise
+        self.latencies = deque(maxlen=window)
+        self.failures = deque(maxlen=window)
+        self.baseline_latency = None
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.condition = None
+
+    @property
+    def current_limit(self) -> int:
+        """
+        """
+        return int(self.limit)
+
+    async def acquire(self) -> None:
+        """
+        Waits until the host has a free slot and takes it.
+        """
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+
+    async def release(self, latency: float, overloaded: bool = False) -> None:
+        """
+        Frees a slot and adjusts the limit from the outcome of the request,
+        latency is None for requests that did not complete.
+        """
+        async with self.condition:
+            self.in_flight -= 1
+
+            if latency is not None and not overloaded:
+                self.latencies.append(latency)
+            if latency is not None or overloaded:
+                self.failures.append(overloaded)
+
+            p95_latency = self.get_p95_latency()
+
+            if overloaded or (p95_latency is not None and self.baseline_latency is not None and
+                              p95_latency > self.baseline_latency * self.latency_tolerance):
+                self.decrease(p95_latency)
+            elif latency is not None and self.get_error_rate() <= self.max_error_rate:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            if p95_latency is not None:
+                if self.baseline_latency is None or p95_latency < self.baseline_latency:
+                    self.baseline_latency = p95_latency
+                else:
+                    self.baseline_latency += (p95_latency - self.baseline_latency) * self.baseline_rise
+
+            self.condition.notify_all()
+
+    def decrease(self, p95_latency: float) -> None:
+        """
+        Halves the limit unless it was already cut during the last latency period.
+        """
+        now = time.monotonic()
+
+        if now - self.last_decrease < (p95_latency or 1.0):
+            return
+
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.last_decrease = now
+
+    def get_p95_latency(self) -> float:
+        """
+        Returns the p95 latency of the window, None until it holds ten samples.
+        """
+        if len(self.latencies) < 10:
+            return None
+
+        latencies = sorted(self.latencies)
+
+        return latencies[int(len(latencies) * 0.95) - 1]
+
+    def get_error_rate(self) -> float:
+        """
+        """
+        if not self.failures:
+            return 0.0
+
+        return sum(self.failures) / len(self.failures)
@@ -0,0 +1,210 @@
+"""
+End to end download benchmark against a local fake Google Images server.
+
+Each scenario starts a FakeGoogleServer, then runs main() in a fresh
+process with a config file whose record points at the fake result page.
+Images/sec, MB/s, peak RSS and parse time are taken from that process and
+its run report, the best of --repeat runs is kept and compared with the
+stored baselines. Results that are worse than a baseline by more than
+--tolerance are reported as regressions and the exit status is 1.
+
+Usage: python benchmarks/bench_download.py [--scenario name ...] [--save_baseline]
+"""
+
+# Builtin imports:
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+#Local imports:
+BENCHMARK_DIRECTORY = Path(__file__).resolve().parent
+REPOSITORY_DIRECTORY = BENCHMARK_DIRECTORY.parent
+sys.path.insert(0, str(REPOSITORY_DIRECTORY))
+sys.path.insert(0, str(BENCHMARK_DIRECTORY))
+from fake_google_server import FakeGoogleServer
+
+BASELINE_FILE = BENCHMARK_DIRECTORY.joinpath('baselines.json')
+
+SCENARIOS = {'fast': {'number_of_images': 100, 'image_size': 65536},
+             'latency': {'number_of_images': 100, 'image_size': 65536, 'latency': 0.05},
+             'faulty': {'number_of_images': 100, 'image_size': 65536, 'error_rate': 0.05,
+                        'throttle_rate': 0.05},
+             'large_page': {'number_of_images': 100, 'image_size': 4096, 'page_padding': 32768}}
+
+HIGHER_IS_BETTER = ('images_per_second', 'mb_per_second')
+LOWER_IS_BETTER = ('peak_rss_mb', 'parse_ms')
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process in MB.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def run_download(config_path: str) -> None:
+    """
+    Runs main() on config_path and prints its wall time and peak RSS as JSON.
+    Used as the benchmarked child process.
+    """
+    import google_images_download_async
+
+    sys.argv = ['google_images_download_async.py', '-cf', config_path]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        asyncio.run(google_images_download_async.main())
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({'elapsed': elapsed, 'peak_rss_mb': get_peak_rss_mb()}))
+
+
+async def run_scenario(name: str) -> dict:
+    """
+    Runs one scenario once and returns its results.
+    """
+    scenario = SCENARIOS[name]
+    server = FakeGoogleServer(**scenario)
+    await server.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as output_directory:
+            config_path = Path(output_directory).joinpath('config.json')
+            config = {'Settings': {'output_directory': output_directory},
+                      'Records': [{'url': server.search_url,
+                                   'limit': scenario['number_of_images'],
+                                   'output_directory': output_directory,
+                                   'repeat_failure': 3,
+                                   'silent_mode': True}]}
+
+            with open(config_path, 'w') as config_file:
+                json.dump(config, config_file)
+
+            process = await asyncio.create_subprocess_exec(sys.executable, __file__, '--child', str(config_path),
+                                                           stdout=asyncio.subprocess.PIPE)
+            stdout, _ = await process.communicate()
+
+            if process.returncode != 0:
+                raise RuntimeError(f'Scenario {name} exited with status {process.returncode}')
+
+            child = json.loads(stdout.decode('utf-8').strip().splitlines()[-1])
+
+            with open(Path(output_directory).joinpath('run_report.json')) as report_file:
+                report = json.load(report_file)
+
+            # the manifest holds one row per image the record ended up with, written, linked or resumed
+            manifest_path = Path(output_directory).joinpath('manifest.sqlite3')
+            with contextlib.closing(sqlite3.connect(str(manifest_path))) as manifest:
+                images = manifest.execute("SELECT COUNT(*) FROM images WHERE status = 'done'").fetchone()[0]
+    finally:
+        await server.stop()
+
+    write = report['phases'].get('write', {}).get('total', {'bytes': 0})
+    parse = report['phases'].get('parse', {}).get('total', {'seconds': 0})
+    request = report['phases'].get('request', {}).get('total', {'errors': 0})
+
+    return {'images': images,
+            'request_errors': request['errors'],
+            'elapsed': round(child['elapsed'], 3),
+            'images_per_second': round(images / child['elapsed'], 2),
+            'mb_per_second': round(write['bytes'] / (1024 * 1024) / child['elapsed'], 2),
+            'peak_rss_mb': round(child['peak_rss_mb'], 1),
+            'parse_ms': round(parse['seconds'] * 1000, 2)}
+
+
+def keep_best(results: list) -> dict:
+    """
+    Returns the best value of each measure over repeated runs.
+    """
+    best = dict(results[0])
+
+    for result in results[1:]:
+        for measure in HIGHER_IS_BETTER:
+            best[measure] = max(best[measure], result[measure])
+        for measure in LOWER_IS_BETTER:
+            best[measure] = min(best[measure], result[measure])
+
+    return best
+
+
+def find_regressions(name: str, result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a message for each measure worse than its baseline by more than tolerance.
+    """
+    regressions = []
+
+    for measure in HIGHER_IS_BETTER:
+        if measure in baseline and result[measure] < baseline[measure] * (1 - tolerance):
+            regressions.append(f'{name}: {measure} {result[measure]} is below the baseline {baseline[measure]}')
+
+    for measure in LOWER_IS_BETTER:
+        if measure in baseline and result[measure] > baseline[measure] * (1 + tolerance):
+            regressions.append(f'{name}: {measure} {result[measure]} is above the baseline {baseline[measure]}')
+
+    return regressions
+
+
+async def main(arguments: argparse.Namespace) -> int:
+    """
+    Runs the scenarios, prints a table of results and compares them with the baselines.
+    """
+    try:
+        with open(arguments.baseline_file) as baseline_file:
+            baselines = json.load(baseline_file)
+    except FileNotFoundError:
+        baselines = {}
+
+    results = {}
+    regressions = []
+
+    print(f'{"scenario":>10} {"images":>7} {"images/s":>9} {"MB/s":>8} {"peak RSS MB":>12} {"parse ms":>9}')
+
+    for name in arguments.scenario or SCENARIOS:
+        result = keep_best([await run_scenario(name) for _ in range(arguments.repeat)])
+        results[name] = result
+
+        print(f'{name:>10} {result["images"]:>7} {result["images_per_second"]:>9.2f}',
+              f'{result["mb_per_second"]:>8.2f} {result["peak_rss_mb"]:>12.1f} {result["parse_ms"]:>9.2f}')
+
+        if name in baselines:
+            regressions += find_regressions(name, result, baselines[name], arguments.tolerance)
+
+    if arguments.save_baseline:
+        baselines.update(results)
+        with open(arguments.baseline_file, 'w') as baseline_file:
+            json.dump(baselines, baseline_file, indent=4, sort_keys=True)
+        print(f'Saved baselines to {arguments.baseline_file}')
+        return 0
+
+    for regression in regressions:
+        print(f'Regression: {regression}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Benchmarks downloads against a local fake Google Images server.')
+    PARSER.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    PARSER.add_argument('--repeat', default=3, type=int)
+    PARSER.add_argument('--tolerance', default=0.25, type=float,
+                        help='Fraction a measure may be worse than its baseline before it is a regression')
+    PARSER.add_argument('--baseline_file', default=str(BASELINE_FILE))
+    PARSER.add_argument('--save_baseline', action='store_true')
+    PARSER.add_argument('--child', help=argparse.SUPPRESS)
+    ARGUMENTS = PARSER.parse_args()
+
+    if ARGUMENTS.child:
+        run_download(ARGUMENTS.child)
+    else:
+        sys.exit(asyncio.run(main(ARGUMENTS)))
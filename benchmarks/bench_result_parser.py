@@ -0,0 +1,79 @@
+"""
+Micro-benchmark of result_parser.iter_image_meta_data.
+
+Parses synthetic pages of growing size and prints the parse time per MB,
+which should stay flat as the page grows. The slicing parser it replaced
+is timed alongside for comparison.
+
+Usage: python benchmarks/bench_result_parser.py
+"""
+
+# Builtin imports:
+import json
+import os
+import sys
+import time
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from result_parser import iter_image_meta_data
+from synthetic_pages import build_result_page
+
+PAGE_SIZES_MB = (0.5, 1, 2, 4)
+ITEM_SIZE = 1400
+
+
+def slicing_parser(page: str) -> list:
+    """
+    The parser previously used by generate_image_download_tasks, which
+    re-slices the remaining page after every item.
+    """
+    items = []
+
+    while True:
+        start_line = page.find('rg_meta notranslate')
+        if start_line == -1:
+            return items
+
+        start_line = page.find('class="rg_meta notranslate">')
+        start_content = page.find('{', start_line + 1)
+        end_content = page.find('</div>', start_content + 1)
+        content_decode = bytes(page[start_content:end_content], "utf-8").decode("unicode_escape")
+        items.append(json.loads(content_decode))
+        page = page[end_content:]
+
+
+def time_parser(parser, page: str) -> float:
+    """
+    Returns the best of three parse times in seconds.
+    """
+    timings = []
+
+    for _ in range(3):
+        start = time.perf_counter()
+        list(parser(page))
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main() -> None:
+    """
+    Prints a table of parse time per MB for each page size.
+    """
+    print(f'{"page MB":>8} {"items":>7} {"single pass ms/MB":>18} {"slicing ms/MB":>14}')
+
+    for page_size_mb in PAGE_SIZES_MB:
+        page = build_result_page(int(page_size_mb * 1024 * 1024 / ITEM_SIZE))
+        size_mb = len(page) / (1024 * 1024)
+        number_of_items = len(list(iter_image_meta_data(page)))
+
+        single_pass = time_parser(iter_image_meta_data, page) / size_mb * 1000
+        slicing = time_parser(slicing_parser, page) / size_mb * 1000
+
+        print(f'{size_mb:>8.2f} {number_of_items:>7} {single_pass:>18.2f} {slicing:>14.2f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Startup benchmark of the command line tool.
+
+Imports google_images_download_async in a fresh interpreter with
+python -X importtime and runs the tool with --help, the cost paid by every
+short job before its first request. Import and startup times are the best
+of --repeat runs and are compared with the stored baseline and with
+--budget_ms, 150 ms of import time unless another budget is given.
+Importing a module that only some features need, such as selenium for
+scrolled searches or aiohttp before the first request, is always reported
+as a regression.
+
+Usage: python benchmarks/bench_startup.py [--budget_ms 150] [--save_baseline]
+"""
+
+# Builtin imports:
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCHMARK_DIRECTORY = Path(__file__).resolve().parent
+REPOSITORY_DIRECTORY = BENCHMARK_DIRECTORY.parent
+BASELINE_FILE = BENCHMARK_DIRECTORY.joinpath('baselines.json')
+
+MODULE = 'google_images_download_async'
+
+# imported on first use by the feature that needs them, never at startup
+DEFERRED_MODULES = ('selenium', 'aiohttp', 'aiofiles', 'tarfile', 'multiprocessing', 'concurrent.futures.process')
+
+LOWER_IS_BETTER = ('import_ms', 'startup_ms', 'interpreter_ms')
+
+
+def read_import_times(stderr: str) -> dict:
+    """
+    Returns the self and cumulative microseconds of every module in -X importtime output.
+    """
+    import_times = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = (int(self_time), int(cumulative_time))
+
+    return import_times
+
+
+def time_command(command: list) -> float:
+    """
+    Returns the wall time of command in milliseconds.
+    """
+    start = time.perf_counter()
+    subprocess.run(command, cwd=REPOSITORY_DIRECTORY, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+
+    return (time.perf_counter() - start) * 1000
+
+
+def run_startup() -> tuple:
+    """
+    Measures startup once, returns its results and the import times of every module.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {MODULE}'],
+                             cwd=REPOSITORY_DIRECTORY, stderr=subprocess.PIPE, check=True)
+    import_times = read_import_times(process.stderr.decode('utf-8'))
+
+    return ({'import_ms': round(import_times[MODULE][1] / 1000, 2),
+             'startup_ms': round(time_command([sys.executable, f'{MODULE}.py', '--help']), 2),
+             'interpreter_ms': round(time_command([sys.executable, '-c', 'pass']), 2)},
+            import_times)
+
+
+def keep_best(results: list) -> dict:
+    """
+    Returns the lowest value of each measure over repeated runs.
+    """
+    return {measure: min(result[measure] for result in results) for measure in LOWER_IS_BETTER}
+
+
+def find_regressions(result: dict, baseline: dict, tolerance: float, budget_ms: float,
+                     import_times: dict) -> list:
+    """
+    Returns a message for each measure worse than its baseline by more than
+    tolerance or over budget and for each deferred module imported at startup.
+    """
+    regressions = []
+
+    for measure in LOWER_IS_BETTER:
+        if measure in baseline and result[measure] > baseline[measure] * (1 + tolerance):
+            regressions.append(f'{measure} {result[measure]} is above the baseline {baseline[measure]}')
+
+    if budget_ms and result['import_ms'] > budget_ms:
+        regressions.append(f'import_ms {result["import_ms"]} is above the budget {budget_ms}')
+
+    for module in DEFERRED_MODULES:
+        if module in import_times:
+            regressions.append(f'{module} is imported at startup, '
+                               f'{import_times[module][1] / 1000:.1f} ms')
+
+    return regressions
+
+
+def main(arguments: argparse.Namespace) -> int:
+    """
+    Measures startup, prints the results and the slowest imports and compares them with the baseline.
+    """
+    try:
+        with open(arguments.baseline_file) as baseline_file:
+            baselines = json.load(baseline_file)
+    except FileNotFoundError:
+        baselines = {}
+
+    runs = [run_startup() for _ in range(arguments.repeat)]
+    result = keep_best([run[0] for run in runs])
+    import_times = runs[-1][1]
+
+    print(f'{"import ms":>10} {"--help ms":>10} {"python ms":>10}')
+    print(f'{result["import_ms"]:>10.2f} {result["startup_ms"]:>10.2f} {result["interpreter_ms"]:>10.2f}')
+    print('Slowest imports, self ms:')
+
+    for name, (self_time, _) in sorted(import_times.items(), key=lambda item: -item[1][0])[:arguments.top]:
+        print(f'{self_time / 1000:>10.2f} {name}')
+
+    if arguments.save_baseline:
+        baselines['startup'] = result
+        with open(arguments.baseline_file, 'w') as baseline_file:
+            json.dump(baselines, baseline_file, indent=4, sort_keys=True)
+        print(f'Saved baseline to {arguments.baseline_file}')
+        return 0
+
+    regressions = find_regressions(result, baselines.get('startup', {}), arguments.tolerance,
+                                   arguments.budget_ms, import_times)
+
+    for regression in regressions:
+        print(f'Regression: {regression}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Benchmarks the startup time of the command line tool.')
+    PARSER.add_argument('--repeat', default=5, type=int)
+    PARSER.add_argument('--top', default=10, type=int, help='Number of slowest imports listed')
+    PARSER.add_argument('--budget_ms', default=150, type=float,
+                        help='Import time above which startup is a regression, 0 for no budget')
+    PARSER.add_argument('--tolerance', default=0.25, type=float,
+                        help='Fraction a measure may be worse than its baseline before it is a regression')
+    PARSER.add_argument('--baseline_file', default=str(BASELINE_FILE))
+    PARSER.add_argument('--save_baseline', action='store_true')
+
+    sys.exit(main(PARSER.parse_args()))
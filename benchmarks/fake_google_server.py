@@ -0,0 +1,172 @@
+"""
+Google_images_download_async fake search and image server module.
+
+A local aiohttp stand-in for Google Images and the image CDNs it links to,
+so downloads can be benchmarked and tested without network access.
+
+Usage: python benchmarks/fake_google_server.py [--port 8080] [--images 100]
+"""
+
+# Builtin imports:
+import argparse
+import asyncio
+import random
+
+# Third party imports:
+from aiohttp import web
+
+#Local imports:
+from synthetic_pages import build_result_page
+
+
+class FakeGoogleServer():
+    """
+    Serves a synthetic rg_meta result page at /search and its images at
+    /images/<name> and /thumbnails/<name>.
+
+    Every image response is delayed by latency seconds. The first request of
+    a given image fails with a 503 with probability error_rate, is
+    throttled with a 429 and Retry-After with probability throttle_rate or
+    breaks off half way through its body with probability truncate_rate,
+    retries of it succeed. Which images fail is fixed by seed so runs are
+    comparable. Pages and images are served with an ETag and answer a
+    matching If-None-Match with 304, images honour Range requests unless
+    refuse_ranges is set, then every Range request is answered with a 416.
+    """
+    def __init__(self, number_of_images: int = 100, image_size: int = 65536, latency: float = 0,
+                 error_rate: float = 0, throttle_rate: float = 0, page_padding: int = 1024,
+                 retry_after: float = 0.05, seed: int = 0, truncate_rate: float = 0, refuse_ranges: bool = False):
+        self.number_of_images = number_of_images
+        self.image_size = image_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.page_padding = page_padding
+        self.retry_after = retry_after
+        self.seed = seed
+        self.truncate_rate = truncate_rate
+        self.refuse_ranges = refuse_ranges
+        self.requests = {}
+        self.image_bytes_sent = 0
+        self.page = ''
+        self.runner = None
+        self.host = ''
+
+    @property
+    def search_url(self) -> str:
+        """
+        """
+        return f'{self.host}/search?q=benchmark&tbm=isch'
+
+    async def start(self, port: int = 0) -> None:
+        """
+        Starts serving on 127.0.0.1, on a free port when port is 0.
+        """
+        app = web.Application()
+        app.router.add_get('/search', self.handle_search)
+        app.router.add_get('/images/{name}', self.handle_image)
+        app.router.add_get('/thumbnails/{name}', self.handle_image)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', port)
+        await site.start()
+
+        self.host = 'http://{}:{}'.format(*self.runner.addresses[0][:2])
+        self.page = build_result_page(self.number_of_images, self.host, self.page_padding)
+
+    async def stop(self) -> None:
+        """
+        """
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        """
+        """
+        etag = f'"{self.seed}-{self.number_of_images}"'
+
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+
+        return web.Response(text=self.page, content_type='text/html', headers={'ETag': etag})
+
+    async def handle_image(self, request: web.Request) -> web.Response:
+        """
+        """
+        name = request.match_info['name']
+        attempt = self.requests.get(request.path, 0)
+        self.requests[request.path] = attempt + 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        outcome = random.Random(f'{self.seed} {request.path}').random()
+
+        if attempt == 0:
+            if outcome < self.error_rate:
+                return web.Response(status=503)
+            if outcome < self.error_rate + self.throttle_rate:
+                return web.Response(status=429, headers={'Retry-After': str(self.retry_after)})
+
+        header = f'{name}\n'.encode('utf-8')
+        body = header + b'\0' * max(0, self.image_size - len(header))
+        headers = {'Accept-Ranges': 'bytes', 'ETag': f'"{self.seed}-{name}"', 'Content-Type': 'image/jpeg'}
+
+        if request.headers.get('If-None-Match') == headers['ETag']:
+            return web.Response(status=304, headers={'ETag': headers['ETag']})
+
+        if attempt == 0 and outcome < self.error_rate + self.throttle_rate + self.truncate_rate:
+            response = web.StreamResponse(headers=headers)
+            response.content_length = len(body)
+            await response.prepare(request)
+            await response.write(body[:len(body) // 2])
+            self.image_bytes_sent += len(body) // 2
+            # let the client read the first half before the connection drops
+            await asyncio.sleep(0.05)
+            request.transport.close()
+            return response
+
+        start = request.http_range.start if 'Range' in request.headers else None
+        if start is not None and request.headers.get('If-Range', headers['ETag']) == headers['ETag']:
+            if start >= len(body) or self.refuse_ranges:
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{len(body)}'})
+
+            headers['Content-Range'] = f'bytes {start}-{len(body) - 1}/{len(body)}'
+            self.image_bytes_sent += len(body) - start
+            return web.Response(status=206, body=body[start:], headers=headers)
+
+        self.image_bytes_sent += len(body)
+
+        return web.Response(body=body, headers=headers)
+
+
+async def serve(arguments: argparse.Namespace) -> None:
+    """
+    """
+    server = FakeGoogleServer(arguments.images, arguments.image_size, arguments.latency,
+                              arguments.error_rate, arguments.throttle_rate, truncate_rate=arguments.truncate_rate)
+    await server.start(arguments.port)
+    print(f'Serving {server.search_url}')
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Serves fake Google Images result pages and images.')
+    PARSER.add_argument('--port', default=8080, type=int)
+    PARSER.add_argument('--images', default=100, type=int)
+    PARSER.add_argument('--image_size', default=65536, type=int)
+    PARSER.add_argument('--latency', default=0, type=float)
+    PARSER.add_argument('--error_rate', default=0, type=float)
+    PARSER.add_argument('--throttle_rate', default=0, type=float)
+    PARSER.add_argument('--truncate_rate', default=0, type=float)
+
+    try:
+        asyncio.run(serve(PARSER.parse_args()))
+    except KeyboardInterrupt:
+        pass
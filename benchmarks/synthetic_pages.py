@@ -0,0 +1,39 @@
+"""
+Google_images_download_async synthetic result page module.
+
+Builds pages in the rg_meta layout parsed by result_parser so benchmarks
+can run without network access.
+"""
+
+# Builtin imports:
+import json
+
+
+def build_image_meta_data(number: int, image_host: str = 'http://127.0.0.1:8080') -> dict:
+    """
+    Returns the rg_meta object of one synthetic search result.
+    """
+    return {'ity': 'jpg',
+            'oh': 480,
+            'ow': 640,
+            'ou': f'{image_host}/images/image_{number}.jpg',
+            'pt': f'Synthetic image {number}',
+            'rh': 'example.com',
+            'ru': f'https://example.com/page_{number}.html',
+            'tu': f'{image_host}/thumbnails/image_{number}.jpg'}
+
+
+def build_result_page(number_of_images: int, image_host: str = 'http://127.0.0.1:8080',
+                      padding: int = 1024) -> str:
+    """
+    Returns a result page with number_of_images rg_meta divs, each followed
+    by padding characters of unrelated markup as found on real pages.
+    """
+    filler = '<span class="filler">' + 'x' * max(0, padding - 28) + '</span>'
+    items = []
+
+    for number in range(number_of_images):
+        meta_data = json.dumps(build_image_meta_data(number, image_host)).replace('=', '\\u003d')
+        items.append(f'<div class="rg_meta notranslate">{meta_data}</div>{filler}')
+
+    return f'<html><body>{"".join(items)}</body></html>'
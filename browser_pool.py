@@ -0,0 +1,176 @@
+"""
+Google_images_download_async headless browser pool module.
+"""
+
+# Builtin imports:
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# selenium is imported by the methods that drive a browser, so runs that
+# never scroll a page neither pay for nor require it
+
+
+class BrowserError(Exception):
+    """
+    Raised when a browser cannot be started or a scroll job fails.
+    """
+
+
+class BrowserPool():
+    """
+    Runs blocking selenium scroll jobs on a dedicated thread pool, one
+    thread per browser, so the event loop keeps serving downloads.
+    Browsers are launched on first use and reused by later jobs, selenium
+    is only imported when the first one is launched.
+
+    A job stops scrolling job_timeout seconds after it was queued and
+    returns what it loaded, it is only abandoned when its browser is still
+    busy grace_period seconds later.
+    """
+    def __init__(self, size: int = 1, chromedriver: str = '', job_timeout: float = 120,
+                 max_queued_jobs: int = 8, grace_period: float = 10):
+        self.size = max(1, int(size))
+        self.chromedriver = chromedriver
+        self.job_timeout = float(job_timeout)
+        self.grace_period = float(grace_period)
+        self.max_queued_jobs = max(0, int(max_queued_jobs))
+        self.executor = None
+        self.job_slots = None
+        self.idle_browsers = queue.Queue()
+        self.browsers = []
+
+    async def start(self) -> None:
+        """
+        Creates the executor, called lazily by scroll().
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='browser')
+            self.job_slots = asyncio.Semaphore(self.size + self.max_queued_jobs)
+
+    async def scroll(self, google_url: str, number_of_pages: int) -> str:
+        """
+        Loads google_url, scrolls through number_of_pages result pages and
+        returns the page source. Waits while the job queue is full and raises
+        asyncio.TimeoutError when the job overruns job_timeout by more than
+        grace_period.
+        """
+        await self.start()
+
+        async with self.job_slots:
+            deadline = time.monotonic() + self.job_timeout
+            job = asyncio.get_event_loop().run_in_executor(self.executor, self.run_job,
+                                                            google_url, number_of_pages, deadline)
+
+            return await asyncio.wait_for(job, self.job_timeout + self.grace_period)
+
+    def run_job(self, google_url: str, number_of_pages: int, deadline: float) -> str:
+        """
+        Runs a scroll job on an idle browser, executed on a pool thread.
+        """
+        try:
+            browser = self.idle_browsers.get_nowait()
+        except queue.Empty:
+            browser = self.launch_browser()
+
+        try:
+            page_source = self.scroll_page(browser, google_url, number_of_pages, deadline)
+        except Exception:
+            # a browser in an unknown state is not handed to the next job
+            self.quit_browser(browser)
+            raise
+
+        self.idle_browsers.put(browser)
+
+        return page_source
+
+    def launch_browser(self):
+        """
+        Starts a new headless chrome.
+        """
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+        except ImportError as error:
+            raise BrowserError(f'selenium is needed to scroll result pages: {error}') from error
+
+        options = webdriver.ChromeOptions()
+        options.add_argument('--no-sandbox')
+        options.add_argument('--headless')
+
+        # without a chromedriver path selenium manager finds or fetches one
+        try:
+            browser = webdriver.Chrome(service=Service(executable_path=self.chromedriver or None), options=options)
+        except Exception as error:
+            raise BrowserError(f'Unable to launch chrome: {error}') from error
+
+        self.browsers.append(browser)
+
+        return browser
+
+    def quit_browser(self, browser) -> None:
+        """
+        Quits a browser and forgets it.
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            browser.quit()
+        except WebDriverException:
+            pass
+
+        if browser in self.browsers:
+            self.browsers.remove(browser)
+
+    @staticmethod
+    def scroll_page(browser, google_url: str, number_of_pages: int, deadline: float) -> str:
+        """
+        Scrolls to the end of the results number_of_pages times, stopping early at the deadline.
+        """
+        from selenium.common.exceptions import (WebDriverException, ElementNotInteractableException,
+                                                NoSuchElementException, StaleElementReferenceException)
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.common.by import By
+
+        try:
+            browser.get(google_url)
+            html_body_element = browser.find_element(By.TAG_NAME, "body")
+
+            for _ in range(number_of_pages):
+                if time.monotonic() >= deadline:
+                    break
+
+                try:
+                    html_body_element.send_keys(Keys.END)
+                except StaleElementReferenceException:
+                    html_body_element = browser.find_element(By.TAG_NAME, "body")
+                    html_body_element.send_keys(Keys.END)
+
+                try:
+                    html_body_element.find_element(By.XPATH, "//input[@id='smb']").click()
+                except (ElementNotInteractableException, NoSuchElementException):
+                    pass
+
+                time.sleep(0.5)
+
+            return browser.page_source
+        except WebDriverException as error:
+            raise BrowserError(error) from error
+
+    async def close(self) -> None:
+        """
+        Quits every browser and stops the executor.
+        """
+        if self.executor is None:
+            return
+
+        executor = self.executor
+        self.executor = None
+
+        def shutdown():
+            executor.shutdown()
+            for browser in list(self.browsers):
+                self.quit_browser(browser)
+
+        await asyncio.get_event_loop().run_in_executor(None, shutdown)
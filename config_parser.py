@@ -5,16 +5,17 @@ Google_images_download_async config parsing module.
 
 # Builtin imports:
 import argparse
+import asyncio
 import json
-import os
+import sys
+from functools import lru_cache
 from pathlib import Path
 
 
-async def parse_config():
+def build_parser() -> argparse.ArgumentParser:
     """
-    Reads user defined json config files or parses user provided arguments.
-
-    Return: list of dicts that contain the search criteria
+    Returns the parser of the command line options, which also define the
+    keys and defaults of a record.
     """
     parser = argparse.ArgumentParser(prog='google_async_image_downloader.py',
                                      description='Downloads images from google images.')
@@ -25,6 +26,11 @@ async def parse_config():
                             download according to config instead provided arguments''',
                         metavar='<path>')
 
+    parser.add_argument('-jf', '--jobs_file',
+                        help='''JSON lines file with one record per line, read and downloaded
+                            as it streams in, use - to read records from stdin''',
+                        metavar='<path>')
+
     parser.add_argument('-k', '--keywords',
                         default='',
                         help='delimited list input')
@@ -61,10 +67,18 @@ async def parse_config():
     parser.add_argument('-n', '--no_directory',
                         help='download images in the main directory but no sub-directory',
                         action="store_true")
-    # parser.add_argument('-d', '--delay',
-    #                     type=int,
-    #                     help='delay in seconds to wait between downloading two images',
-    #                     metavar='<n>')
+    parser.add_argument('-d', '--delay',
+                        default=0,
+                        type=float,
+                        help='''delay in seconds to wait between downloading two images
+                            from the same host, 0 for no limit''',
+                        metavar='<n>')
+    parser.add_argument('-sd', '--search_delay',
+                        default=0.1,
+                        type=float,
+                        help='''delay in seconds to wait between two requests to the
+                            google search endpoint, 0 for no limit''',
+                        metavar='<n>')
     parser.add_argument('-co', '--color',
                         choices=['red', 'orange', 'yellow', 'green', 'teal', 'blue',
                                  'purple', 'pink', 'white', 'gray', 'black', 'brown'],
@@ -200,9 +214,283 @@ async def parse_config():
                         metavar='<path>')
     parser.add_argument('-rf', '--repeat_failure',
                         default=0,
+                        type=int,
                         help='''The number of times a failed download should be retried''',
                         metavar='<n>')
+    parser.add_argument('-rbd', '--retry_base_delay',
+                        default=0.5,
+                        type=float,
+                        help='''Seconds of backoff before the first retry, doubled for each
+                            further retry and randomised with jitter''',
+                        metavar='<n>')
+    parser.add_argument('-rmd', '--retry_max_delay',
+                        default=30,
+                        type=float,
+                        help='''Longest backoff in seconds, requests asked to Retry-After
+                            longer than this are not retried''',
+                        metavar='<n>')
+    parser.add_argument('-bt', '--breaker_threshold',
+                        default=5,
+                        type=int,
+                        help='''Consecutive connection, timeout, 429 or 5xx failures after which
+                            a host is skipped, 0 to never skip a host''',
+                        metavar='<n>')
+    parser.add_argument('-bc', '--breaker_cooldown',
+                        default=60,
+                        type=float,
+                        help="Seconds a failing host is skipped before it is tried again",
+                        metavar='<n>')
+    parser.add_argument('-mr', '--metrics_report',
+                        default='run_report.json',
+                        help='''JSON run report with per phase and per host timings, written to
+                            the output directory, empty to not write one''',
+                        metavar='<path>')
+    parser.add_argument('-pf', '--prometheus_file',
+                        default='',
+                        help="Prometheus text file the run metrics are also written to",
+                        metavar='<path>')
+    parser.add_argument('-wk', '--workers',
+                        default=1,
+                        type=int,
+                        help='''Number of processes the expanded records are sharded across,
+                            each with its own event loop and connection pool''',
+                        metavar='<n>')
+    parser.add_argument('-mar', '--max_active_records',
+                        default=32,
+                        type=int,
+                        help='''Number of expanded records searched and downloaded at the same time,
+                            further records are read and expanded as these finish''',
+                        metavar='<n>')
+    parser.add_argument('-sv', '--serve',
+                        default='',
+                        help='''Runs as a service accepting download jobs over HTTP on host:port
+                            or on a unix socket given as unix:<path>''',
+                        metavar='<address>')
+    parser.add_argument('-maj', '--max_active_jobs',
+                        default=4,
+                        type=int,
+                        help="Number of service jobs run at the same time",
+                        metavar='<n>')
+    parser.add_argument('-ofm', '--output_format',
+                        default='files',
+                        choices=['files', 'tar'],
+                        help='''Writes each image to its own file, or appends images and their
+                            metadata to size capped tar shards with an index''')
+    parser.add_argument('-msb', '--max_shard_bytes',
+                        default=1073741824,
+                        type=int,
+                        help="Size at which a new tar shard is started",
+                        metavar='<n>')
+    parser.add_argument('-mix', '--metadata_index',
+                        default='metadata.sqlite3',
+                        help='''SQLite index of the metadata of every search result and the outcome
+                            of every download, kept in the output directory, empty to not keep one''',
+                        metavar='<path>')
+    parser.add_argument('-lf', '--log_format',
+                        default='text',
+                        choices=['text', 'json'],
+                        help='''Writes the error log and save_source records as time stamped text
+                            lines or as JSON lines''')
+    parser.add_argument('-lfi', '--log_flush_interval',
+                        default=1.0,
+                        type=float,
+                        help="Longest time in seconds a log record is buffered before it is written",
+                        metavar='<n>')
+    parser.add_argument('-cl', '--connection_limit',
+                        default=100,
+                        type=int,
+                        help='''Total number of simultaneous connections held by the
+                            shared connection pool, 0 for no limit''',
+                        metavar='<n>')
+    parser.add_argument('-clh', '--connection_limit_per_host',
+                        default=10,
+                        type=int,
+                        help='''Number of simultaneous connections to a single host,
+                            0 for no limit''',
+                        metavar='<n>')
+    parser.add_argument('-dct', '--dns_cache_ttl',
+                        default=300,
+                        type=int,
+                        help="Seconds resolved host names are cached by the connection pool",
+                        metavar='<n>')
+    parser.add_argument('-kat', '--keepalive_timeout',
+                        default=15,
+                        type=float,
+                        help="Seconds an idle keep-alive connection is held open for reuse",
+                        metavar='<n>')
+    parser.add_argument('-mif', '--max_in_flight',
+                        default=32,
+                        type=int,
+                        help="Maximum number of image downloads in flight across the whole run",
+                        metavar='<n>')
+    parser.add_argument('-mifh', '--max_in_flight_per_host',
+                        default=8,
+                        type=int,
+                        help="Maximum number of requests in flight to a single host, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-ac', '--adaptive_concurrency',
+                        action="store_true",
+                        help='''Tunes the requests in flight to each host from its latency and
+                            errors, starting from --max_in_flight_per_host''')
+    parser.add_argument('-amh', '--adaptive_max_per_host',
+                        default=64,
+                        type=int,
+                        help="Highest number of requests in flight to a single host with --adaptive_concurrency",
+                        metavar='<n>')
+    parser.add_argument('-pi', '--progress_interval',
+                        default=5,
+                        type=float,
+                        help="Seconds between progress reports",
+                        metavar='<n>')
+    parser.add_argument('-mib', '--max_image_bytes',
+                        default=52428800,
+                        type=int,
+                        help="Images larger than this many bytes are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mnw', '--min_width',
+                        default=0,
+                        type=int,
+                        help="Search results narrower than this many pixels are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mxw', '--max_width',
+                        default=0,
+                        type=int,
+                        help="Search results wider than this many pixels are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mnh', '--min_height',
+                        default=0,
+                        type=int,
+                        help="Search results shorter than this many pixels are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mxh', '--max_height',
+                        default=0,
+                        type=int,
+                        help="Search results taller than this many pixels are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mna', '--min_aspect',
+                        default=0,
+                        type=float,
+                        help="Search results with a lower width to height ratio are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-mxa', '--max_aspect',
+                        default=0,
+                        type=float,
+                        help="Search results with a higher width to height ratio are not downloaded, 0 for no limit",
+                        metavar='<n>')
+    parser.add_argument('-afm', '--allowed_formats',
+                        help='''Comma separated image formats to download, checked against the search
+                            result and the Content-Type of the response, defaults to --format''',
+                        metavar='<formats>')
+    parser.add_argument('-cs', '--chunk_size',
+                        default=65536,
+                        type=int,
+                        help="Number of bytes read from the network per write when saving an image",
+                        metavar='<n>')
+    parser.add_argument('-bps', '--browser_pool_size',
+                        default=1,
+                        type=int,
+                        help="Number of headless browsers kept open for searches with a limit over 100",
+                        metavar='<n>')
+    parser.add_argument('-bjt', '--browser_job_timeout',
+                        default=120,
+                        type=float,
+                        help="Seconds a browser may spend loading and scrolling one search",
+                        metavar='<n>')
+    parser.add_argument('-bqj', '--browser_max_queued_jobs',
+                        default=8,
+                        type=int,
+                        help="Number of searches that may wait for a free browser before new ones block",
+                        metavar='<n>')
+    parser.add_argument('-mf', '--manifest',
+                        default='manifest.sqlite3',
+                        help='''SQLite file in the output directory that records every search
+                            and download so an interrupted run can be resumed''',
+                        metavar='<path>')
+    parser.add_argument('-re', '--resume',
+                        action="store_true",
+                        help='''Skips searches and images the manifest shows were already
+                            downloaded and retries only failed or missing ones''')
+    parser.add_argument('-rs', '--refresh',
+                        action="store_true",
+                        help='''Revalidates the result pages and images the manifest recorded with
+                            conditional requests, unchanged ones are not downloaded or written again''')
+    parser.add_argument('-nde', '--no_dedup',
+                        action="store_true",
+                        help='''Downloads every copy of an image instead of hardlinking
+                            urls and contents already downloaded during the run''')
+    parser.add_argument('-cad', '--cache_dir',
+                        default='',
+                        help='''Directory where search result pages are cached and reused
+                            by later runs, caching is off when not given''',
+                        metavar='<path>')
+    parser.add_argument('-cat', '--cache_ttl',
+                        default=86400,
+                        type=float,
+                        help="Seconds a cached search result page stays valid",
+                        metavar='<n>')
+    parser.add_argument('-cam', '--cache_max_bytes',
+                        default=536870912,
+                        type=int,
+                        help="Size of the search cache, least recently used pages are evicted past it",
+                        metavar='<n>')
+
+    return parser
+
+
+def get_default_record() -> dict:
+    """
+    Returns a record holding the default of every option.
+    """
+    return vars(build_parser().parse_args([]))
+
+
+URL_PARAMETERS_FILE = Path(__file__).resolve().parent.joinpath('url_parms.json')
+
+# options that configure the shared session, scheduler, caches, logs and
+# service of a run, given on the command line or in Settings, not per record
+RUN_WIDE_OPTIONS = ('connection_limit', 'connection_limit_per_host', 'dns_cache_ttl', 'keepalive_timeout',
+                    'max_in_flight_per_host', 'delay', 'search_delay', 'adaptive_concurrency',
+                    'adaptive_max_per_host', 'browser_pool_size', 'browser_job_timeout',
+                    'browser_max_queued_jobs', 'manifest', 'resume', 'refresh', 'no_dedup', 'cache_dir',
+                    'cache_ttl', 'cache_max_bytes', 'retry_base_delay', 'retry_max_delay', 'breaker_threshold',
+                    'breaker_cooldown', 'progress_interval', 'metrics_report', 'prometheus_file', 'workers',
+                    'max_active_records', 'serve', 'max_active_jobs', 'metadata_index', 'log_format',
+                    'log_flush_interval')
+
+
+@lru_cache(maxsize=None)
+def load_url_parameters() -> dict:
+    """
+    Returns the url parameter table shipped next to this module, read once
+    per process whatever the working directory. The table is shared, it
+    must not be modified.
+    """
+    with open(URL_PARAMETERS_FILE) as file:
+        return json.load(file)
+
 
+def drop_run_wide_options(record: dict, reported: set) -> dict:
+    """
+    Returns record without the run wide options it sets, reporting each
+    such option the first time a record sets it.
+    """
+    for option in RUN_WIDE_OPTIONS:
+        if option in record and option not in reported:
+            reported.add(option)
+            print(f'{option} is a run wide setting, the value records give is ignored')
+
+    return {option: value for option, value in record.items() if option not in RUN_WIDE_OPTIONS}
+
+
+async def parse_config():
+    """
+    Reads user defined json config files or parses user provided arguments.
+
+    Return: url parameter table, list of dicts that contain the search criteria
+            (an async iterator of them when reading a jobs file) and a dict of
+            run wide settings shared by every record
+    """
+    parser = build_parser()
 
     args, unknown_args = parser.parse_known_args()
 
@@ -212,6 +500,7 @@ async def parse_config():
               'is/are not a recognised and have been bypassed.')
 
     records = []
+    settings = vars(args).copy()
 
     if args.config_file:
         default_args = ["keywords", "keywords_from_file", "prefix_keywords", "suffix_keywords",
@@ -222,23 +511,92 @@ async def parse_config():
                         "print_paths", "metadata", "extract_metadata", "socket_timeout",
                         "thumbnail", "thumbnail_only", "language", "prefix", "suffix", "chromedriver",
                         "related_images", "safe_search", "no_numbering", "offset", "no_download",
-                        "save_source", "silent_mode", "ignore_urls", "repeat_failure", "error_log"]
+                        "save_source", "silent_mode", "ignore_urls", "repeat_failure", "error_log",
+                        "connection_limit", "connection_limit_per_host", "dns_cache_ttl",
+                        "keepalive_timeout", "max_in_flight", "max_in_flight_per_host",
+                        "max_image_bytes", "min_width", "max_width", "min_height", "max_height",
+                        "min_aspect", "max_aspect", "allowed_formats", "chunk_size", "search_delay",
+                        "browser_pool_size", "browser_job_timeout", "browser_max_queued_jobs",
+                        "manifest", "resume", "refresh", "no_dedup", "cache_dir", "cache_ttl",
+                        "cache_max_bytes", "retry_base_delay", "retry_max_delay",
+                        "breaker_threshold", "breaker_cooldown", "adaptive_concurrency",
+                        "adaptive_max_per_host", "progress_interval", "metrics_report",
+                        "prometheus_file", "workers", "max_active_records", "serve",
+                        "max_active_jobs", "output_format", "max_shard_bytes", "metadata_index",
+                        "log_format", "log_flush_interval"]
 
         record_template = dict.fromkeys(default_args)
         record_template.update(vars(args))
 
         with open(Path(args.config_file)) as config_file:
             config_file = config_file.read()
-            records_json = json.loads(config_file.replace('\\', '/'))['Records']
+            config_json = json.loads(config_file.replace('\\', '/'))
+            records_json = config_json['Records']
+            settings.update(config_json.get('Settings', {}))
+
+            # records share the run wide settings, a record may lower max_in_flight for itself
+            record_template.update({option: settings[option] for option in ('max_in_flight', *RUN_WIDE_OPTIONS)})
+            reported = set()
 
             for record in records_json:
                 template = record_template.copy()
-                template.update(record)
+                template.update(drop_run_wide_options(record, reported))
                 records.append(template)
+    elif args.jobs_file:
+        records = read_job_records(args.jobs_file, vars(args).copy())
     else:
         records.append(vars(args))
 
-    with open(Path(os.getcwd()).joinpath('url_parms.json')) as file:
-        url_parm_json_file = json.load(file)
+    url_parm_json_file = load_url_parameters()
+
+    return url_parm_json_file, records, settings
+
+
+async def read_job_lines(jobs_file: str):
+    """
+    Yields the lines of jobs_file, or of stdin when jobs_file is -, as they are read.
+    """
+    if jobs_file == '-':
+        loop = asyncio.get_event_loop()
+
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                return
+            yield line
+    else:
+        import aiofiles
+
+        async with aiofiles.open(Path(jobs_file)) as file:
+            async for line in file:
+                yield line
+
+
+async def read_job_records(jobs_file: str, record_template: dict):
+    """
+    Yields a record for every JSON object line of a jobs file, filled in from
+    record_template. Blank lines are skipped and invalid lines reported.
+    """
+    line_number = 0
+    reported = set()
+
+    async for line in read_job_lines(jobs_file):
+        line_number += 1
+
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line.replace('\\', '/'))
+        except ValueError as error:
+            print(f'Skipped invalid record on line {line_number} of {jobs_file}: {error}')
+            continue
+
+        if not isinstance(record, dict):
+            print(f'Skipped invalid record on line {line_number} of {jobs_file}: not an object')
+            continue
+
+        template = record_template.copy()
+        template.update(drop_run_wide_options(record, reported))
 
-    return url_parm_json_file, records
+        yield template
@@ -0,0 +1,88 @@
+"""
+Google_images_download_async duplicate image index module.
+"""
+
+# Builtin imports:
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+
+class DedupIndex():
+    """
+    Tracks the image urls and image contents downloaded during a run, shared
+    by every GoogleImagesDownloader so each unique image is fetched and
+    stored once.
+    """
+    def __init__(self):
+        self.downloads = {}
+        self.contents = {}
+        self.duplicate_urls = 0
+        self.duplicate_contents = 0
+
+    def claim_url(self, url: str) -> asyncio.Future:
+        """
+        Returns None when the caller is the first to download url and must
+        call finish_url(), otherwise a future of the first download's
+        (file_path, file_size, content_hash) or None if it failed.
+        """
+        if url in self.downloads:
+            self.duplicate_urls += 1
+            return self.downloads[url]
+
+        self.downloads[url] = asyncio.get_event_loop().create_future()
+
+        return None
+
+    def finish_url(self, url: str, file_path: Path, downloaded: tuple) -> None:
+        """
+        Publishes the outcome of a claimed download, a failed url may be claimed again.
+        """
+        future = self.downloads[url]
+
+        if downloaded is None:
+            del self.downloads[url]
+            future.set_result(None)
+        else:
+            future.set_result((Path(file_path), *downloaded))
+
+    def register_content(self, content_hash: str, file_path: Path) -> Path:
+        """
+        Returns the path of an earlier file with the same content or None.
+        """
+        existing_file_path = self.contents.setdefault(content_hash, Path(file_path))
+
+        if existing_file_path != Path(file_path):
+            self.duplicate_contents += 1
+            return existing_file_path
+
+        return None
+
+
+def link_file(source: Path, destination: Path) -> bool:
+    """
+    Hardlinks destination to source, falling back to a copy where hardlinks
+    are not supported. Returns False if source is gone.
+    """
+    if Path(source) == Path(destination):
+        return os.path.exists(source)
+
+    part_destination = Path(f'{destination}.part')
+
+    try:
+        try:
+            os.link(source, part_destination)
+        except FileExistsError:
+            os.remove(part_destination)
+            os.link(source, part_destination)
+        except OSError:
+            if not os.path.exists(source):
+                return False
+            shutil.copyfile(source, part_destination)
+
+        os.replace(part_destination, destination)
+    except FileNotFoundError:
+        return False
+
+    return True
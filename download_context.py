@@ -0,0 +1,189 @@
+"""
+Google_images_download_async shared download context module.
+"""
+
+# Builtin imports:
+from pathlib import Path
+
+# Local imports:
+from browser_pool import BrowserPool
+from dedup_index import DedupIndex
+from download_manifest import DownloadManifest
+from download_scheduler import DownloadScheduler
+from log_sink import LogSink
+from metadata_index import MetadataIndex
+from rate_limiter import RateLimiter
+from retry_policy import RetryPolicy
+from run_metrics import RunMetrics
+from search_cache import SearchCache
+from single_flight import SingleFlight
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 ' +
+              '(KHTML, like Gecko) Chrome/41.0.2228.0 Safari/537.36')
+
+
+async def create_client_session(settings: dict = None) -> 'aiohttp.ClientSession':
+    """
+    Creates the keep-alive connection pool shared by every downloader in a
+    run, with the default limits when there are no settings. aiohttp is
+    only imported here, runs that never send a request do not load it.
+    """
+    import aiohttp
+
+    if settings is None:
+        return aiohttp.ClientSession(headers={'User-Agent': USER_AGENT})
+
+    connector = aiohttp.TCPConnector(limit=int(settings['connection_limit']),
+                                     limit_per_host=int(settings['connection_limit_per_host']),
+                                     ttl_dns_cache=int(settings['dns_cache_ttl']),
+                                     keepalive_timeout=float(settings['keepalive_timeout']))
+
+    return aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT})
+
+
+class DownloadContext():
+    """
+    Infrastructure shared by every GoogleImagesDownloader of a run.
+
+    main() builds one from the run settings with from_settings(), a
+    downloader used on its own gets a default context. The session and
+    browser pool are created on first use.
+    """
+    def __init__(self):
+        self.session = None
+        self.session_settings = None
+        self.scheduler = DownloadScheduler()
+        self.browser_pool = None
+        self.manifest = None
+        self.metadata_index = None
+        self.resume = False
+        self.refresh = False
+        self.dedup_index = DedupIndex()
+        self.single_flight = SingleFlight()
+        self.search_cache = None
+        self.retry_policy = RetryPolicy()
+        self.metrics = RunMetrics()
+        self.shard_writers = {}
+        self.log_sinks = {}
+        self.log_format = 'text'
+        self.log_flush_interval = 1.0
+
+    @classmethod
+    async def from_settings(cls, settings: dict):
+        """
+        Creates the context described by the settings returned by parse_config().
+        """
+        context = cls()
+        context.session_settings = settings
+        context.scheduler = DownloadScheduler(settings['max_in_flight'], settings['max_in_flight_per_host'],
+                                              RateLimiter(settings['search_delay'], settings['delay']),
+                                              settings['adaptive_concurrency'], settings['adaptive_max_per_host'])
+        context.browser_pool = BrowserPool(settings['browser_pool_size'], settings['chromedriver'],
+                                           settings['browser_job_timeout'], settings['browser_max_queued_jobs'])
+
+        main_directory = Path(settings['output_directory'] or "Downloads")
+
+        if settings['manifest']:
+            context.manifest = DownloadManifest(main_directory.joinpath(settings['manifest']))
+            await context.manifest.open()
+
+        if settings['metadata_index']:
+            context.metadata_index = MetadataIndex(main_directory.joinpath(settings['metadata_index']))
+            await context.metadata_index.open()
+
+        context.resume = bool(settings['resume'])
+        context.refresh = bool(settings['refresh'])
+        context.retry_policy = RetryPolicy(settings['retry_base_delay'], settings['retry_max_delay'],
+                                           settings['breaker_threshold'], settings['breaker_cooldown'])
+        context.dedup_index = None if settings['no_dedup'] else DedupIndex()
+        context.log_format = settings['log_format']
+        context.log_flush_interval = float(settings['log_flush_interval'])
+
+        if settings['cache_dir']:
+            context.search_cache = SearchCache(settings['cache_dir'], settings['cache_ttl'],
+                                               settings['cache_max_bytes'])
+
+        return context
+
+    async def get_session(self) -> 'aiohttp.ClientSession':
+        """
+        Returns the shared session, creating it from the run settings, or a
+        default one, on first use.
+        """
+        if self.session is None:
+            self.session = await create_client_session(self.session_settings)
+
+        return self.session
+
+    async def get_browser_pool(self, chromedriver: str = '') -> BrowserPool:
+        """
+        Returns the shared browser pool, creating a single browser pool if needed.
+        """
+        if self.browser_pool is None:
+            self.browser_pool = BrowserPool(chromedriver=chromedriver)
+
+        return self.browser_pool
+
+    async def get_shard_writer(self, directory: Path, max_shard_bytes: int):
+        """
+        Returns the shard writer of directory, shared by every record writing to it.
+        The shard writer module is only imported once shards are written.
+        """
+        directory = Path(directory).resolve()
+
+        if directory not in self.shard_writers:
+            from shard_writer import ShardWriter
+            self.shard_writers[directory] = ShardWriter(directory, max_shard_bytes)
+
+        return self.shard_writers[directory]
+
+    async def get_log_sink(self, log_path: Path) -> LogSink:
+        """
+        Returns the log sink of log_path, shared by every record writing to it.
+        """
+        log_path = Path(log_path).resolve()
+
+        if log_path not in self.log_sinks:
+            self.log_sinks[log_path] = LogSink(log_path, self.log_format, flush_interval=self.log_flush_interval)
+
+        return self.log_sinks[log_path]
+
+    async def finish_job(self) -> None:
+        """
+        Finishes the shards, flushes the metadata index and closes the logs
+        written so far, so the output of a job that ran on a context kept open
+        for later jobs is complete on disk.
+        """
+        for shard_writer in self.shard_writers.values():
+            await shard_writer.finish()
+
+        for log_sink in self.log_sinks.values():
+            await log_sink.close()
+
+        if self.metadata_index is not None:
+            await self.metadata_index.flush()
+
+    async def close(self) -> None:
+        """
+        Stops the scheduler and browsers, finishes the shards, flushes the
+        logs, manifest and metadata index and closes the session.
+        """
+        await self.scheduler.close()
+
+        for shard_writer in self.shard_writers.values():
+            await shard_writer.close()
+
+        for log_sink in self.log_sinks.values():
+            await log_sink.close()
+
+        if self.browser_pool is not None:
+            await self.browser_pool.close()
+
+        if self.manifest is not None:
+            await self.manifest.close()
+
+        if self.metadata_index is not None:
+            await self.metadata_index.close()
+
+        if self.session is not None:
+            await self.session.close()
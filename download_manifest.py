@@ -0,0 +1,215 @@
+"""
+Google_images_download_async download manifest module.
+"""
+
+# Builtin imports:
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MANIFEST_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS searches (
+    search_url TEXT NOT NULL,
+    image_limit INTEGER NOT NULL,
+    image_offset INTEGER NOT NULL,
+    results TEXT NOT NULL,
+    updated REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (search_url, image_limit, image_offset)
+);
+CREATE TABLE IF NOT EXISTS images (
+    image_url TEXT NOT NULL,
+    file_path TEXT,
+    status TEXT NOT NULL,
+    file_size INTEGER,
+    content_hash TEXT,
+    updated REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (image_url, file_path)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS images_url_file_path ON images (image_url, IFNULL(file_path, ''));
+'''
+
+def resolve_path(file_path) -> str:
+    """
+    Returns the absolute form file paths are recorded under, so runs started
+    from different working directories find each other's rows.
+    """
+    return str(Path(file_path).resolve()) if file_path is not None else None
+
+
+class DownloadManifest():
+    """
+    Persistent SQLite record of the results of every search and the outcome
+    of every image download at each path it was saved to, used to resume
+    interrupted runs. The ETag and Last-Modified of result pages and images
+    are kept to refresh them with conditional requests.
+
+    All sqlite calls run on a single dedicated thread, writes are committed
+    every commit_every writes and on close().
+    """
+    def __init__(self, manifest_path: str, commit_every: int = 100):
+        self.manifest_path = Path(manifest_path)
+        self.commit_every = commit_every
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='manifest')
+        self.connection = None
+        self.pending_writes = 0
+
+    async def run(self, function, *args):
+        """
+        Runs function on the manifest thread.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, function, *args)
+
+    async def open(self) -> None:
+        """
+        Opens the manifest, creating it if needed.
+        """
+        await self.run(self.connect)
+
+    def connect(self) -> None:
+        """
+        """
+        os.makedirs(self.manifest_path.parent, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.manifest_path))
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(MANIFEST_SCHEMA)
+
+        self.connection.commit()
+
+    def write(self, statement: str, parameters: tuple) -> None:
+        """
+        """
+        self.connection.execute(statement, parameters)
+        self.pending_writes += 1
+
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def read(self, statement: str, parameters: tuple) -> dict:
+        """
+        """
+        row = self.connection.execute(statement, parameters).fetchone()
+
+        return dict(row) if row is not None else None
+
+    def read_all(self, statement: str, parameters: tuple) -> list:
+        """
+        """
+        return [dict(row) for row in self.connection.execute(statement, parameters)]
+
+    async def get_image(self, image_url: str, file_path: str = None) -> dict:
+        """
+        Returns the recorded outcome of image_url at file_path, or its latest
+        outcome at any path when file_path is not given, or None.
+        """
+        if file_path is None:
+            return await self.run(self.read, 'SELECT * FROM images WHERE image_url = ? ORDER BY updated DESC LIMIT 1',
+                                  (image_url,))
+
+        return await self.run(self.read, 'SELECT * FROM images WHERE image_url = ? AND file_path = ?',
+                              (image_url, resolve_path(file_path)))
+
+    async def get_downloaded_copies(self, image_url: str) -> list:
+        """
+        Returns the rows of every path image_url was downloaded to, latest first.
+        """
+        return await self.run(self.read_all,
+                              "SELECT * FROM images WHERE image_url = ? AND status = 'done' "
+                              'AND file_path IS NOT NULL ORDER BY updated DESC',
+                              (image_url,))
+
+    async def record_image(self, image_url: str, file_path: str, status: str,
+                           file_size: int = None, content_hash: str = None,
+                           etag: str = None, last_modified: str = None) -> None:
+        """
+        Records the outcome of downloading image_url to file_path, file_path
+        is None for an image not stored anywhere.
+        """
+        await self.run(self.write,
+                       'INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                       (image_url, resolve_path(file_path), status, file_size,
+                        content_hash, time.time(), etag, last_modified))
+
+    async def get_search(self, search_url: str, limit: int, offset: int) -> list:
+        """
+        Returns the image metadata recorded for a search or None.
+        """
+        search = await self.run(self.read,
+                                'SELECT results FROM searches WHERE search_url = ? AND image_limit = ? AND image_offset = ?',
+                                (search_url, limit, offset))
+
+        return json.loads(search['results']) if search is not None else None
+
+    async def get_search_validators(self, search_url: str, limit: int, offset: int) -> dict:
+        """
+        Returns the ETag, Last-Modified and image metadata recorded for a search or None.
+        """
+        search = await self.run(self.read,
+                                'SELECT results, etag, last_modified FROM searches WHERE search_url = ? '
+                                'AND image_limit = ? AND image_offset = ?',
+                                (search_url, limit, offset))
+
+        if search is None:
+            return None
+
+        return {'etag': search['etag'], 'last_modified': search['last_modified'],
+                'results': json.loads(search['results'])}
+
+    async def record_search(self, search_url: str, limit: int, offset: int, results: list,
+                            etag: str = None, last_modified: str = None) -> None:
+        """
+        Records the image metadata selected from a search.
+        """
+        await self.run(self.write,
+                       'INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (search_url, limit, offset, json.dumps(results), time.time(), etag, last_modified))
+
+    async def merge(self, manifest_path: str) -> None:
+        """
+        Copies the searches and images of another manifest into this one,
+        keeping whichever row of an image path or search was updated last.
+        """
+        def copy_rows():
+            self.connection.commit()
+            self.connection.execute('ATTACH DATABASE ? AS other', (str(manifest_path),))
+
+            try:
+                self.connection.execute('''INSERT OR REPLACE INTO searches SELECT * FROM other.searches AS o
+                                           WHERE NOT EXISTS (SELECT 1 FROM searches AS s
+                                                             WHERE s.search_url = o.search_url
+                                                             AND s.image_limit = o.image_limit
+                                                             AND s.image_offset = o.image_offset
+                                                             AND s.updated >= o.updated)''')
+                self.connection.execute('''INSERT OR REPLACE INTO images SELECT * FROM other.images AS o
+                                           WHERE NOT EXISTS (SELECT 1 FROM images AS i
+                                                             WHERE i.image_url = o.image_url
+                                                             AND i.file_path IS o.file_path
+                                                             AND i.updated >= o.updated)''')
+                self.connection.commit()
+            finally:
+                self.connection.execute('DETACH DATABASE other')
+
+        await self.run(copy_rows)
+
+    async def close(self) -> None:
+        """
+        Commits pending writes and closes the manifest.
+        """
+        def disconnect():
+            if self.connection is not None:
+                self.connection.commit()
+                self.connection.close()
+                self.connection = None
+
+        await self.run(disconnect)
+        self.executor.shutdown()
@@ -0,0 +1,46 @@
+"""
+Google_images_download_async download result module.
+"""
+
+
+class DownloadResult():
+    """
+    Outcome of downloading one image or thumbnail: done, failed, skipped
+    when a resumed run finds it already downloaded, unchanged when a
+    refreshed image was not modified or filtered when the image filter
+    rejects its search result.
+
+    meta_data is the formatted search result metadata of the image and
+    seconds the time its download took. content holds the image bytes
+    instead of file_path when the downloader returns bytes, archive_member
+    the name of the image in the tar shard at file_path when writing shards.
+    """
+    def __init__(self, image_url: str, file_path: str, status: str, kind: str = 'image',
+                 file_size: int = None, content_hash: str = None, meta_data: dict = None,
+                 seconds: float = None, content: bytes = None, archive_member: str = None):
+        self.image_url = image_url
+        self.file_path = file_path
+        self.status = status
+        self.kind = kind
+        self.file_size = file_size
+        self.content_hash = content_hash
+        self.meta_data = meta_data
+        self.seconds = seconds
+        self.content = content
+        self.archive_member = archive_member
+
+    def __repr__(self) -> str:
+        return f'DownloadResult({self.status} {self.kind} {self.image_url})'
+
+    def to_dict(self) -> dict:
+        """
+        """
+        return {'image_url': self.image_url,
+                'file_path': str(self.file_path) if self.file_path is not None else None,
+                'status': self.status,
+                'kind': self.kind,
+                'file_size': self.file_size,
+                'content_hash': self.content_hash,
+                'meta_data': self.meta_data,
+                'seconds': self.seconds,
+                'archive_member': self.archive_member}
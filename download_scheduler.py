@@ -0,0 +1,214 @@
+"""
+Google_images_download_async download scheduling module.
+"""
+
+# Builtin imports:
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+# Local imports:
+from adaptive_limiter import AdaptiveLimiter
+from rate_limiter import RateLimiter
+from retry_policy import RetryPolicy, RETRYABLE_ERROR_CLASSES
+
+
+class HostSlot():
+    """
+    Times a request made inside DownloadScheduler.host_slot().
+    """
+    def __init__(self):
+        self.started = time.monotonic()
+        self.responded = None
+
+    def mark_response(self) -> None:
+        """
+        Records that the response headers arrived, the latency of the
+        request is measured up to this point instead of the end of the block.
+        """
+        self.responded = time.monotonic()
+
+    def get_latency(self) -> float:
+        """
+        """
+        return (self.responded or time.monotonic()) - self.started
+
+
+class DownloadScheduler():
+    """
+    Runs queued download jobs on a fixed pool of workers so the number of
+    jobs in flight never exceeds max_in_flight, and caps the number of
+    requests in flight to any single host and their rate.
+
+    With adaptive set the per host cap starts at max_in_flight_per_host and
+    is tuned between 1 and adaptive_max_per_host from observed latency and
+    errors, otherwise it stays fixed.
+    """
+    def __init__(self, max_in_flight: int = 32, max_in_flight_per_host: int = 8, rate_limiter=None,
+                 adaptive: bool = False, adaptive_max_per_host: int = 64):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_in_flight_per_host = int(max_in_flight_per_host)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.adaptive = adaptive
+        self.adaptive_max_per_host = int(adaptive_max_per_host)
+        self.queue = None
+        self.workers = []
+        self.host_limiters = {}
+
+    async def start(self) -> None:
+        """
+        Starts the worker pool, called lazily by submit().
+        """
+        if self.workers:
+            return
+
+        self.queue = asyncio.Queue(maxsize=self.max_in_flight * 2)
+        self.workers = [asyncio.ensure_future(self.worker()) for _ in range(self.max_in_flight)]
+
+    async def worker(self) -> None:
+        """
+        Pulls jobs from the queue and runs them one at a time.
+        """
+        while True:
+            job, future = await self.queue.get()
+
+            try:
+                if future.cancelled():
+                    job.close()
+                else:
+                    result = await job
+                    if not future.cancelled():
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            finally:
+                self.queue.task_done()
+
+    async def submit(self, job) -> asyncio.Future:
+        """
+        Queues a coroutine, waiting for queue capacity, and returns a future for its result.
+        """
+        await self.start()
+
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((job, future))
+
+        return future
+
+    async def run(self, jobs: list, max_in_flight: int = 0) -> list:
+        """
+        Queues every job and waits for all of them to finish, when cancelled
+        the jobs that have not started are dropped. A max_in_flight below the
+        scheduler's own caps these jobs, such as the downloads of one record,
+        without holding workers other jobs could use.
+        """
+        if 0 < int(max_in_flight) < self.max_in_flight:
+            return await self.run_capped(jobs, int(max_in_flight))
+
+        futures = []
+
+        try:
+            for job in jobs:
+                futures.append(await self.submit(job))
+
+            return await asyncio.gather(*futures)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            for job in jobs[len(futures):]:
+                job.close()
+            raise
+
+    async def run_capped(self, jobs: list, max_in_flight: int) -> list:
+        """
+        Submits the next job as soon as one of max_in_flight submitted ones finishes.
+        """
+        results = [None] * len(jobs)
+        next_jobs = iter(enumerate(jobs))
+
+        async def run_next_jobs():
+            for index, job in next_jobs:
+                results[index] = await (await self.submit(job))
+
+        try:
+            await asyncio.gather(*[run_next_jobs() for _ in range(max_in_flight)])
+        except asyncio.CancelledError:
+            for _, job in next_jobs:
+                job.close()
+            raise
+
+        return results
+
+    async def get_host_limiter(self, host: str) -> AdaptiveLimiter:
+        """
+        """
+        if host not in self.host_limiters:
+            initial_limit = self.max_in_flight_per_host if self.max_in_flight_per_host > 0 else self.max_in_flight
+
+            if self.adaptive:
+                self.host_limiters[host] = AdaptiveLimiter(initial_limit, 1, self.adaptive_max_per_host)
+            else:
+                self.host_limiters[host] = AdaptiveLimiter(initial_limit, initial_limit, initial_limit)
+
+        return self.host_limiters[host]
+
+    def get_host_limits(self) -> dict:
+        """
+        Returns the current in-flight limit of every host seen so far.
+        """
+        return {host: limiter.current_limit for host, limiter in self.host_limiters.items()}
+
+    @asynccontextmanager
+    async def host_slot(self, url: str):
+        """
+        Holds one of the in-flight slots of the url's host for the duration
+        of the block, entering once the host's rate limit allows it.
+        Yields a HostSlot, errors raised in the block are reported to the
+        host's limiter as overload when they are transient.
+        """
+        if self.max_in_flight_per_host <= 0 and not self.adaptive:
+            await self.rate_limiter.acquire(url)
+            yield HostSlot()
+            return
+
+        host_limiter = await self.get_host_limiter(urlsplit(url).hostname or '')
+        await host_limiter.acquire()
+
+        slot = HostSlot()
+
+        try:
+            await self.rate_limiter.acquire(url)
+            slot.started = time.monotonic()
+            yield slot
+        except asyncio.CancelledError:
+            await host_limiter.release(None)
+            raise
+        except BaseException as error:
+            if RetryPolicy.classify(error) in RETRYABLE_ERROR_CLASSES:
+                await host_limiter.release(None, overloaded=True)
+            else:
+                await host_limiter.release(slot.get_latency())
+            raise
+        else:
+            await host_limiter.release(slot.get_latency())
+
+    async def close(self) -> None:
+        """
+        Stops the worker pool.
+        """
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+        while self.queue is not None and not self.queue.empty():
+            job, future = self.queue.get_nowait()
+            job.close()
+            future.cancel()
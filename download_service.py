@@ -0,0 +1,281 @@
+"""
+Google_images_download_async download service module.
+"""
+
+# Builtin imports:
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+
+# Third party imports:
+from aiohttp import web
+
+FINISHED_JOBS_KEPT = 1000
+
+
+class DownloadJob():
+    """
+    One submitted list of records, its status and the events streamed to clients.
+    """
+    def __init__(self, job_id: str, records: list):
+        self.job_id = job_id
+        self.records = records
+        self.status = 'queued'
+        self.error = ''
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result_counts = {}
+        self.events = []
+        self.condition = asyncio.Condition()
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        """
+        return self.status in ('done', 'failed')
+
+    async def add_event(self, event: dict) -> None:
+        """
+        Stores an event and wakes the clients streaming this job.
+        """
+        async with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    async def set_status(self, status: str, error: str = '') -> None:
+        """
+        """
+        self.status = status
+        self.error = error
+
+        if status == 'running':
+            self.started = time.time()
+        elif self.is_finished:
+            self.finished = time.time()
+
+        await self.add_event({'event': 'status', **self.to_dict()})
+
+    async def add_result(self, result) -> None:
+        """
+        Result handler given to the downloaders of this job.
+        """
+        self.result_counts[result.status] = self.result_counts.get(result.status, 0) + 1
+
+        await self.add_event({'event': 'result', 'job_id': self.job_id, **result.to_dict()})
+
+    async def iter_events(self):
+        """
+        Yields every event of the job, waiting for new ones until it is finished.
+        """
+        sent = 0
+
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: sent < len(self.events) or self.is_finished)
+                events = self.events[sent:]
+
+            for event in events:
+                yield event
+            sent += len(events)
+
+            if self.is_finished and sent == len(self.events):
+                return
+
+    def to_dict(self) -> dict:
+        """
+        """
+        return {'job_id': self.job_id,
+                'status': self.status,
+                'error': self.error,
+                'records': len(self.records),
+                'submitted': self.submitted,
+                'started': self.started,
+                'finished': self.finished,
+                'results': dict(self.result_counts)}
+
+
+class DownloadService():
+    """
+    Local HTTP API that queues download jobs and runs them on infrastructure
+    kept warm between jobs.
+
+    run_records(records, result_handler) downloads the records of one job,
+    usually on a shared DownloadContext, and calls result_handler with every
+    DownloadResult. Up to max_active_jobs jobs run at the same time.
+
+    POST /jobs              submits a record, a list of records or {"Records": [...]}
+    GET  /jobs              lists the jobs
+    GET  /jobs/{id}         returns the status of a job
+    GET  /jobs/{id}/events  streams the status and results of a job as JSON lines
+    GET  /metrics           returns the run metrics in the Prometheus text format
+    """
+    def __init__(self, run_records, record_template: dict, max_active_jobs: int = 4, get_metrics=None):
+        self.run_records = run_records
+        self.record_template = record_template
+        self.max_active_jobs = max(1, int(max_active_jobs))
+        self.get_metrics = get_metrics
+        self.jobs = OrderedDict()
+        self.job_ids = itertools.count(1)
+        self.queue = None
+        self.job_runners = []
+        self.runner = None
+
+    def create_app(self) -> web.Application:
+        """
+        """
+        app = web.Application()
+        app.router.add_post('/jobs', self.handle_submit)
+        app.router.add_get('/jobs', self.handle_list)
+        app.router.add_get('/jobs/{job_id}', self.handle_status)
+        app.router.add_get('/jobs/{job_id}/events', self.handle_events)
+        app.router.add_get('/metrics', self.handle_metrics)
+
+        return app
+
+    async def start(self, address: str) -> str:
+        """
+        Starts the job runners and listens on address, host:port or
+        unix:<path>. Returns the address listened on, with the port chosen
+        when port 0 was asked for.
+        """
+        self.queue = asyncio.Queue()
+        self.job_runners = [asyncio.ensure_future(self.run_jobs()) for _ in range(self.max_active_jobs)]
+
+        self.runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.runner.setup()
+
+        if address.startswith('unix:'):
+            site = web.UnixSite(self.runner, address[len('unix:'):])
+            await site.start()
+            return address
+
+        host, _, port = address.rpartition(':')
+        site = web.TCPSite(self.runner, host or '127.0.0.1', int(port))
+        await site.start()
+
+        return '{}:{}'.format(*self.runner.addresses[0][:2])
+
+    async def close(self) -> None:
+        """
+        Stops listening and cancels the running jobs.
+        """
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+        for job_runner in self.job_runners:
+            job_runner.cancel()
+
+        await asyncio.gather(*self.job_runners, return_exceptions=True)
+        self.job_runners = []
+
+    async def submit(self, records: list) -> DownloadJob:
+        """
+        Queues a job for the records, filled in from the record template.
+        """
+        filled_records = []
+
+        for record in records:
+            template = self.record_template.copy()
+            template.update(record)
+            filled_records.append(template)
+
+        job = DownloadJob(str(next(self.job_ids)), filled_records)
+        self.jobs[job.job_id] = job
+        self.forget_finished_jobs()
+        await self.queue.put(job)
+
+        return job
+
+    def forget_finished_jobs(self) -> None:
+        """
+        Drops the oldest finished jobs past FINISHED_JOBS_KEPT.
+        """
+        finished_jobs = [job_id for job_id, job in self.jobs.items() if job.is_finished]
+
+        for job_id in finished_jobs[:max(0, len(finished_jobs) - FINISHED_JOBS_KEPT)]:
+            del self.jobs[job_id]
+
+    async def run_jobs(self) -> None:
+        """
+        Runs queued jobs one at a time.
+        """
+        while True:
+            job = await self.queue.get()
+
+            try:
+                await job.set_status('running')
+                await self.run_records(job.records, job.add_result)
+            except asyncio.CancelledError:
+                await job.set_status('failed', 'Service stopped')
+                raise
+            except Exception as error:
+                await job.set_status('failed', repr(error))
+            else:
+                await job.set_status('done')
+            finally:
+                self.queue.task_done()
+
+    async def handle_submit(self, request: web.Request) -> web.Response:
+        """
+        """
+        try:
+            body = await request.json()
+        except ValueError as error:
+            raise web.HTTPBadRequest(text=f'Invalid JSON: {error}')
+
+        records = body.get('Records') if isinstance(body, dict) and 'Records' in body else body
+        records = [records] if isinstance(records, dict) else records
+
+        if not isinstance(records, list) or not records or not all(isinstance(record, dict) for record in records):
+            raise web.HTTPBadRequest(text='Expected a record, a list of records or {"Records": [...]}')
+
+        job = await self.submit(records)
+
+        return web.json_response(job.to_dict(), status=202)
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        """
+        """
+        return web.json_response([job.to_dict() for job in self.jobs.values()])
+
+    def get_job(self, request: web.Request) -> DownloadJob:
+        """
+        """
+        job = self.jobs.get(request.match_info['job_id'])
+
+        if job is None:
+            raise web.HTTPNotFound(text=f'Unknown job {request.match_info["job_id"]}')
+
+        return job
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        """
+        """
+        return web.json_response(self.get_job(request).to_dict())
+
+    async def handle_events(self, request: web.Request) -> web.StreamResponse:
+        """
+        """
+        job = self.get_job(request)
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+
+        async for event in job.iter_events():
+            await response.write(json.dumps(event).encode('utf-8') + b'\n')
+
+        await response.write_eof()
+
+        return response
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """
+        """
+        if self.get_metrics is None:
+            raise web.HTTPNotFound()
+
+        return web.Response(text=self.get_metrics().to_prometheus(), content_type='text/plain')
@@ -4,25 +4,27 @@ Google_images_download_async main module.
 
 # Builtin imports:
 import asyncio
-import json
+import hashlib
 import os
 import time
-from datetime import datetime
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from urllib.parse import unquote, quote
 import math
 import re
-
-# Third party imports:
-from selenium import webdriver
-from selenium.common.exceptions import WebDriverException, ElementNotInteractableException, NoSuchElementException
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.by import By
-import aiofiles
-import aiohttp
+import signal
+import tempfile
 
 # Local imports:
-from config_parser import parse_config
+from browser_pool import BrowserError
+from config_parser import get_default_record, load_url_parameters, parse_config
+from dedup_index import link_file
+from download_context import DownloadContext
+from download_manifest import resolve_path
+from download_result import DownloadResult
+from image_filter import ImageFilter
+from result_parser import iter_image_meta_data
+from retry_policy import RetryPolicy, parse_retry_after
+from run_metrics import RunMetrics
 
 class ArgumentExpander():
     """
@@ -50,25 +52,25 @@ class ArgumentExpander():
 
         return keywords
 
-    async def init_new_argument(self, expanded_arguments: list) -> list:
+    def init_new_argument(self) -> dict:
         """
         This removes duplicate search terms by copying and initing them
-        to their defaults before they are set in expand_arguments().
+        to their defaults before they are set in iter_arguments().
         """
-        expanded_arguments.append(self.arguments.copy())
-        expanded_arguments[-1]['url'] = ''
-        expanded_arguments[-1]['similar_images'] = ''
-        expanded_arguments[-1]['prefix_keywords'] = ''
-        expanded_arguments[-1]['keywords'] = ''
-        expanded_arguments[-1]['suffix_keywords'] = ''
-        expanded_arguments[-1]['keywords_from_file'] = ''
+        new_argument = self.arguments.copy()
+        new_argument['url'] = ''
+        new_argument['similar_images'] = ''
+        new_argument['prefix_keywords'] = ''
+        new_argument['keywords'] = ''
+        new_argument['suffix_keywords'] = ''
+        new_argument['keywords_from_file'] = ''
 
-        return expanded_arguments
+        return new_argument
 
-    async def expand_search_words(self, expanded_arguments: list) -> list:
+    def iter_search_words(self):
         """
+        Yields an argument for every prefix, suffix and keyword combination.
         """
-
         prefixes = [str(prefix) for prefix in self.arguments['prefix_keywords'].split(',')]
         suffixes = [str(suffix) for suffix in self.arguments['suffix_keywords'].split(',')]
         keywords = [str(keyword) for keyword in self.arguments['keywords'].split(',')]
@@ -76,49 +78,154 @@ class ArgumentExpander():
         for prefix in prefixes:
             for suffix in suffixes:
                 for keyword in keywords:
-                    expanded_arguments = await self.init_new_argument(expanded_arguments)
-                    expanded_arguments[-1]['prefix_keywords'] = prefix
-                    expanded_arguments[-1]['keywords'] = keyword
-                    expanded_arguments[-1]['suffix_keywords'] = suffix
-
-        return expanded_arguments
+                    new_argument = self.init_new_argument()
+                    new_argument['prefix_keywords'] = prefix
+                    new_argument['keywords'] = keyword
+                    new_argument['suffix_keywords'] = suffix
+                    yield new_argument
 
-    async def expand_arguments(self) -> list:
+    async def iter_arguments(self):
         """
-        Reads the arguments obtained from parse_config() and splits
-        them into a list dict objects that can be processed concurrently.
+        Reads the arguments obtained from parse_config() and yields them
+        split into dict objects that can be processed concurrently, one
+        at a time so large keyword lists are never held expanded.
         """
-
-        expanded_arguments = []
-
         if self.arguments['url']:
-            expanded_arguments = await self.init_new_argument(expanded_arguments)
-            expanded_arguments[-1]['url'] = self.arguments['url']
+            new_argument = self.init_new_argument()
+            new_argument['url'] = self.arguments['url']
+            yield new_argument
 
         if self.arguments['similar_images']:
-            expanded_arguments = await self.init_new_argument(expanded_arguments)
-            expanded_arguments[-1]['similar_images'] = self.arguments['similar_images']
+            new_argument = self.init_new_argument()
+            new_argument['similar_images'] = self.arguments['similar_images']
+            yield new_argument
 
         if self.arguments['keywords_from_file']:
             self.arguments['keywords'] += ',' + await self.read_keywords_file(self.arguments['keywords_from_file'])
 
         if self.arguments['keywords'] or self.arguments['prefix_keywords'] or self.arguments['suffix_keywords']:
-            expanded_arguments = await self.expand_search_words(expanded_arguments)
+            for new_argument in self.iter_search_words():
+                yield new_argument
 
-        return expanded_arguments
+    async def expand_arguments(self) -> list:
+        """
+        Returns every argument of iter_arguments() as a list.
+        """
+        return [argument async for argument in self.iter_arguments()]
 
 
 class GoogleImagesDownloader():
     """
     Main class of downloader.
     """
-    def __init__(self, url_parm_json_file, argument):
+    def __init__(self, url_parm_json_file, argument, context=None, result_handler=None, return_bytes=False):
         self.main_directory = Path(argument['output_directory'] or "Downloads")
         self.url_parm_json_file = url_parm_json_file
         self.argument = argument
+        self.context = context or DownloadContext()
+        self.owns_context = context is None
+        self.result_handler = result_handler
+        self.return_bytes = return_bytes
+        self.image_filter = ImageFilter.from_argument(argument)
         self.sub_dir = ''
         self.tasks = []
 
+    async def close(self) -> None:
+        """
+        Closes the context if it was created by this downloader.
+        """
+        if self.owns_context:
+            await self.context.close()
+
+    async def report_result(self, image_url: str, file_path: str, status: str, kind: str = 'image',
+                            download: tuple = None, image_meta_data: dict = None, started: float = None,
+                            content: bytes = None, archive_member: str = None) -> None:
+        """
+        Records the outcome of an image download in the metadata index and
+        passes it to the result handler, if any.
+        """
+        if self.result_handler is None and self.context.metadata_index is None:
+            return
+
+        file_size, content_hash = download if download is not None else (None, None)
+        seconds = time.perf_counter() - started if started is not None else None
+        result = DownloadResult(image_url, file_path, status, kind, file_size, content_hash,
+                                image_meta_data, seconds, content, archive_member)
+
+        if self.context.metadata_index is not None:
+            await self.context.metadata_index.record_download(result)
+
+        if self.result_handler is not None:
+            await self.result_handler(result)
+
+    async def read_image(self, image_url: str, kind: str, image_meta_data: dict) -> bool:
+        """
+        Downloads image_url into memory and hands its bytes to the result
+        handler instead of writing a file.
+        """
+        started = time.perf_counter()
+        content = await self.read_image_content(image_url, kind)
+        download = (len(content), hashlib.sha256(content).hexdigest()) if content is not None else None
+
+        await self.report_result(image_url, None, 'failed' if content is None else 'done', kind, download,
+                                 image_meta_data, started, content)
+
+        return content is not None
+
+    async def write_image_to_shard(self, image_url: str, file_url: str, kind: str, image_meta_data: dict) -> bool:
+        """
+        Appends the image at image_url to the tar shards of the output
+        directory, named after file_url as a file would be.
+        """
+        started = time.perf_counter()
+
+        if await self.is_already_in_shards(image_url):
+            await self.write_to_sysout(f'Already downloaded: {image_url}')
+            await self.report_result(image_url, None, 'skipped', kind, image_meta_data=image_meta_data)
+            return True
+
+        # the body is staged next to the shards so it never sits whole in memory
+        staging_file, staging_path = tempfile.mkstemp(prefix='.', suffix='.download', dir=self.main_directory)
+        os.close(staging_file)
+
+        try:
+            download = await self.fetch_url_to_file(image_url, Path(staging_path), kind)
+
+            if download is None:
+                if self.context.manifest:
+                    await self.context.manifest.record_image(image_url, None, 'failed')
+                await self.report_result(image_url, None, 'failed', kind, image_meta_data=image_meta_data,
+                                         started=started)
+                return False
+
+            filename = await self.generate_file_name(str(file_url[(file_url.rfind('/')) + 1:]))
+            member_directory = PurePosixPath(self.sub_dir or '.').joinpath('thumbnail' if kind == 'thumbnail' else '')
+            member_name = str(member_directory.joinpath(filename))
+
+            shard_writer = await self.context.get_shard_writer(self.main_directory, self.argument['max_shard_bytes'])
+            with self.context.metrics.time_phase('write'):
+                shard_path, member_name = await shard_writer.add_file(member_name, staging_path,
+                                                                      {'image_url': image_url, 'kind': kind,
+                                                                       'content_hash': download[1],
+                                                                       'meta_data': image_meta_data})
+        finally:
+            try:
+                os.remove(staging_path)
+            except OSError:
+                pass
+
+        if self.context.manifest:
+            await self.context.manifest.record_image(image_url, shard_path, 'done', *download)
+
+        await self.report_result(image_url, shard_path, 'done', kind, download, image_meta_data, started,
+                                 archive_member=member_name)
+        await self.write_to_sysout(f'Finished downloading: {shard_path}/{member_name}')
+
+        if self.argument['save_source']:
+            await self.write_download_log(image_url, f'{shard_path}/{member_name}')
+
+        return True
+
     async def gather_and_download_images(self) -> None:
         """
         Downloads all scraped images.
@@ -134,15 +241,116 @@ class GoogleImagesDownloader():
 
             google_url = await self.build_search_url(url_params)
 
-            raw_html = await self.get_raw_html_data(google_url)
+            stored_results = await self.get_stored_search_results(google_url)
+
+            if stored_results is not None and not self.argument['related_images']:
+                await self.add_stored_search_results(stored_results)
+            else:
+                validators = await self.get_search_validators(google_url)
+                raw_html = await self.get_raw_html_data(google_url, validators)
+
+                if validators.get('not_modified'):
+                    await self.write_to_sysout(f'Result page not modified: {google_url}')
+                    await self.add_stored_search_results(validators['results'])
 
-            if raw_html != None:
-                await self.generate_image_download_tasks(raw_html)
+                elif raw_html != None:
+                    await self.generate_image_download_tasks(raw_html, google_url, validators)
 
-                if self.argument['related_images']:
-                    await self.download_related_image_google_url(raw_html)
+                    if self.argument['related_images']:
+                        await self.download_related_image_google_url(raw_html)
 
-                await asyncio.gather(*self.tasks)
+            await self.context.scheduler.run(self.tasks, self.argument['max_in_flight'] or 0)
+
+    async def add_stored_search_results(self, stored_results: list) -> None:
+        """
+        Adds the download tasks of the image metadata the manifest recorded for a search.
+        """
+        await self.set_sub_directory()
+
+        for formated_image_meta_data in stored_results:
+            await self.add_image_download_tasks(formated_image_meta_data)
+
+    async def get_search_validators(self, google_url: str) -> dict:
+        """
+        Returns the ETag, Last-Modified and image metadata the manifest
+        recorded for this search when refreshing, otherwise an empty dict.
+        Scrolled and related image searches are always fetched again.
+        """
+        if not (self.context.refresh and self.context.manifest) or self.argument['related_images']:
+            return {}
+
+        if self.argument['limit'] > 100:
+            return {}
+
+        search = await self.context.manifest.get_search_validators(google_url, int(self.argument['limit']),
+                                                                   int(self.argument['offset'] or 0))
+
+        return search if search is not None and (search['etag'] or search['last_modified']) else {}
+
+    async def get_image_validators(self, image_url: str, file_path: Path) -> dict:
+        """
+        Returns the ETag, Last-Modified, size and hash the manifest recorded
+        for image_url when refreshing and its file is still on disk,
+        otherwise an empty dict.
+        """
+        if not (self.context.refresh and self.context.manifest):
+            return {}
+
+        image = await self.context.manifest.get_image(image_url, file_path)
+
+        if (image is None or image['status'] != 'done'
+                or not (image['etag'] or image['last_modified']) or not os.path.exists(file_path)):
+            return {}
+
+        return {'etag': image['etag'], 'last_modified': image['last_modified'],
+                'file_size': image['file_size'], 'content_hash': image['content_hash']}
+
+    async def get_stored_search_results(self, google_url: str) -> list:
+        """
+        Returns the image metadata the manifest recorded for this search when resuming.
+        """
+        if not (self.context.resume and self.context.manifest):
+            return None
+
+        return await self.context.manifest.get_search(google_url, int(self.argument['limit']),
+                                                      int(self.argument['offset'] or 0))
+
+    async def is_already_downloaded(self, image_url: str, file_path: Path) -> bool:
+        """
+        Returns True when resuming and the manifest shows image_url was saved
+        to file_path and is still on disk. A copy another record saved to a
+        different path is linked to file_path instead of downloaded again.
+        """
+        if not (self.context.resume and self.context.manifest):
+            return False
+
+        copies = await self.context.manifest.get_downloaded_copies(image_url)
+        target_path = resolve_path(file_path)
+
+        if any(copy['file_path'] == target_path and os.path.exists(file_path) for copy in copies):
+            return True
+
+        for copy in copies:
+            if copy['file_path'] != target_path and link_file(copy['file_path'], file_path):
+                await self.context.manifest.record_image(image_url, file_path, 'done', copy['file_size'],
+                                                         copy['content_hash'], copy['etag'], copy['last_modified'])
+                return True
+
+        return False
+
+    async def is_already_in_shards(self, image_url: str) -> bool:
+        """
+        Returns True when resuming and the manifest shows image_url was
+        appended to a shard of this record's output directory still on disk.
+        """
+        if not (self.context.resume and self.context.manifest):
+            return False
+
+        shard_directory = self.main_directory.resolve()
+        copies = await self.context.manifest.get_downloaded_copies(image_url)
+
+        return any(Path(copy['file_path']).parent == shard_directory and os.path.exists(copy['file_path'])
+                   for copy in copies)
 
     async def make_directory(self, directory: str) -> None:
         """
@@ -162,14 +370,10 @@ class GoogleImagesDownloader():
         exact_size = ''
         built_url = "&tbs="
 
-        params = self.url_parm_json_file.copy()
-
-        for parm in params:
-            params[parm][0] = self.argument[parm]
-
-        for count, parm_value in enumerate(params.values()):
-            if parm_value[0]:
-                ext_param = parm_value[1][parm_value[0]]
+        # the table is shared by every downloader, it is only read
+        for count, (parm, parm_value) in enumerate(self.url_parm_json_file.items()):
+            if self.argument[parm]:
+                ext_param = parm_value[1][self.argument[parm]]
                 built_url += ext_param if count == 0 else f',{ext_param}'
 
         params = lang_url+built_url+exact_size+time_range
@@ -226,8 +430,6 @@ class GoogleImagesDownloader():
     async def build_similar_images_search_term(self) -> str:
         """
         """
-        await asyncio.sleep(0.1)
-
         try:
             google_similar_image_url = (f'https://www.google.com/searchbyimage?' +
                 f'site=search&sa=X&image_url={self.argument["similar_images"]}')
@@ -252,137 +454,434 @@ class GoogleImagesDownloader():
 
         return search_term
 
-    async def download_url_data(self, google_url: str, request_type: str, attempts: int = 0) -> bytes or str:
+    async def download_url_data(self, google_url: str, request_type: str) -> bytes or str:
         """
         Downloads data from provided url.
         """
+        async def read_response(resp: 'aiohttp.ClientResponse') -> bytes or str:
+            if request_type == 'bytes':
+                return await resp.read()
+
+            return await resp.text()
+
+        return await self.context.single_flight.run((google_url, request_type),
+                                                    self.request_url, google_url, read_response)
+
+    async def download_search_page(self, google_url: str, validators: dict) -> str:
+        """
+        Downloads a result page, revalidated with the ETag and Last-Modified in
+        validators when they are set. validators is updated from the response
+        and not_modified set in it when the page did not change.
+        """
+        conditional_headers = get_conditional_headers(validators)
+
+        async def read_response(resp: 'aiohttp.ClientResponse') -> tuple:
+            if resp.status == 304:
+                return '', None
+
+            return await resp.text(), resp.headers
+
+        response = await self.context.single_flight.run((google_url, 'page', *conditional_headers.values()),
+                                                        self.request_url, google_url, read_response,
+                                                        lambda: conditional_headers)
+        if response is None:
+            return None
+
+        page, headers = response
+
+        if headers is None:
+            validators['not_modified'] = True
+        else:
+            update_validators(validators, headers)
+
+        return page
+
+    def check_image_response(self, url: str, resp: 'aiohttp.ClientResponse', kind: str) -> None:
+        """
+        Rejects an image response from its headers before its body is read.
+        """
+        max_image_bytes = int(self.argument['max_image_bytes'] or 0)
+
+        if max_image_bytes and (resp.content_length or 0) > max_image_bytes:
+            raise ImageTooLargeError(url, max_image_bytes)
+
+        # thumbnails are always served as jpeg whatever the format of the image
+        filter_reason = self.image_filter.check_headers(resp.headers) if kind == 'image' else ''
+        if filter_reason:
+            raise ImageFilteredError(url, filter_reason)
+
+    async def read_image_content(self, url: str, kind: str = 'image') -> bytes:
+        """
+        Reads the body of url into memory, up to the max_image_bytes argument.
+        """
+        max_image_bytes = int(self.argument['max_image_bytes'] or 0)
+        chunk_size = int(self.argument['chunk_size'])
+
+        async def read_response(resp: 'aiohttp.ClientResponse') -> bytes:
+            self.check_image_response(url, resp, kind)
+
+            content = bytearray()
+
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                content += chunk
+                if max_image_bytes and len(content) > max_image_bytes:
+                    raise ImageTooLargeError(url, max_image_bytes)
+
+            return bytes(content)
+
+        return await self.context.single_flight.run((url, kind), self.request_url, url, read_response)
+
+    async def download_url_to_file(self, url: str, file_path: Path, kind: str = 'image',
+                                   validators: dict = None) -> tuple:
+        """
+        Saves the image at url to file_path. Urls and contents already
+        downloaded during the run are hardlinked instead of stored again.
+        validators is passed on to fetch_url_to_file.
+
+        Return: number of bytes written and sha256 hex digest of the body
+                or None when the download failed.
+        """
+        validators = validators if validators is not None else {}
+        dedup_index = self.context.dedup_index
+        first_download = dedup_index.claim_url(url) if dedup_index else None
+        downloaded = None
+
+        if first_download is not None:
+            # shielded, a cancelled claimant must not cancel the download others wait for
+            first_downloaded = await asyncio.shield(first_download)
+            if first_downloaded is not None and link_file(first_downloaded[0], file_path):
+                downloaded = first_downloaded[1:]
+
+        if downloaded is None:
+            try:
+                downloaded = await self.fetch_url_to_file(url, file_path, kind, validators)
+            finally:
+                # later claimants await this even when the fetch raised or was cancelled
+                if dedup_index and first_download is None:
+                    dedup_index.finish_url(url, file_path, downloaded)
+
+            if dedup_index and downloaded is not None:
+                existing_file_path = dedup_index.register_content(downloaded[1], file_path)
+                if existing_file_path is not None:
+                    link_file(existing_file_path, file_path)
+
+        if self.context.manifest:
+            if downloaded is None:
+                await self.context.manifest.record_image(url, file_path, 'failed')
+            else:
+                await self.context.manifest.record_image(url, file_path, 'done', *downloaded,
+                                                         validators.get('etag'), validators.get('last_modified'))
+
+        return downloaded
+
+    async def fetch_url_to_file(self, url: str, file_path: Path, kind: str = 'image',
+                                validators: dict = None) -> tuple:
+        """
+        Streams the body of url into file_path in chunks, the data is written to
+        a .part file that is renamed into place once complete.
+
+        When an attempt breaks off and the server accepts byte ranges, the
+        .part file is kept and the retry only asks for the missing bytes with
+        a Range request. The retry sends If-Range with the ETag or
+        Last-Modified of the first response, so a changed image comes back
+        whole. A whole body starts the .part file over, a refused range
+        is requested again whole at once, without spending a retry.
+
+        validators holds the ETag and Last-Modified of the copy already at
+        file_path, with its size and hash, to revalidate it with a
+        conditional request. It is updated from the response and
+        not_modified set in it when the copy is current and left in place.
+
+        Return: number of bytes written and sha256 hex digest of the body
+                or None when the download failed.
+        """
+        # imported with the first request, like the session
+        import aiofiles
+        import aiohttp
+
+        validators = validators if validators is not None else {}
+        max_image_bytes = int(self.argument['max_image_bytes'] or 0)
+        chunk_size = int(self.argument['chunk_size'])
+        part_file_path = Path(f'{file_path}.part')
+        file_size = 0
+        content_hash = hashlib.sha256()
+        range_validator = None
+        # taken before the first response updates validators, which then describe the new body
+        conditional_headers = get_conditional_headers(validators)
+
+        def build_headers() -> dict:
+            if not (file_size and range_validator and part_file_path.exists()
+                    and part_file_path.stat().st_size >= file_size):
+                return conditional_headers
+
+            # drop whatever of a failed chunk reached the file
+            os.truncate(part_file_path, file_size)
+
+            return {'Range': f'bytes={file_size}-', 'If-Range': range_validator}
+
+        async def write_response(resp: 'aiohttp.ClientResponse') -> tuple:
+            nonlocal file_size, content_hash, range_validator
+
+            if resp.status == 304:
+                validators['not_modified'] = True
+                return validators['file_size'], validators['content_hash']
+
+            if resp.status == 416 or (resp.status == 206 and
+                                      get_content_range_start(resp.headers.get('Content-Range')) != file_size):
+                range_validator = None
+                raise RangeRefusedError(url)
+
+            self.check_image_response(url, resp, kind)
+
+            if resp.status == 206:
+                self.context.metrics.add_counter('resumed_downloads')
+                self.context.metrics.add_counter('resumed_bytes', file_size)
+            else:
+                file_size = 0
+                content_hash = hashlib.sha256()
+                range_validator = get_range_validator(resp.headers)
+                update_validators(validators, resp.headers)
+
+            written = 0
+            write_seconds = 0.0
+
+            try:
+                async with aiofiles.open(part_file_path, 'ab' if file_size else 'wb') as file:
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        if max_image_bytes and file_size + len(chunk) > max_image_bytes:
+                            raise ImageTooLargeError(url, max_image_bytes)
+                        write_started = time.perf_counter()
+                        await file.write(chunk)
+                        write_seconds += time.perf_counter() - write_started
+                        content_hash.update(chunk)
+                        file_size += len(chunk)
+                        written += len(chunk)
+
+                os.replace(part_file_path, file_path)
+            except BaseException as error:
+                # only a broken off transfer leaves a .part file worth resuming
+                if not isinstance(error, (OSError, asyncio.TimeoutError, aiohttp.client_exceptions.ClientError)):
+                    range_validator = None
+                raise
+            finally:
+                self.context.metrics.observe('write', write_seconds, size=written)
+
+            return file_size, content_hash.hexdigest()
+
         try:
-            await asyncio.sleep(0.1)
+            return await self.request_url(url, write_response, build_headers)
+        finally:
+            try:
+                os.remove(part_file_path)
+            except OSError:
+                pass
+
+    async def request_url(self, google_url: str, read_response, build_headers=None):
+        """
+        Requests provided url and returns the result of read_response(resp)
+        for a successful response. Failures are retried as the context's
+        retry policy allows, the final error is logged and None returned.
+
+        build_headers() returns the headers of each attempt. Partial (206)
+        and refused range (416) responses to a Range header and not modified
+        (304) responses to a conditional request are also passed to read_response.
+        """
+        import aiohttp
+
+        retry_policy = self.context.retry_policy
+        attempts = 0
 
+        if self.argument['socket_timeout'] < 2:
+            timeout = aiohttp.ClientTimeout(total=2)
+        else:
+            timeout = aiohttp.ClientTimeout(total=self.argument['socket_timeout'])
+
+        while True:
             attempts += 1
 
-            # await self.write_to_sysout(f'Begin downloading {google_url}')
+            if not retry_policy.allow(google_url):
+                await self.write_error_log(f'Host is failing, circuit open, skipped: {google_url}')
+                return None
 
-            headers = {}
-            headers['User-Agent'] = ('Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 ' +
-                                        '(KHTML, like Gecko) Chrome/41.0.2228.0 Safari/537.36')
+            try:
+                # await self.write_to_sysout(f'Begin downloading {google_url}')
 
-            if self.argument['socket_timeout'] < 2:
-                timeout = aiohttp.ClientTimeout(total=2)
-            else:
-                timeout = aiohttp.ClientTimeout(total=self.argument['socket_timeout'])
+                session = await self.context.get_session()
+                headers = build_headers() if build_headers is not None else {}
+                self.context.metrics.add_counter('requests')
+
+                async with self.context.scheduler.host_slot(google_url) as host_slot:
+                    with self.context.metrics.time_phase('request', RetryPolicy.get_host(google_url)) as timer:
+                        async with session.get(google_url, timeout=timeout, headers=headers) as resp:
+                            host_slot.mark_response()
+
+                            if resp.status in get_accepted_statuses(headers):
+                                content = await read_response(resp)
+                                timer.size = resp.content.total_bytes
+
+                                # await self.write_to_sysout(f'Finished downloading {google_url}')
+
+                                retry_policy.record_success(google_url)
+
+                                return content
+
+                            raise DownloadError(google_url, resp.status,
+                                                parse_retry_after(resp.headers.get('Retry-After')))
+
+            except RangeRefusedError:
+                # a protocol fallback rather than a failure or a success, the refused
+                # range is already dropped, fetch the whole body straight away
+                attempts -= 1
+                continue
+
+            except (ImageTooLargeError, ImageFilteredError) as error:
+                # the host answered, the image itself was rejected
+                retry_policy.record_success(google_url)
+                await self.write_request_error_log(google_url, error)
+                return None
 
-            async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-                async with session.get(google_url) as resp:
-                    if resp.status == 200:
-                        if request_type == 'bytes':
-                            content = await resp.read()
-                        else:
-                            content = await resp.text()
+            except (DownloadError, OSError, asyncio.TimeoutError,
+                    aiohttp.client_exceptions.ClientError) as error:
+                retry_policy.record_failure(google_url, error)
+                delay = retry_policy.get_retry_delay(error, attempts, int(self.argument['repeat_failure']))
 
-                        # await self.write_to_sysout(f'Finished downloading {google_url}')
+                if delay is None:
+                    await self.write_request_error_log(google_url, error)
+                    return None
 
-                        return content
+                await asyncio.sleep(delay)
 
-                    raise DownloadError(google_url, resp.status)
+    async def write_request_error_log(self, google_url: str, error: Exception) -> None:
+        """
+        Logs the final error of a request.
+        """
+        import aiohttp
 
-        except DownloadError as error:
+        if isinstance(error, DownloadError):
             await self.write_error_log(error)
 
-        except aiohttp.client_exceptions.ClientConnectorError as error:
+        elif isinstance(error, aiohttp.client_exceptions.ClientConnectorError):
             await self.write_error_log(f'Unable to Connect to Client {error} URL: {google_url}')
 
-        except aiohttp.client_exceptions.InvalidURL as error:
+        elif isinstance(error, aiohttp.client_exceptions.InvalidURL):
             await self.write_error_log(f'Invalid URL: {error}')
 
-        except asyncio.TimeoutError:
-            if attempts < self.argument['repeat_failure']:
-                await self.download_url_data(google_url, request_type, attempts)
-            else:
-                await self.write_error_log(f'Timeout downloading: {google_url}')
+        elif isinstance(error, asyncio.TimeoutError):
+            await self.write_error_log(f'Timeout downloading: {google_url}')
 
-        except ServerDisconnectedError as error:
+        elif isinstance(error, aiohttp.client_exceptions.ServerDisconnectedError):
             await self.write_error_log(f'{error} While downloading {google_url}')
 
-    async def get_raw_html_data(self, google_url: str) -> str:
+        else:
+            await self.write_error_log(f'{error}: {google_url}')
+
+    async def get_raw_html_data(self, google_url: str, validators: dict = None) -> str:
         """
+        Returns the result page of google_url, served from the search cache when possible.
+        A page revalidated with the stored validators that did not change is returned empty.
         """
-        if self.argument['limit'] > 100:
-            raw_html = await self.multi_page_image_download(google_url)
-        else:
-            raw_html = await self.download_url_data(google_url, 'text')
+        validators = validators if validators is not None else {}
+        search_cache = self.context.search_cache
+        number_of_pages = math.ceil(self.argument['limit']/100) if self.argument['limit'] > 100 else 0
+        cache_key = f'{number_of_pages} {google_url}'
+
+        # revalidating a page costs less than reading it from the cache
+        if search_cache and not get_conditional_headers(validators):
+            raw_html = await search_cache.get(cache_key)
+            if raw_html is not None:
+                return raw_html
+
+        with self.context.metrics.time_phase('search', RetryPolicy.get_host(google_url)) as timer:
+            if self.argument['limit'] > 100:
+                raw_html = await self.multi_page_image_download(google_url)
+            else:
+                raw_html = await self.download_search_page(google_url, validators)
+
+            timer.failed = not raw_html and not validators.get('not_modified')
+            timer.size = len(raw_html or '')
+
+        if search_cache and raw_html:
+            await search_cache.put(cache_key, raw_html)
 
         return raw_html
 
-    async def generate_image_download_tasks(self, page: str) -> asyncio.coroutine:
+    async def generate_image_download_tasks(self, page: str, google_url: str = '', validators: dict = None) -> None:
         """
         Gets all images from page.
         """
+        validators = validators if validators is not None else {}
         limit = 1
-        ignore_url = False
+        search_results = []
 
-        while limit <= int(self.argument['limit']):
+        await self.set_sub_directory()
 
-            image_meta_data, end_content = await self.get_next_item(page)
+        with self.context.metrics.time_phase('parse') as timer:
+            timer.size = len(page)
+
+            for image_meta_data in iter_image_meta_data(page):
+                if limit > int(self.argument['limit']):
+                    break
+
+                if self.argument['offset'] and limit < int(self.argument['offset']):
+                    limit += 1
+                    continue
 
-            if image_meta_data == "no_links":
-                break
-            if image_meta_data == '':
-                page = page[end_content:]
-            elif self.argument['offset'] and limit < int(self.argument['offset']):
-                limit += 1
-                page = page[end_content:]
-            else:
                 formated_image_meta_data = await self.format_image_meta_data(image_meta_data)
-                image_url = formated_image_meta_data['image_link']
-                image_thumbnail_url = formated_image_meta_data['image_thumbnail_url']
+                search_results.append(formated_image_meta_data)
+
+                await self.add_image_download_tasks(formated_image_meta_data)
+
+                limit += 1
 
-                await self.set_sub_directory()
+        if google_url and self.context.manifest:
+            await self.context.manifest.record_search(google_url, int(self.argument['limit']),
+                                                      int(self.argument['offset'] or 0), search_results,
+                                                      validators.get('etag'), validators.get('last_modified'))
 
-                if self.argument['proxy']:
-                    os.environ["http_proxy"] = self.argument['proxy']
-                    os.environ["https_proxy"] = self.argument['proxy']
+        if google_url and self.context.metadata_index:
+            await self.context.metadata_index.record_results(google_url, self.argument['keywords'] or
+                                                             self.argument['similar_images'], search_results)
 
-                if self.argument['ignore_urls']:
-                    if any(ignored_url in image_url for ignored_url in self.argument['ignore_urls'].split(',')):
-                        self.tasks.append(self.write_to_sysout(f'URL Ignored: {image_url}'))
-                        ignore_url = True
+    async def add_image_download_tasks(self, formated_image_meta_data: dict) -> None:
+        """
+        Adds the print and download tasks of a single image.
+        """
+        ignore_url = False
+        image_url = formated_image_meta_data['image_link']
+        image_thumbnail_url = formated_image_meta_data['image_thumbnail_url']
 
-                if not ignore_url:
-                    if self.argument['print_urls'] or self.argument['no_download']:
-                        self.tasks.append(self.print_image_url(image_url))
+        if self.argument['proxy']:
+            os.environ["http_proxy"] = self.argument['proxy']
+            os.environ["https_proxy"] = self.argument['proxy']
 
-                    if not self.argument['no_download']:
-                        if not self.argument['thumbnail_only']:
-                            self.tasks.append(self.download_images(image_url))
+        if self.argument['ignore_urls']:
+            if any(ignored_url in image_url for ignored_url in self.argument['ignore_urls'].split(',')):
+                self.tasks.append(self.write_to_sysout(f'URL Ignored: {image_url}'))
+                ignore_url = True
 
-                        if self.argument['thumbnail'] or self.argument['thumbnail_only']:
-                            self.tasks.append(self.download_image_thumbnails(image_url, image_thumbnail_url))
+        if not ignore_url:
+            filter_reason = self.image_filter.check_meta_data(formated_image_meta_data)
+            if filter_reason:
+                self.tasks.append(self.skip_filtered_image(image_url, filter_reason, formated_image_meta_data))
+                ignore_url = True
 
-                limit += 1
+        if not ignore_url:
+            if self.argument['print_urls'] or self.argument['no_download']:
+                self.tasks.append(self.print_image_url(image_url))
+
+            if not self.argument['no_download']:
+                if not self.argument['thumbnail_only']:
+                    self.tasks.append(self.download_images(image_url, formated_image_meta_data))
 
-                page = page[end_content:]
+                if self.argument['thumbnail'] or self.argument['thumbnail_only']:
+                    self.tasks.append(self.download_image_thumbnails(image_url, image_thumbnail_url,
+                                                                     formated_image_meta_data))
 
-    async def get_next_item(self, page: str) -> tuple:
+    async def skip_filtered_image(self, image_url: str, filter_reason: str, image_meta_data: dict) -> None:
         """
-        Gets next image from page.
         """
-        try:
-            start_line = page.find('rg_meta notranslate')
-            if start_line == -1:  # If no links are found then give an error!
-                image_meta_data = "no_links"
-                end_content = 0
-            else:
-                start_line = page.find('class="rg_meta notranslate">')
-                start_content = page.find('{', start_line + 1)
-                end_content = page.find('</div>', start_content + 1)
-                content_raw = str(page[start_content:end_content])
-                content_decode = bytes(content_raw, "utf-8").decode("unicode_escape")
-                image_meta_data = json.loads(content_decode)
-        except (UnicodeError, json.JSONDecodeError):
-            image_meta_data = ""
-
-        return image_meta_data, end_content
+        await self.write_to_sysout(f'Image filtered, {filter_reason}: {image_url}')
+        await self.report_result(image_url, None, 'filtered', image_meta_data=image_meta_data)
 
     async def format_image_meta_data(self, obj: dict) -> dict:
         """
@@ -419,73 +918,66 @@ class GoogleImagesDownloader():
         """
         """
         page_source = ''
-        stale_element = True
-
-        options = webdriver.ChromeOptions()
-        options.add_argument('--no-sandbox')
-        options.add_argument('--headless')
+        number_of_pages = math.ceil(self.argument['limit']/100)
 
         try:
-            with webdriver.Chrome(self.argument['chromedriver'], options=options) as wd:
-                wd.get(google_url)
-                html_body_element = wd.find_element_by_tag_name("body")
-
-                number_of_pages = math.ceil(self.argument['limit']/100)
-                for i in range(number_of_pages):
-                    while stale_element:
-                        try:
-                            html_body_element.send_keys(Keys.END)
-                            stale_element = False
-                        except StaleElementReferenceException:
-                            pass
-
-                    try:
-                        html_body_element.find_element_by_xpath("//input[@id='smb']").click()
-                    except ElementNotInteractableException:
-                        pass
-                    except NoSuchElementException:
-                        pass
-
-                    await asyncio.sleep(0.5)
-
-                page_source = wd.page_source
-        except WebDriverException as error:
+            with self.context.metrics.time_phase('browser'):
+                browser_pool = await self.context.get_browser_pool(self.argument['chromedriver'])
+                page_source = await browser_pool.scroll(google_url, number_of_pages)
+        except BrowserError as error:
              await self.write_error_log(f'Exception: {error}' +
                 'Cannot locate chromedriver please insure the chrome browser is installed' +
                 'and the argument "--chromedriver" has the correct path to the executable.')
+        except asyncio.TimeoutError:
+            await self.write_error_log(f'Timeout scrolling: {google_url}')
 
         return page_source
 
-    async def download_images(self, image_url: str, attempts: int = 0) -> None:
+    async def download_images(self, image_url: str, image_meta_data: dict = None) -> None:
         """
         Downloads image from provided url to provided sub directory.
         """
-        await asyncio.sleep(0.1)
-
-        try:
-            attempts += 1
-            unquoted_image_url = unquote(image_url)
-
-            content = await self.download_url_data(unquoted_image_url, 'bytes')
+        unquoted_image_url = unquote(image_url)
 
-            await self.write_image_to_file(unquoted_image_url, content)
-        except TypeError as error:
-            if attempts <= self.argument['repeat_failure']:
-                await self.download_images(image_url, attempts)
-            else:
-                await self.write_error_log(f'File not writen: {unquoted_image_url} {error}')
+        if self.return_bytes:
+            if not await self.read_image(unquoted_image_url, 'image', image_meta_data):
+                await self.write_error_log(f'Image not read: {unquoted_image_url}')
+        elif self.argument['output_format'] == 'tar':
+            if not await self.write_image_to_shard(unquoted_image_url, unquoted_image_url, 'image', image_meta_data):
+                await self.write_error_log(f'File not writen: {unquoted_image_url}')
+        elif not await self.write_image_to_file(unquoted_image_url, image_meta_data):
+            await self.write_error_log(f'File not writen: {unquoted_image_url}')
 
-    async def write_image_to_file(self, image_url: str, content: bytes) -> None:
+    async def write_image_to_file(self, image_url: str, image_meta_data: dict = None) -> bool:
         """
-        Writes data to file.
+        Streams image to file.
         """
-        await asyncio.sleep(0.1)
+        started = time.perf_counter()
 
         filename = await self.generate_file_name(str(image_url[(image_url.rfind('/')) + 1:]))
         image_directory = await self.generate_image_directory()
         image_file_path = image_directory.joinpath(filename)
 
-        await self.write_to_file(image_file_path, content)
+        if await self.is_already_downloaded(image_url, image_file_path):
+            await self.write_to_sysout(f'Already downloaded: {image_file_path}')
+            await self.report_result(image_url, image_file_path, 'skipped', image_meta_data=image_meta_data)
+            return True
+
+        validators = await self.get_image_validators(image_url, image_file_path)
+        download = await self.download_url_to_file(image_url, image_file_path, 'image', validators)
+
+        if validators.get('not_modified'):
+            await self.write_to_sysout(f'Not modified: {image_file_path}')
+            await self.report_result(image_url, image_file_path, 'unchanged', download=download,
+                                     image_meta_data=image_meta_data, started=started)
+            return True
+
+        await self.report_result(image_url, image_file_path, 'failed' if download is None else 'done',
+                                 download=download, image_meta_data=image_meta_data, started=started)
+
+        if download is None:
+            return False
+
         file_size = await self.get_file_size(image_file_path) if self.argument['print_size'] else ''
 
         await self.write_to_sysout(f'Finished downloading: {image_file_path} {file_size}')
@@ -493,6 +985,8 @@ class GoogleImagesDownloader():
         if self.argument['save_source']:
             await self.write_download_log(image_url, image_file_path)
 
+        return True
+
     async def generate_file_name(self, filename: str) -> str:
         """
         """
@@ -521,36 +1015,57 @@ class GoogleImagesDownloader():
 
         return image_directory
 
-    async def download_image_thumbnails(self, image_url: str, image_thumbnail_url: str, attempts: int = 0) -> None:
+    async def download_image_thumbnails(self, image_url: str, image_thumbnail_url: str,
+                                        image_meta_data: dict = None) -> None:
         """
         Downloads image from provided url to provided sub directory.
         """
-        await asyncio.sleep(0.1)
+        unquoted_image_thumbnail_url = unquote(image_thumbnail_url)
 
-        try:
-            attempts += 1
-            unquoted_image_thumbnail_url = unquote(image_thumbnail_url)
-
-            content = await self.download_url_data(unquoted_image_thumbnail_url, 'bytes')
-
-            await self.write_image_thumbnail_to_file(image_url, unquoted_image_thumbnail_url, content)
-        except TypeError as error:
-            if attempts <= self.argument['repeat_failure']:
-                await self.download_images(unquoted_image_thumbnail_url, attempts)
-            else:
-                await self.write_error_log(f'File not writen: {unquoted_image_thumbnail_url} {error}')
+        if self.return_bytes:
+            if not await self.read_image(unquoted_image_thumbnail_url, 'thumbnail', image_meta_data):
+                await self.write_error_log(f'Image not read: {unquoted_image_thumbnail_url}')
+        elif self.argument['output_format'] == 'tar':
+            if not await self.write_image_to_shard(unquoted_image_thumbnail_url, image_url, 'thumbnail',
+                                                   image_meta_data):
+                await self.write_error_log(f'File not writen: {unquoted_image_thumbnail_url}')
+        elif not await self.write_image_thumbnail_to_file(image_url, unquoted_image_thumbnail_url, image_meta_data):
+            await self.write_error_log(f'File not writen: {unquoted_image_thumbnail_url}')
 
-    async def write_image_thumbnail_to_file(self, image_url: str, image_thumbnail_url: str, content: bytes) -> None:
+    async def write_image_thumbnail_to_file(self, image_url: str, image_thumbnail_url: str,
+                                            image_meta_data: dict = None) -> bool:
         """
-        Writes data to file.
+        Streams image thumbnail to file.
         """
-        await asyncio.sleep(0.1)
+        started = time.perf_counter()
 
         filename = await self.generate_file_name(str(image_url[(image_url.rfind('/')) + 1:]))
         image_thumbnail_directory = await self.generate_image_thumbnail_directory()
         image_thumbnail_file_path = image_thumbnail_directory.joinpath(filename)
 
-        await self.write_to_file(image_thumbnail_file_path, content)
+        if await self.is_already_downloaded(image_thumbnail_url, image_thumbnail_file_path):
+            await self.write_to_sysout(f'Already downloaded: {image_thumbnail_file_path}')
+            await self.report_result(image_thumbnail_url, image_thumbnail_file_path, 'skipped', 'thumbnail',
+                                     image_meta_data=image_meta_data)
+            return True
+
+        validators = await self.get_image_validators(image_thumbnail_url, image_thumbnail_file_path)
+        download = await self.download_url_to_file(image_thumbnail_url, image_thumbnail_file_path, 'thumbnail',
+                                                   validators)
+
+        if validators.get('not_modified'):
+            await self.write_to_sysout(f'Not modified: {image_thumbnail_file_path}')
+            await self.report_result(image_thumbnail_url, image_thumbnail_file_path, 'unchanged', 'thumbnail',
+                                     download, image_meta_data, started)
+            return True
+
+        await self.report_result(image_thumbnail_url, image_thumbnail_file_path,
+                                 'failed' if download is None else 'done', 'thumbnail', download,
+                                 image_meta_data, started)
+
+        if download is None:
+            return False
+
         file_size = await self.get_file_size(image_thumbnail_file_path) if self.argument['print_size'] else ''
 
         await self.write_to_sysout(f'Finished downloading: {image_thumbnail_file_path} {file_size}')
@@ -558,6 +1073,8 @@ class GoogleImagesDownloader():
         if self.argument['save_source']:
             await self.write_download_log(image_thumbnail_url, image_thumbnail_file_path)
 
+        return True
+
     async def generate_image_thumbnail_directory(self) -> str:
         """
         """
@@ -575,9 +1092,7 @@ class GoogleImagesDownloader():
             related_image_raw_html = await self.get_raw_html_data(google_url)
 
             if related_image_raw_html != None:
-                await self.generate_image_download_tasks(related_image_raw_html)
-
-            await asyncio.sleep(0.1)
+                await self.generate_image_download_tasks(related_image_raw_html, google_url)
 
     async def get_related_image_google_url(self, raw_html: str) -> list:
         """
@@ -592,15 +1107,6 @@ class GoogleImagesDownloader():
 
         return google_related_image_url
 
-    async def write_to_file(self, image_file_path: str, content: bytes) -> None:
-        """
-        """
-        try:
-            async with aiofiles.open(image_file_path, 'wb') as file:
-                await file.write(content)
-        except IOError as error:
-            await self.write_error_log(f'{error}: {image_file_path}')
-
     async def get_file_size(self, file_path: str) -> str:
         """
         """
@@ -632,71 +1138,418 @@ class GoogleImagesDownloader():
     async def write_download_log(self, image_url: str, file_path: str) -> None:
         """
         """
-        save_source = self.main_directory.joinpath(self.argument["save_source"])
-
-        abs_path = os.path.abspath(file_path)
+        log_sink = await self.context.get_log_sink(self.main_directory.joinpath(self.argument["save_source"]))
 
-        download_log_record = f'{await self.get_time_stamp()}: {abs_path}\t{image_url}\n'
-
-        async with aiofiles.open(save_source, 'a') as file:
-            await file.write(download_log_record)
+        await log_sink.write(file_path=os.path.abspath(file_path), image_url=image_url)
 
     async def write_error_log(self, message: str) -> None:
         """
         """
-        error_log_source = self.main_directory.joinpath(self.argument["error_log"])
-
-        error_log_record = f'{await self.get_time_stamp()}: {message}\n'
+        log_sink = await self.context.get_log_sink(self.main_directory.joinpath(self.argument["error_log"]))
 
-        async with aiofiles.open(error_log_source, 'a') as file:
-            await file.write(error_log_record)
+        await log_sink.write(message=message)
 
         await self.write_to_sysout(message)
 
-    async def get_time_stamp(self) -> None:
-        """
-        """
-        datetime_now = datetime.now()
-        time_stamp = datetime.timestamp(datetime_now)
-        form_time_stamp = datetime.fromtimestamp(time_stamp)
-
-        return form_time_stamp
-
 
 class DownloadError(Exception):
     """
     Raised when error occurs during download.
     """
-    def __init__(self, url, status):
+    def __init__(self, url, status, retry_after=None):
         self.url = url
         self.status = status
+        self.retry_after = retry_after
 
     def __str__(self):
         return f'Unable to download {self.url}, HTTP Status Code was {self.status}'
 
 
-async def main() -> None:
+class ImageTooLargeError(DownloadError):
     """
-    Main function of google_image_downloader_async.
+    Raised when an image is larger than the max_image_bytes argument.
     """
-    url_parm_json_file, records = await parse_config()
+    def __init__(self, url, max_image_bytes):
+        super().__init__(url, 200)
+        self.max_image_bytes = max_image_bytes
 
-    tasks = []
+    def __str__(self):
+        return f'Unable to download {self.url}, image is larger than {self.max_image_bytes} bytes'
 
-    print('Starting image download')
 
-    for record in records:
+class ImageFilteredError(DownloadError):
+    """
+    Raised when the headers of an image response show the image filter rejects it.
+    """
+    def __init__(self, url, filter_reason):
+        super().__init__(url, 200)
+        self.filter_reason = filter_reason
+
+    def __str__(self):
+        return f'Unable to download {self.url}, {self.filter_reason}'
+
+
+class RangeRefusedError(DownloadError):
+    """
+    Raised when a resumed download's byte range is refused and the body must be fetched whole.
+    """
+    def __init__(self, url):
+        super().__init__(url, 416)
+
+    def __str__(self):
+        return f'Unable to resume {self.url}, the byte range was refused'
+
+
+def get_content_range_start(content_range: str) -> int:
+    """
+    Returns the first byte of a Content-Range header such as bytes 100-199/200, None when malformed.
+    """
+    match = re.match(r'bytes\s+(\d+)-\d+/(\d+|\*)$', (content_range or '').strip())
+
+    return int(match.group(1)) if match else None
+
+
+def get_accepted_statuses(headers: dict) -> tuple:
+    """
+    Returns the response statuses that answer a request sent with headers.
+    """
+    statuses = (200,)
+
+    if 'Range' in headers:
+        statuses += (206, 416)
+
+    if 'If-None-Match' in headers or 'If-Modified-Since' in headers:
+        statuses += (304,)
+
+    return statuses
+
+
+def get_conditional_headers(validators: dict) -> dict:
+    """
+    Returns the If-None-Match and If-Modified-Since headers revalidating a
+    stored response from its ETag and Last-Modified.
+    """
+    headers = {}
+
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    return headers
+
+
+def update_validators(validators: dict, headers) -> None:
+    """
+    Stores the ETag and Last-Modified of a response in validators.
+    """
+    validators['etag'] = headers.get('ETag')
+    validators['last_modified'] = headers.get('Last-Modified')
+
+
+def get_range_validator(headers) -> str:
+    """
+    Returns the strong ETag or Last-Modified a later Range request can be
+    validated with in If-Range, None when the response cannot be resumed.
+    """
+    if headers.get('Accept-Ranges', '').lower() != 'bytes':
+        return None
+
+    # offsets of a decoded body do not match the ranges of the encoded one
+    if headers.get('Content-Encoding', 'identity').lower() != 'identity':
+        return None
+
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+
+    return headers.get('Last-Modified')
+
+
+async def report_host_limits(context: DownloadContext, interval: float) -> None:
+    """
+    Prints the current in-flight limit of every host every interval seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        host_limits = context.scheduler.get_host_limits()
+        if host_limits:
+            print('Host limits:', ', '.join(f'{host}={limit}' for host, limit in sorted(host_limits.items())))
+
+
+async def iter_expanded_records(records):
+    """
+    Yields the arguments of the searches every record describes, records
+    may be a list or an async iterator such as a streamed jobs file.
+    """
+    if not hasattr(records, '__aiter__'):
+        records = iter_list(records)
+
+    async for record in records:
         if record['single_image']:
-            google_image_downloader = GoogleImagesDownloader(url_parm_json_file, record)
-            tasks.append(google_image_downloader.gather_and_download_images())
+            yield record
         else:
             argument_expander = ArgumentExpander(record)
-            expanded_arguments = await argument_expander.expand_arguments()
-            for argument in expanded_arguments:
-                google_image_downloader = GoogleImagesDownloader(url_parm_json_file, argument)
-                tasks.append(google_image_downloader.gather_and_download_images())
+            async for argument in argument_expander.iter_arguments():
+                yield argument
 
-    await asyncio.gather(*tasks)
+
+async def iter_list(items: list):
+    """
+    """
+    for item in items:
+        yield item
+
+
+async def expand_records(records) -> list:
+    """
+    Splits every record into the arguments of the searches it describes.
+    """
+    return [argument async for argument in iter_expanded_records(records)]
+
+
+async def run_downloaders(url_parm_json_file: dict, arguments, context: DownloadContext,
+                          max_active_records: int, result_handler=None, return_bytes: bool = False) -> None:
+    """
+    Runs a downloader for every argument, at most max_active_records at a
+    time. The next argument is only taken once a downloader finishes, so
+    streamed arguments are consumed as capacity frees up.
+    """
+    if not hasattr(arguments, '__aiter__'):
+        arguments = iter_list(arguments)
+
+    arguments_lock = asyncio.Lock()
+
+    async def run_next_downloaders():
+        while True:
+            async with arguments_lock:
+                try:
+                    argument = await arguments.__anext__()
+                except StopAsyncIteration:
+                    return
+
+            google_image_downloader = GoogleImagesDownloader(url_parm_json_file, argument, context,
+                                                             result_handler, return_bytes)
+            await google_image_downloader.gather_and_download_images()
+
+    await asyncio.gather(*[run_next_downloaders() for _ in range(max(1, int(max_active_records)))])
+
+
+async def search_and_download(record: dict, context: DownloadContext = None, return_bytes: bool = False,
+                              url_parm_json_file: dict = None):
+    """
+    Library entry point, searches and downloads the images of one record
+    and yields a DownloadResult as each image finishes:
+
+        async for result in search_and_download({'keywords': 'cats', 'limit': 20}):
+            print(result.image_url, result.file_path, result.meta_data)
+
+    Options missing from record take their command line defaults. With
+    return_bytes the images are not written, each result holds their bytes
+    in content instead. Pass a context to share its session, caches and
+    dedup index between calls, otherwise one is created from the record
+    and closed when the iteration ends.
+    """
+    argument = get_default_record()
+    argument.update(record)
+    url_parm_json_file = url_parm_json_file if url_parm_json_file is not None else load_url_parameters()
+    owns_context = context is None
+
+    if owns_context:
+        context = await DownloadContext.from_settings(argument)
+
+    # bounded, so downloads wait for a slow consumer instead of buffering every result
+    results = asyncio.Queue(maxsize=max(1, int(argument['max_in_flight'])))
+
+    async def run_record() -> None:
+        cancelled = False
+
+        try:
+            await run_downloaders(url_parm_json_file, iter_expanded_records([argument]), context,
+                                  argument['max_active_records'], results.put, return_bytes)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # once the iteration is left nobody drains the queue, the end marker would wait forever
+            if not cancelled:
+                await results.put(None)
+
+    record_runner = asyncio.ensure_future(run_record())
+
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield result
+
+        await record_runner
+    finally:
+        record_runner.cancel()
+        await asyncio.gather(record_runner, return_exceptions=True)
+
+        if owns_context:
+            await context.close()
+
+
+async def download_arguments(url_parm_json_file: dict, arguments, settings: dict) -> DownloadContext:
+    """
+    Runs a downloader for every argument, a list or an async iterator, on
+    one shared context and returns the closed context with its run metrics.
+    """
+    context = await DownloadContext.from_settings(settings)
+
+    progress_reporter = None
+
+    if settings['adaptive_concurrency'] and not settings['silent_mode']:
+        progress_reporter = asyncio.ensure_future(report_host_limits(context, settings['progress_interval']))
+
+    try:
+        await run_downloaders(url_parm_json_file, arguments, context, settings['max_active_records'])
+    finally:
+        if progress_reporter is not None:
+            progress_reporter.cancel()
+
+        await context.close()
+
+    record_run_counters(context)
+
+    return context
+
+
+def run_worker(url_parm_json_file: dict, arguments: list, settings: dict) -> RunMetrics:
+    """
+    Downloads a shard of the arguments in a worker process, with its own
+    event loop, session and browsers.
+    """
+    context = asyncio.run(download_arguments(url_parm_json_file, arguments, settings))
+
+    return context.metrics
+
+
+def record_run_counters(context: DownloadContext) -> None:
+    """
+    Copies the dedup, coalescing and cache counters into the run metrics.
+    """
+    metrics = context.metrics
+    metrics.set_counter('coalesced_requests', context.single_flight.coalesced)
+
+    if context.dedup_index:
+        metrics.set_counter('duplicate_urls', context.dedup_index.duplicate_urls)
+        metrics.set_counter('duplicate_contents', context.dedup_index.duplicate_contents)
+
+    if context.search_cache:
+        metrics.set_counter('search_cache_hits', context.search_cache.hits)
+        metrics.set_counter('search_cache_misses', context.search_cache.misses)
+
+
+async def write_run_metrics(metrics: RunMetrics, settings: dict) -> None:
+    """
+    Prints the run counters and writes the JSON run report and the optional Prometheus text file.
+    """
+    counters = metrics.counters
+
+    if 'duplicate_urls' in counters:
+        print(f'Duplicates linked: {counters["duplicate_urls"]} urls,',
+              f'{counters["duplicate_contents"]} images')
+
+    print(f'Requests: {counters.get("requests", 0)} sent,',
+          f'{counters.get("coalesced_requests", 0)} coalesced into requests already in flight')
+
+    if 'search_cache_hits' in counters:
+        print(f'Search cache: {counters["search_cache_hits"]} hits, {counters["search_cache_misses"]} misses')
+
+    if 'resumed_downloads' in counters:
+        print(f'Resumed downloads: {counters["resumed_downloads"]}, {counters["resumed_bytes"]} bytes not fetched again')
+
+    main_directory = Path(settings['output_directory'] or "Downloads")
+
+    try:
+        if settings['metrics_report']:
+            await metrics.write_report(main_directory.joinpath(settings['metrics_report']))
+
+        if settings['prometheus_file']:
+            await metrics.write_prometheus(settings['prometheus_file'])
+    except OSError as error:
+        print(f'Could not write run metrics: {error}')
+
+
+async def serve(url_parm_json_file: dict, settings: dict) -> None:
+    """
+    Runs the download service on settings['serve'] until interrupted, every
+    job shares one context so sessions, browsers, caches and the dedup
+    index stay warm between jobs.
+    """
+    context = await DownloadContext.from_settings(settings)
+
+    async def run_records(records: list, result_handler) -> None:
+        try:
+            await run_downloaders(url_parm_json_file, iter_expanded_records(records), context,
+                                  settings['max_active_records'], result_handler)
+        finally:
+            await context.finish_job()
+
+    def get_metrics() -> RunMetrics:
+        record_run_counters(context)
+        return context.metrics
+
+    # aiohttp.web is only needed by the service
+    from download_service import DownloadService
+
+    service = DownloadService(run_records, settings, settings['max_active_jobs'], get_metrics)
+
+    stop = asyncio.Event()
+
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_event_loop().add_signal_handler(stop_signal, stop.set)
+        except NotImplementedError:
+            # no signal handlers on Windows event loops, Ctrl+C still interrupts the run
+            pass
+
+    try:
+        address = await service.start(settings['serve'])
+        print(f'Serving download jobs on {address}')
+
+        await stop.wait()
+        print('Stopping download service')
+    finally:
+        await service.close()
+        await context.close()
+        record_run_counters(context)
+        await write_run_metrics(context.metrics, settings)
+
+
+async def main() -> None:
+    """
+    Main function of google_image_downloader_async.
+    """
+    url_parm_json_file, records, settings = await parse_config()
+
+    if settings['serve']:
+        await serve(url_parm_json_file, settings)
+        return
+
+    print('Starting image download')
+
+    if int(settings['workers']) > 1:
+        arguments = await expand_records(records)
+        from sharded_run import WorkerError, run_workers
+
+        try:
+            metrics = await run_workers(run_worker, url_parm_json_file, arguments, settings)
+        except WorkerError as error:
+            await write_run_metrics(error.metrics, settings)
+            raise
+    else:
+        arguments = iter_expanded_records(records)
+        context = await download_arguments(url_parm_json_file, arguments, settings)
+        metrics = context.metrics
+
+    await write_run_metrics(metrics, settings)
 
     print('Finished image download')
 
@@ -0,0 +1,110 @@
+"""
+Google_images_download_async image filter module.
+"""
+
+FORMAT_ALIASES = {'jpg': 'jpeg', 'pjpeg': 'jpeg', 'svg+xml': 'svg', 'x-icon': 'ico',
+                  'vnd.microsoft.icon': 'ico', 'x-ms-bmp': 'bmp'}
+
+
+def normalize_format(image_format: str) -> str:
+    """
+    Returns the format of a search result or the subtype of a Content-Type in
+    one spelling, jpg and image/jpeg both become jpeg.
+    """
+    image_format = (image_format or '').strip().lower()
+
+    return FORMAT_ALIASES.get(image_format, image_format)
+
+
+def to_number(value) -> float:
+    """
+    Returns value as a float, None when it is missing or not a number.
+    """
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ImageFilter():
+    """
+    Rejects images the run would discard anyway before they are downloaded.
+
+    Search results are checked against their parsed width, height, aspect
+    ratio and format before a download is scheduled, the response of a
+    download is checked against its Content-Type before the body is read,
+    as its Content-Length already is against max_image_bytes. Values a
+    result or response does not give are let through. Bounds of 0 and empty
+    formats are not checked.
+    """
+    def __init__(self, min_width: int = 0, max_width: int = 0, min_height: int = 0, max_height: int = 0,
+                 formats: str = '', min_aspect: float = 0, max_aspect: float = 0):
+        self.min_width = int(min_width or 0)
+        self.max_width = int(max_width or 0)
+        self.min_height = int(min_height or 0)
+        self.max_height = int(max_height or 0)
+        self.formats = {normalize_format(image_format) for image_format in (formats or '').split(',')
+                        if image_format.strip()}
+        self.min_aspect = float(min_aspect or 0)
+        self.max_aspect = float(max_aspect or 0)
+
+    @classmethod
+    def from_argument(cls, argument: dict) -> 'ImageFilter':
+        """
+        Returns the filter of a record. exact_size and format, otherwise only
+        sent to Google as hints, are enforced when no bounds or formats are given.
+        """
+        min_width, max_width = argument.get('min_width'), argument.get('max_width')
+        min_height, max_height = argument.get('min_height'), argument.get('max_height')
+
+        if argument.get('exact_size') and not any((min_width, max_width, min_height, max_height)):
+            width, height = (int(size) for size in argument['exact_size'].split(','))
+            min_width, max_width, min_height, max_height = width, width, height, height
+
+        return cls(min_width, max_width, min_height, max_height,
+                   argument.get('allowed_formats') or argument.get('format') or '',
+                   argument.get('min_aspect'), argument.get('max_aspect'))
+
+    def check_meta_data(self, image_meta_data: dict) -> str:
+        """
+        Returns why a search result is rejected, an empty string when it passes.
+        """
+        width = to_number(image_meta_data.get('image_width'))
+        height = to_number(image_meta_data.get('image_height'))
+        image_format = normalize_format(image_meta_data.get('image_format'))
+
+        if width is not None:
+            if self.min_width and width < self.min_width:
+                return f'width {width:g} is below {self.min_width}'
+            if self.max_width and width > self.max_width:
+                return f'width {width:g} is above {self.max_width}'
+
+        if height is not None:
+            if self.min_height and height < self.min_height:
+                return f'height {height:g} is below {self.min_height}'
+            if self.max_height and height > self.max_height:
+                return f'height {height:g} is above {self.max_height}'
+
+        if width and height:
+            if self.min_aspect and width / height < self.min_aspect:
+                return f'aspect ratio {width / height:.2f} is below {self.min_aspect:g}'
+            if self.max_aspect and width / height > self.max_aspect:
+                return f'aspect ratio {width / height:.2f} is above {self.max_aspect:g}'
+
+        if self.formats and image_format and image_format not in self.formats:
+            return f'format {image_format} is not allowed'
+
+        return ''
+
+    def check_headers(self, headers) -> str:
+        """
+        Returns why a response is rejected from its headers, an empty string when it passes.
+        """
+        content_type = (headers.get('Content-Type') or '').split(';')[0].strip().lower()
+
+        if self.formats and content_type and content_type != 'application/octet-stream':
+            main_type, _, sub_type = content_type.partition('/')
+            if main_type != 'image' or normalize_format(sub_type) not in self.formats:
+                return f'content type {content_type} is not allowed'
+
+        return ''
@@ -0,0 +1,116 @@
+"""
+Google_images_download_async log sink module.
+"""
+
+# Builtin imports:
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+LOG_EXECUTOR = None
+
+
+def get_log_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread every log sink of the process writes on, started on first use.
+    """
+    global LOG_EXECUTOR
+
+    if LOG_EXECUTOR is None:
+        LOG_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log')
+
+    return LOG_EXECUTOR
+
+
+class LogSink():
+    """
+    Appends the records of a log file, kept open for the whole run.
+
+    Records are buffered and written batch_size at a time, or flush_interval
+    seconds after the first buffered one, on the thread shared by every log
+    sink. close() writes whatever is left, a later record opens the file
+    again. log_format text writes time stamp: fields
+    separated by tabs, json writes one JSON object per line. Both start with
+    the time stamp so logs of several workers merge in time order.
+    """
+    def __init__(self, log_path: str, log_format: str = 'text', batch_size: int = 1000,
+                 flush_interval: float = 1.0):
+        self.log_path = Path(log_path)
+        self.log_format = log_format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.file = None
+        self.pending = []
+        self.flush_task = None
+
+    async def run(self, function, *args):
+        """
+        Runs function on the log thread.
+        """
+        return await asyncio.get_event_loop().run_in_executor(get_log_executor(), function, *args)
+
+    def format_record(self, fields: dict) -> str:
+        """
+        """
+        time_stamp = datetime.now().isoformat(sep=' ', timespec='microseconds')
+
+        if self.log_format == 'json':
+            return json.dumps({'time': time_stamp, **fields}, default=str) + '\n'
+
+        return f'{time_stamp}: ' + '\t'.join(str(value) for value in fields.values()) + '\n'
+
+    def write_lines(self, lines: list) -> None:
+        """
+        """
+        if self.file is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.log_path, 'a')
+
+        self.file.write(''.join(lines))
+        self.file.flush()
+
+    async def write(self, **fields) -> None:
+        """
+        Buffers a record of fields, such as message=... for the error log.
+        """
+        self.pending.append(self.format_record(fields))
+
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self) -> None:
+        """
+        """
+        await asyncio.sleep(self.flush_interval)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Writes the buffered records.
+        """
+        lines, self.pending = self.pending, []
+
+        if lines:
+            await self.run(self.write_lines, lines)
+
+    async def close(self) -> None:
+        """
+        Writes the buffered records and closes the log file.
+        """
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+
+        await self.flush()
+
+        def close_file():
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+        await self.run(close_file)
@@ -0,0 +1,172 @@
+"""
+Google_images_download_async metadata index module.
+"""
+
+# Builtin imports:
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+METADATA_INDEX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    search_url TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    keywords TEXT,
+    image_format TEXT,
+    image_width INTEGER,
+    image_height INTEGER,
+    image_description TEXT,
+    image_host TEXT,
+    image_source TEXT,
+    image_thumbnail_url TEXT,
+    position INTEGER,
+    found REAL NOT NULL,
+    PRIMARY KEY (search_url, image_url)
+);
+CREATE TABLE IF NOT EXISTS downloads (
+    image_url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    file_path TEXT,
+    archive_member TEXT,
+    file_size INTEGER,
+    content_hash TEXT,
+    seconds REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (image_url, kind, file_path, archive_member)
+);
+CREATE INDEX IF NOT EXISTS results_image_url ON results (image_url);
+CREATE INDEX IF NOT EXISTS results_image_host ON results (image_host);
+CREATE INDEX IF NOT EXISTS downloads_content_hash ON downloads (content_hash);
+CREATE UNIQUE INDEX IF NOT EXISTS downloads_key ON downloads (image_url, kind, IFNULL(file_path, ''),
+                                                              IFNULL(archive_member, ''));
+'''
+
+RESULT_COLUMNS = ('image_format', 'image_width', 'image_height', 'image_description', 'image_host',
+                  'image_source', 'image_thumbnail_url')
+
+
+class MetadataIndex():
+    """
+    Queryable SQLite index of every parsed search result and of the outcome
+    of every download.
+
+    results holds the formatted metadata of each image a search returned,
+    whether or not it was downloaded, downloads the status, file, size,
+    hash and download time of each image and thumbnail at every file or
+    archive member it was saved to. Rows are buffered
+    and written batch_size at a time on a dedicated thread.
+    """
+    def __init__(self, index_path: str, batch_size: int = 500):
+        self.index_path = Path(index_path)
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metadata')
+        self.connection = None
+        self.pending_results = []
+        self.pending_downloads = []
+
+    async def run(self, function, *args):
+        """
+        Runs function on the index thread.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, function, *args)
+
+    async def open(self) -> None:
+        """
+        Opens the index, creating it if needed.
+        """
+        await self.run(self.connect)
+
+    def connect(self) -> None:
+        """
+        """
+        os.makedirs(self.index_path.parent, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.index_path))
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(METADATA_INDEX_SCHEMA)
+        self.connection.commit()
+
+    def write(self, results: list, downloads: list) -> None:
+        """
+        """
+        self.connection.executemany(f'INSERT OR REPLACE INTO results VALUES ({", ".join("?" * 12)})', results)
+        self.connection.executemany(f'INSERT OR REPLACE INTO downloads VALUES ({", ".join("?" * 9)})', downloads)
+        self.connection.commit()
+
+    async def flush(self) -> None:
+        """
+        Writes the buffered rows.
+        """
+        results, self.pending_results = self.pending_results, []
+        downloads, self.pending_downloads = self.pending_downloads, []
+
+        if results or downloads:
+            await self.run(self.write, results, downloads)
+
+    async def record_results(self, search_url: str, keywords: str, image_meta_data: list) -> None:
+        """
+        Buffers the formatted metadata of the images a search returned.
+        """
+        found = time.time()
+
+        for position, formated_image_meta_data in enumerate(image_meta_data):
+            self.pending_results.append((search_url, formated_image_meta_data['image_link'], keywords,
+                                         *(formated_image_meta_data.get(column) for column in RESULT_COLUMNS),
+                                         position, found))
+
+        if len(self.pending_results) + len(self.pending_downloads) >= self.batch_size:
+            await self.flush()
+
+    async def record_download(self, result) -> None:
+        """
+        Buffers the outcome of a DownloadResult.
+        """
+        self.pending_downloads.append((result.image_url, result.kind, result.status,
+                                       str(result.file_path) if result.file_path is not None else None,
+                                       result.archive_member, result.file_size, result.content_hash,
+                                       result.seconds, time.time()))
+
+        if len(self.pending_results) + len(self.pending_downloads) >= self.batch_size:
+            await self.flush()
+
+    async def merge(self, index_path: str) -> None:
+        """
+        Copies the rows of another index into this one, keeping the latest download outcomes.
+        """
+        await self.flush()
+
+        def copy_rows():
+            self.connection.execute('ATTACH DATABASE ? AS other', (str(index_path),))
+
+            try:
+                self.connection.execute('INSERT OR REPLACE INTO results SELECT * FROM other.results')
+                self.connection.execute('''INSERT OR REPLACE INTO downloads SELECT * FROM other.downloads AS o
+                                           WHERE NOT EXISTS (SELECT 1 FROM downloads AS d
+                                                             WHERE d.image_url = o.image_url
+                                                             AND d.kind = o.kind
+                                                             AND d.file_path IS o.file_path
+                                                             AND d.archive_member IS o.archive_member
+                                                             AND d.updated >= o.updated)''')
+                self.connection.commit()
+            finally:
+                self.connection.execute('DETACH DATABASE other')
+
+        await self.run(copy_rows)
+
+    async def close(self) -> None:
+        """
+        Writes the buffered rows and closes the index.
+        """
+        await self.flush()
+
+        def disconnect():
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+        await self.run(disconnect)
+        self.executor.shutdown()
@@ -0,0 +1,73 @@
+"""
+Google_images_download_async rate limiting module.
+"""
+
+# Builtin imports:
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket():
+    """
+    Hands out tokens at a fixed rate, allowing bursts of up to capacity tokens.
+    """
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = None
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it.
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter():
+    """
+    Keeps one token bucket per host. Google search hosts and image hosts
+    have separate budgets given as the delay in seconds between two
+    requests to the same host, a delay of 0 leaves the host unlimited.
+    """
+    def __init__(self, search_delay: float = 0, image_delay: float = 0):
+        self.search_delay = float(search_delay or 0)
+        self.image_delay = float(image_delay or 0)
+        self.buckets = {}
+
+    @staticmethod
+    def is_search_host(host: str) -> bool:
+        """
+        Returns True for google search hosts, image CDNs such as gstatic are not search hosts.
+        """
+        return host == 'google.com' or host.startswith('google.') or '.google.' in host
+
+    async def acquire(self, url: str) -> None:
+        """
+        Waits for the budget of the url's host.
+        """
+        host = urlsplit(url).hostname or ''
+        delay = self.search_delay if self.is_search_host(host) else self.image_delay
+
+        if delay <= 0:
+            return
+
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(1 / delay)
+
+        await self.buckets[host].acquire()
@@ -0,0 +1,53 @@
+"""
+Google_images_download_async result page parsing module.
+"""
+
+# Builtin imports:
+import json
+
+RG_META_MARKER = 'rg_meta notranslate'
+
+
+def decode_image_meta_data(content_raw: str) -> dict:
+    """
+    Decodes the json object of a single rg_meta div.
+
+    Pages escape the object with \\uXXXX sequences that json already
+    understands, the unicode_escape round-trip is only needed for the
+    rare object that uses escapes json rejects.
+    """
+    try:
+        return json.loads(content_raw)
+    except json.JSONDecodeError:
+        content_decode = bytes(content_raw, "utf-8").decode("unicode_escape")
+        return json.loads(content_decode)
+
+
+def iter_image_meta_data(page: str):
+    """
+    Yields the metadata dict of every rg_meta div in page.
+
+    The page is walked once with a moving offset so only the json of each
+    item is copied, items that cannot be decoded are skipped.
+    """
+    position = 0
+
+    while True:
+        start_line = page.find(RG_META_MARKER, position)
+        if start_line == -1:
+            return
+
+        start_content = page.find('{', start_line + len(RG_META_MARKER))
+        if start_content == -1:
+            return
+
+        end_content = page.find('</div>', start_content + 1)
+        if end_content == -1:
+            return
+
+        position = end_content + len('</div>')
+
+        try:
+            yield decode_image_meta_data(page[start_content:end_content])
+        except (UnicodeError, json.JSONDecodeError):
+            continue
@@ -0,0 +1,168 @@
+"""
+Google_images_download_async retry policy module.
+"""
+
+# Builtin imports:
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+RETRYABLE_ERROR_CLASSES = ('connect', 'timeout', 'throttled', 'server', 'disconnected')
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Returns the seconds to wait from a Retry-After header given as seconds
+    or as an HTTP date, None when missing or malformed.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker():
+    """
+    Stops requests to a host after threshold consecutive failures. Once
+    cooldown seconds have passed a single trial request is let through,
+    a success closes the circuit and a failure keeps it open.
+    """
+    def __init__(self, threshold: int = 5, cooldown: float = 60):
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.failures = {}
+        self.opened = {}
+
+    def allow(self, host: str) -> bool:
+        """
+        Returns True when a request to host may be made.
+        """
+        opened = self.opened.get(host)
+
+        if opened is None:
+            return True
+
+        if time.monotonic() - opened >= self.cooldown:
+            self.opened[host] = time.monotonic()
+            return True
+
+        return False
+
+    def record_success(self, host: str) -> None:
+        """
+        """
+        self.failures.pop(host, None)
+        self.opened.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        """
+        """
+        self.failures[host] = self.failures.get(host, 0) + 1
+
+        if self.threshold and self.failures[host] >= self.threshold:
+            self.opened[host] = time.monotonic()
+
+
+class RetryPolicy():
+    """
+    Classifies request errors and decides whether and when to retry them,
+    using exponential backoff with full jitter and honouring Retry-After.
+    """
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 30,
+                 breaker_threshold: int = 5, breaker_cooldown: float = 60):
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.circuit_breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """
+        """
+        return urlsplit(url).hostname or ''
+
+    @staticmethod
+    def classify(error: Exception) -> str:
+        """
+        Returns the class of a request error: connect, timeout, throttled,
+        server, client, disconnected, range, invalid or other. range is a
+        resumed download whose byte range was refused, which says nothing
+        about the host's health and is restarted without a retry.
+        """
+        # errors to classify come from requests, which have loaded aiohttp already
+        import aiohttp
+
+        status = getattr(error, 'status', None)
+
+        if isinstance(error, aiohttp.client_exceptions.InvalidURL):
+            return 'invalid'
+        if isinstance(error, asyncio.TimeoutError):
+            return 'timeout'
+        if isinstance(error, aiohttp.client_exceptions.ClientConnectorError):
+            return 'connect'
+        # a connection reset mid request, after ClientConnectorError which subclasses it
+        if isinstance(error, (aiohttp.client_exceptions.ServerDisconnectedError,
+                              aiohttp.client_exceptions.ClientPayloadError,
+                              aiohttp.client_exceptions.ClientOSError)):
+            return 'disconnected'
+        if status == 429:
+            return 'throttled'
+        if status == 416:
+            return 'range'
+        if isinstance(status, int) and status >= 500:
+            return 'server'
+        if isinstance(status, int) and 400 <= status < 500:
+            return 'client'
+
+        return 'other'
+
+    def get_retry_delay(self, error: Exception, attempts: int, max_retries: int) -> float:
+        """
+        Returns the seconds to wait before retrying after the given number of
+        attempts, None when the error should not be retried.
+        """
+        if attempts > max_retries or self.classify(error) not in RETRYABLE_ERROR_CLASSES:
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+        retry_after = getattr(error, 'retry_after', None)
+
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            delay = max(delay, retry_after)
+
+        return delay
+
+    def allow(self, url: str) -> bool:
+        """
+        Returns False while the circuit of the url's host is open.
+        """
+        return self.circuit_breaker.allow(self.get_host(url))
+
+    def record_success(self, url: str) -> None:
+        """
+        """
+        self.circuit_breaker.record_success(self.get_host(url))
+
+    def record_failure(self, url: str, error: Exception) -> None:
+        """
+        Counts failures that show the host is unhealthy towards its circuit breaker.
+        """
+        if self.classify(error) in RETRYABLE_ERROR_CLASSES:
+            self.circuit_breaker.record_failure(self.get_host(url))
@@ -0,0 +1,202 @@
+"""
+Google_images_download_async run metrics module.
+"""
+
+# Builtin imports:
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROMETHEUS_PREFIX = 'google_images_download'
+
+
+class PhaseMetrics():
+    """
+    Count, errors, bytes and latency histogram of one phase on one host.
+    """
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float, size: int = 0, error: bool = False) -> None:
+        """
+        """
+        self.count += 1
+        self.errors += int(error)
+        self.bytes += size
+        self.seconds += seconds
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def merge(self, other) -> None:
+        """
+        Adds the observations of other to these.
+        """
+        self.count += other.count
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.seconds += other.seconds
+        self.bucket_counts = [mine + theirs for mine, theirs in zip(self.bucket_counts, other.bucket_counts)]
+
+    def to_dict(self) -> dict:
+        """
+        """
+        bucket_bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+
+        return {'count': self.count,
+                'errors': self.errors,
+                'bytes': self.bytes,
+                'seconds': round(self.seconds, 6),
+                'latency_histogram': dict(zip(bucket_bounds, self.bucket_counts))}
+
+
+class PhaseTimer():
+    """
+    Handed out by RunMetrics.time_phase(), callers set failed or size as they learn them.
+    """
+    def __init__(self):
+        self.failed = False
+        self.size = 0
+
+
+class RunMetrics():
+    """
+    Collects per phase and per host timings of a run: search, browser,
+    parse, request and write.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self.counters = {}
+
+    def observe(self, phase: str, seconds: float, host: str = '', size: int = 0, error: bool = False) -> None:
+        """
+        Records one observation of phase on host.
+        """
+        if (phase, host) not in self.phases:
+            self.phases[(phase, host)] = PhaseMetrics()
+
+        self.phases[(phase, host)].observe(seconds, size, error)
+
+    @contextmanager
+    def time_phase(self, phase: str, host: str = ''):
+        """
+        Times the block as one observation of phase, exceptions count as errors.
+        """
+        timer = PhaseTimer()
+        started = time.perf_counter()
+
+        try:
+            yield timer
+        except BaseException:
+            timer.failed = True
+            raise
+        finally:
+            self.observe(phase, time.perf_counter() - started, host, timer.size, timer.failed)
+
+    def merge(self, other) -> None:
+        """
+        Adds the observations and counters of another run, such as a worker process, to these.
+        """
+        self.started = min(self.started, other.started)
+
+        for key, phase_metrics in other.phases.items():
+            if key not in self.phases:
+                self.phases[key] = PhaseMetrics()
+            self.phases[key].merge(phase_metrics)
+
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_counter(self, name: str, value: int) -> None:
+        """
+        """
+        self.counters[name] = value
+
+    def add_counter(self, name: str, value: int = 1) -> None:
+        """
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_report(self) -> dict:
+        """
+        Returns the run report: totals per phase with a per host breakdown.
+        """
+        phases = {}
+
+        for (phase, host), phase_metrics in sorted(self.phases.items()):
+            if phase not in phases:
+                phases[phase] = {'total': PhaseMetrics(), 'hosts': {}}
+            phases[phase]['total'].merge(phase_metrics)
+            if host:
+                phases[phase]['hosts'][host] = phase_metrics.to_dict()
+
+        for phase in phases.values():
+            phase['total'] = phase['total'].to_dict()
+
+        return {'started': self.started,
+                'elapsed': round(time.time() - self.started, 6),
+                'phases': phases,
+                'counters': dict(self.counters)}
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        phases = sorted(self.phases.items())
+        lines = [f'# TYPE {PROMETHEUS_PREFIX}_phase_seconds histogram']
+
+        for (phase, host), phase_metrics in phases:
+            labels = f'phase="{phase}",host="{host}"'
+            cumulative_count = 0
+
+            for bound, bucket_count in zip(list(LATENCY_BUCKETS) + ['+Inf'], phase_metrics.bucket_counts):
+                cumulative_count += bucket_count
+                lines.append(f'{PROMETHEUS_PREFIX}_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative_count}')
+
+            lines.append(f'{PROMETHEUS_PREFIX}_phase_seconds_sum{{{labels}}} {phase_metrics.seconds}')
+            lines.append(f'{PROMETHEUS_PREFIX}_phase_seconds_count{{{labels}}} {phase_metrics.count}')
+
+        for name in ('errors', 'bytes'):
+            lines.append(f'# TYPE {PROMETHEUS_PREFIX}_phase_{name}_total counter')
+            for (phase, host), phase_metrics in phases:
+                lines.append(f'{PROMETHEUS_PREFIX}_phase_{name}_total{{phase="{phase}",host="{host}"}} ' +
+                             f'{getattr(phase_metrics, name)}')
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {PROMETHEUS_PREFIX}_{name} gauge')
+            lines.append(f'{PROMETHEUS_PREFIX}_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    async def write_report(self, report_path: str) -> None:
+        """
+        Writes the JSON run report.
+        """
+        await self.write_file(report_path, json.dumps(self.to_report(), indent=4))
+
+    async def write_prometheus(self, prometheus_path: str) -> None:
+        """
+        Writes the Prometheus text file, replacing the old one atomically for textfile collectors.
+        """
+        await self.write_file(prometheus_path, self.to_prometheus())
+
+    @staticmethod
+    async def write_file(file_path: str, content: str) -> None:
+        """
+        """
+        import aiofiles
+
+        part_file_path = Path(f'{file_path}.part')
+        os.makedirs(Path(file_path).parent, exist_ok=True)
+
+        async with aiofiles.open(part_file_path, 'w') as file:
+            await file.write(content)
+
+        os.replace(part_file_path, file_path)
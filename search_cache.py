@@ -0,0 +1,126 @@
+"""
+Google_images_download_async search result page cache module.
+"""
+
+# Builtin imports:
+import hashlib
+import os
+import time
+from pathlib import Path
+
+
+class SearchCache():
+    """
+    On disk cache of raw search result pages.
+
+    Each page is stored in its own file named after the hash of its key.
+    The file's modification time is the time it was stored and is checked
+    against ttl, its access time is refreshed on every hit and the least
+    recently used pages are evicted once the cache grows over max_bytes.
+    The size of the cache is counted from the directory on the first put
+    and kept as a running total after that, the directory is only scanned
+    again when the total goes over max_bytes.
+    """
+    def __init__(self, cache_dir: str, ttl: float = 86400, max_bytes: int = 536870912):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.cache_size = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_cache_file_path(self, key: str) -> Path:
+        """
+        """
+        return self.cache_dir.joinpath(f'{hashlib.sha256(key.encode("utf-8")).hexdigest()}.html')
+
+    async def get(self, key: str) -> str:
+        """
+        Returns the cached page of key or None when missing or expired.
+        """
+        import aiofiles
+
+        cache_file_path = self.get_cache_file_path(key)
+
+        try:
+            cache_file_stat = os.stat(cache_file_path)
+            stored = cache_file_stat.st_mtime
+
+            if time.time() - stored > self.ttl:
+                os.remove(cache_file_path)
+                if self.cache_size is not None:
+                    self.cache_size -= cache_file_stat.st_size
+                raise FileNotFoundError(cache_file_path)
+
+            async with aiofiles.open(cache_file_path, 'r', encoding='utf-8') as file:
+                page = await file.read()
+
+            os.utime(cache_file_path, (time.time(), stored))
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return page
+
+    async def put(self, key: str, page: str) -> None:
+        """
+        Stores page under key and evicts pages over the byte budget.
+        """
+        import aiofiles
+
+        cache_file_path = self.get_cache_file_path(key)
+        part_file_path = Path(f'{cache_file_path}.part')
+
+        try:
+            replaced_size = cache_file_path.stat().st_size
+        except OSError:
+            replaced_size = 0
+
+        try:
+            async with aiofiles.open(part_file_path, 'w', encoding='utf-8') as file:
+                await file.write(page)
+
+            os.replace(part_file_path, cache_file_path)
+            stored_size = cache_file_path.stat().st_size
+        except OSError:
+            return
+
+        if self.cache_size is None:
+            await self.evict()
+            return
+
+        self.cache_size += stored_size - replaced_size
+
+        if self.cache_size > self.max_bytes:
+            await self.evict()
+
+    async def evict(self) -> None:
+        """
+        Removes the least recently used pages until the cache fits in
+        max_bytes and recounts its size from the directory.
+        """
+        entries = []
+
+        for cache_file_path in self.cache_dir.glob('*.html'):
+            try:
+                cache_file_stat = cache_file_path.stat()
+            except OSError:
+                continue
+            entries.append((cache_file_stat.st_atime, cache_file_stat.st_size, cache_file_path))
+
+        cache_size = sum(size for _, size, _ in entries)
+
+        for _, size, cache_file_path in sorted(entries):
+            if cache_size <= self.max_bytes:
+                break
+
+            try:
+                os.remove(cache_file_path)
+            except OSError:
+                continue
+            cache_size -= size
+
+        self.cache_size = cache_size
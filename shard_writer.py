@@ -0,0 +1,150 @@
+"""
+Google_images_download_async tar shard writer module.
+"""
+
+# Builtin imports:
+import asyncio
+import io
+import json
+import math
+import os
+import re
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+
+class ShardWriter():
+    """
+    Appends images and their metadata to size capped tar shards instead of
+    writing one file per image.
+
+    Shards are named <shard_prefix>-000000.tar, numbered on from the shards
+    already in directory. Each image is stored under its file name with its
+    metadata next to it as <file name stem>.json, in the WebDataset layout.
+    Every image is also appended to <shard_prefix>-index.jsonl with its
+    shard, member name, data offset and size so single images can be read
+    back without scanning the shards.
+
+    All writes run in order on a single dedicated thread.
+    """
+    def __init__(self, directory: str, max_shard_bytes: int = 1073741824, shard_prefix: str = 'images'):
+        self.directory = Path(directory)
+        self.max_shard_bytes = int(max_shard_bytes)
+        self.shard_prefix = shard_prefix
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shard')
+        self.shard_number = None
+        self.shard_path = None
+        self.tar = None
+        self.index_file = None
+
+    async def run(self, function, *args):
+        """
+        Runs function on the shard writer thread.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, function, *args)
+
+    def get_next_shard_number(self) -> int:
+        """
+        """
+        shard_pattern = re.compile(rf'^{re.escape(self.shard_prefix)}-(\d+)\.tar$')
+        shard_numbers = [int(match.group(1)) for match in
+                         (shard_pattern.match(path.name) for path in self.directory.glob('*.tar')) if match]
+
+        return max(shard_numbers) + 1 if shard_numbers else 0
+
+    def open_next_shard(self) -> None:
+        """
+        """
+        if self.tar is not None:
+            self.tar.close()
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.shard_number = self.get_next_shard_number() - 1
+            self.index_file = open(self.directory.joinpath(f'{self.shard_prefix}-index.jsonl'), 'a')
+
+        self.shard_number += 1
+        self.shard_path = self.directory.joinpath(f'{self.shard_prefix}-{self.shard_number:06d}.tar')
+        self.tar = tarfile.open(self.shard_path, 'w')
+
+    def add_member(self, name: str, file, size: int) -> int:
+        """
+        Copies size bytes of file into the shard.
+
+        Return: offset of the member's data in the shard
+        """
+        tar_info = tarfile.TarInfo(name)
+        tar_info.size = size
+        tar_info.mtime = int(time.time())
+        self.tar.addfile(tar_info, file)
+
+        # the data ends the member, padded to whole tar blocks
+        return self.tar.offset - math.ceil(size / tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+    def write_sample(self, name: str, file, size: int, meta_data: dict) -> tuple:
+        """
+        """
+        meta_data_content = json.dumps(meta_data).encode('utf-8')
+
+        if self.tar is None or (self.tar.offset and
+                                self.tar.offset + size + len(meta_data_content) > self.max_shard_bytes):
+            self.open_next_shard()
+
+        offset = self.add_member(name, file, size)
+        self.add_member(str(PurePosixPath(name).with_suffix('.json')), io.BytesIO(meta_data_content),
+                        len(meta_data_content))
+
+        self.index_file.write(json.dumps({'shard': self.shard_path.name, 'member': name, 'offset': offset,
+                                          'size': size, 'image_url': meta_data.get('image_url')}) + '\n')
+        self.index_file.flush()
+
+        return self.shard_path, name
+
+    def write_file_sample(self, name: str, file_path: str, meta_data: dict) -> tuple:
+        """
+        """
+        with open(file_path, 'rb') as file:
+            return self.write_sample(name, file, os.fstat(file.fileno()).st_size, meta_data)
+
+    async def add(self, name: str, content: bytes, meta_data: dict) -> tuple:
+        """
+        Appends an image and its metadata, starting a new shard when the
+        current one would grow past max_shard_bytes.
+
+        Return: path of the shard and name of the image in it
+        """
+        return await self.run(self.write_sample, name, io.BytesIO(content), len(content), meta_data)
+
+    async def add_file(self, name: str, file_path: str, meta_data: dict) -> tuple:
+        """
+        Appends the image stored at file_path like add(), copying it into the
+        shard in blocks rather than reading it into memory.
+
+        Return: path of the shard and name of the image in it
+        """
+        return await self.run(self.write_file_sample, name, file_path, meta_data)
+
+    def finish_shard(self) -> None:
+        """
+        """
+        if self.tar is not None:
+            self.tar.close()
+            self.tar = None
+
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+    async def finish(self) -> None:
+        """
+        Finishes the current shard and the index, the next image starts a new shard.
+        """
+        await self.run(self.finish_shard)
+
+    async def close(self) -> None:
+        """
+        Finishes the current shard and the index.
+        """
+        await self.finish()
+        self.executor.shutdown()
@@ -0,0 +1,209 @@
+"""
+Google_images_download_async multi-process sharded run module.
+"""
+
+# Builtin imports:
+import asyncio
+import heapq
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Third party imports:
+import aiofiles
+
+# Local imports:
+from download_manifest import DownloadManifest
+from metadata_index import MetadataIndex
+from run_metrics import RunMetrics
+
+LOG_ARGUMENTS = ('error_log', 'save_source')
+
+
+class WorkerError(Exception):
+    """
+    Raised when worker processes failed, once the results of the others are merged.
+    """
+    def __init__(self, failures: dict, metrics: RunMetrics):
+        self.failures = failures
+        self.metrics = metrics
+
+    def __str__(self):
+        return ', '.join(f'Worker {worker_number} failed: {error!r}'
+                         for worker_number, error in sorted(self.failures.items()))
+
+
+def get_worker_file_name(file_name: str, worker_number: int) -> str:
+    """
+    Returns the name of a worker's own copy of a file, error_log.txt becomes error_log.worker0.txt.
+    """
+    path = Path(file_name)
+
+    return str(path.with_name(f'{path.stem}.worker{worker_number}{path.suffix}'))
+
+
+def build_worker_arguments(arguments: list, worker_number: int, workers: int) -> list:
+    """
+    Returns the round robin shard of arguments of a worker, writing to its own log files.
+    """
+    shard = []
+
+    for argument in arguments[worker_number::workers]:
+        argument = dict(argument)
+
+        for log_argument in LOG_ARGUMENTS:
+            if argument.get(log_argument):
+                argument[log_argument] = get_worker_file_name(argument[log_argument], worker_number)
+
+        shard.append(argument)
+
+    return shard
+
+
+def build_worker_settings(settings: dict, worker_number: int) -> dict:
+    """
+    Returns the settings of a worker, writing to its own manifest and metadata index.
+    """
+    worker_settings = dict(settings)
+
+    for file_setting in ('manifest', 'metadata_index'):
+        if settings[file_setting]:
+            worker_settings[file_setting] = get_worker_file_name(settings[file_setting], worker_number)
+
+    return worker_settings
+
+
+async def merge_log_files(log_path: Path, worker_log_paths: list) -> None:
+    """
+    Appends the lines of the worker logs to log_path in time stamp order and removes them.
+    """
+    worker_logs = []
+
+    for worker_log_path in worker_log_paths:
+        async with aiofiles.open(worker_log_path, 'r') as file:
+            worker_logs.append((await file.read()).splitlines(keepends=True))
+
+    async with aiofiles.open(log_path, 'a') as file:
+        await file.write(''.join(heapq.merge(*worker_logs)))
+
+    for worker_log_path in worker_log_paths:
+        os.remove(worker_log_path)
+
+
+async def merge_manifests(manifest_path: Path, worker_manifest_paths: list) -> None:
+    """
+    Merges the worker manifests into the manifest at manifest_path and removes them.
+    """
+    manifest = DownloadManifest(manifest_path)
+    await manifest.open()
+
+    try:
+        for worker_manifest_path in worker_manifest_paths:
+            await manifest.merge(worker_manifest_path)
+    finally:
+        await manifest.close()
+
+    remove_sqlite_files(worker_manifest_paths)
+
+
+async def merge_metadata_indexes(index_path: Path, worker_index_paths: list) -> None:
+    """
+    Merges the worker metadata indexes into the index at index_path and removes them.
+    """
+    metadata_index = MetadataIndex(index_path)
+    await metadata_index.open()
+
+    try:
+        for worker_index_path in worker_index_paths:
+            await metadata_index.merge(worker_index_path)
+    finally:
+        await metadata_index.close()
+
+    remove_sqlite_files(worker_index_paths)
+
+
+def remove_sqlite_files(database_paths: list) -> None:
+    """
+    """
+    for database_path in database_paths:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(f'{database_path}{suffix}')
+            except FileNotFoundError:
+                pass
+
+
+async def run_workers(worker, url_parm_json_file: dict, arguments: list, settings: dict) -> RunMetrics:
+    """
+    Shards arguments across settings['workers'] processes that each call
+    worker(url_parm_json_file, shard, worker_settings) and return their
+    RunMetrics, then merges the workers' logs, manifests and metrics.
+    WorkerError is raised with the merged metrics when any worker failed.
+
+    Each worker has its own event loop, session, browsers, dedup index,
+    manifest and metadata index, the search cache on disk is shared.
+    """
+    workers = max(1, min(int(settings['workers']), len(arguments)))
+    main_directory = Path(settings['output_directory'] or "Downloads")
+    worker_settings = [build_worker_settings(settings, worker_number) for worker_number in range(workers)]
+
+    manifest_path = main_directory.joinpath(settings['manifest']) if settings['manifest'] else None
+    worker_manifest_paths = [main_directory.joinpath(worker_setting['manifest']) for worker_setting in worker_settings
+                             if manifest_path is not None]
+
+    if manifest_path is not None and settings['resume'] and manifest_path.exists():
+        for worker_manifest_path in worker_manifest_paths:
+            shutil.copyfile(manifest_path, worker_manifest_path)
+
+    loop = asyncio.get_event_loop()
+
+    # spawn rather than fork, the coordinator's event loop and threads must not leak into the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        results = await asyncio.gather(*[loop.run_in_executor(executor, worker, url_parm_json_file,
+                                                              build_worker_arguments(arguments, worker_number, workers),
+                                                              worker_settings[worker_number])
+                                         for worker_number in range(workers)],
+                                       return_exceptions=True)
+
+    metrics = RunMetrics()
+    failures = {}
+
+    for worker_number, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f'Worker {worker_number} failed: {result!r}')
+            failures[worker_number] = result
+        else:
+            metrics.merge(result)
+
+    worker_manifest_paths = [path for path in worker_manifest_paths if path.exists()]
+    if worker_manifest_paths:
+        await merge_manifests(manifest_path, worker_manifest_paths)
+
+    if settings['metadata_index']:
+        worker_index_paths = [main_directory.joinpath(worker_setting['metadata_index'])
+                              for worker_setting in worker_settings]
+        worker_index_paths = [path for path in worker_index_paths if path.exists()]
+        if worker_index_paths:
+            await merge_metadata_indexes(main_directory.joinpath(settings['metadata_index']), worker_index_paths)
+
+    log_paths = set()
+
+    for argument in arguments:
+        argument_directory = Path(argument.get('output_directory') or "Downloads")
+        for log_argument in LOG_ARGUMENTS:
+            if argument.get(log_argument):
+                log_paths.add(argument_directory.joinpath(argument[log_argument]))
+
+    for log_path in sorted(log_paths):
+        worker_log_paths = [log_path.with_name(get_worker_file_name(log_path.name, worker_number))
+                            for worker_number in range(workers)]
+        worker_log_paths = [path for path in worker_log_paths if path.exists()]
+        if worker_log_paths:
+            await merge_log_files(log_path, worker_log_paths)
+
+    if failures:
+        raise WorkerError(failures, metrics)
+
+    return metrics
@@ -0,0 +1,34 @@
+"""
+Google_images_download_async request coalescing module.
+"""
+
+# Builtin imports:
+import asyncio
+
+
+class SingleFlight():
+    """
+    Shares one in-flight call between every concurrent caller with the same
+    key, later callers await the first caller's result instead of
+    repeating the call.
+    """
+    def __init__(self):
+        self.in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key, function, *args):
+        """
+        Returns the result of function(*args), joining an identical call already in flight.
+        """
+        self.calls += 1
+
+        if key in self.in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.ensure_future(function(*args))
+        self.in_flight[key] = future
+        future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        return await asyncio.shield(future)
@@ -0,0 +1,97 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from adaptive_limiter import AdaptiveLimiter
+
+
+async def run_requests(limiter, count, latency, overloaded=False):
+    """
+    Runs count sequential requests through limiter with the given outcome.
+    """
+    for _ in range(count):
+        await limiter.acquire()
+        await limiter.release(latency, overloaded)
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_while_healthy():
+    """
+    test steady latency without errors raises the limit up to max_limit
+    """
+    limiter = AdaptiveLimiter(2, max_limit=5)
+
+    await run_requests(limiter, 20, 0.05)
+    assert limiter.current_limit > 2
+
+    await run_requests(limiter, 200, 0.05)
+    assert limiter.current_limit == 5
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_limit_once_per_period():
+    """
+    test a burst of overload errors cuts the limit once
+    """
+    limiter = AdaptiveLimiter(16, max_limit=16)
+
+    await run_requests(limiter, 5, None, overloaded=True)
+
+    assert limiter.current_limit == 8
+
+
+@pytest.mark.asyncio
+async def test_rising_latency_cuts_limit():
+    """
+    test p95 latency well above the best seen lowers the limit
+    """
+    limiter = AdaptiveLimiter(8, max_limit=8)
+
+    await run_requests(limiter, 50, 0.01)
+    await run_requests(limiter, 50, 0.5)
+
+    assert limiter.current_limit < 8
+
+
+@pytest.mark.asyncio
+async def test_limit_recovers_after_latency_settles_higher():
+    """
+    test a lasting rise in latency becomes the new baseline so the limit grows again
+    """
+    limiter = AdaptiveLimiter(8, max_limit=16)
+
+    await run_requests(limiter, 50, 0.01)
+    await run_requests(limiter, 50, 0.2)
+    shifted_limit = limiter.current_limit
+
+    await run_requests(limiter, 300, 0.2)
+
+    assert limiter.baseline_latency > 0.1
+    assert limiter.current_limit > shifted_limit
+
+
+@pytest.mark.asyncio
+async def test_fixed_limit_caps_in_flight():
+    """
+    test min_limit equal to max_limit keeps a fixed cap
+    """
+    limiter = AdaptiveLimiter(2, min_limit=2, max_limit=2)
+    peak = []
+
+    async def request():
+        await limiter.acquire()
+        peak.append(limiter.in_flight)
+        await asyncio.sleep(0.01)
+        await limiter.release(0.01, overloaded=True)
+
+    await asyncio.gather(*[request() for _ in range(6)])
+
+    assert max(peak) == 2
+    assert limiter.current_limit == 2
@@ -0,0 +1,145 @@
+#Builtin imports:
+import os
+import sys
+import time
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from browser_pool import BrowserError, BrowserPool
+
+
+class FakeBrowserPool(BrowserPool):
+    """
+    Browser pool that scrolls fake browsers instead of launching chrome.
+    """
+    def __init__(self, *args, scroll_time=0.01, scroll_error=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scroll_time = scroll_time
+        self.scroll_error = scroll_error
+        self.launched = 0
+
+    def launch_browser(self):
+        self.launched += 1
+        browser = f'browser {self.launched}'
+        self.browsers.append(browser)
+        return browser
+
+    def quit_browser(self, browser):
+        self.browsers.remove(browser)
+
+    def scroll_page(self, browser, google_url, number_of_pages, deadline):
+        time.sleep(self.scroll_time)
+        if self.scroll_error is not None:
+            raise self.scroll_error
+        return f'{browser} {google_url} {number_of_pages}'
+
+
+@pytest.mark.asyncio
+async def test_browsers_are_reused():
+    """
+    test jobs reuse warm browsers instead of launching one per search
+    """
+    browser_pool = FakeBrowserPool(size=2)
+
+    results = await asyncio.gather(*[browser_pool.scroll(f'url {number}', 2) for number in range(6)])
+    results.append(await browser_pool.scroll('url 6', 2))
+    await browser_pool.close()
+
+    assert len(results) == 7
+    assert browser_pool.launched == 2
+    assert browser_pool.browsers == []
+
+
+@pytest.mark.asyncio
+async def test_scroll_does_not_block_event_loop():
+    """
+    test other coroutines keep running while a browser scrolls
+    """
+    browser_pool = FakeBrowserPool(size=1, scroll_time=0.2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(browser_pool.scroll('url', 1), ticker())
+    await browser_pool.close()
+
+    assert ticks[-1] - ticks[0] < 0.2
+
+
+@pytest.mark.asyncio
+async def test_scroll_times_out():
+    """
+    test jobs running longer than job_timeout raise asyncio.TimeoutError
+    """
+    browser_pool = FakeBrowserPool(size=1, job_timeout=0.05, grace_period=0.05, scroll_time=0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await browser_pool.scroll('url', 1)
+
+    await browser_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_scroll_returns_after_its_deadline_within_the_grace_period():
+    """
+    test a job that stops at its deadline and finishes shortly after still returns its page
+    """
+    browser_pool = FakeBrowserPool(size=1, job_timeout=0.05, grace_period=1, scroll_time=0.1)
+
+    page_source = await browser_pool.scroll('url', 1)
+    await browser_pool.close()
+
+    assert page_source == 'browser 1 url 1'
+
+
+@pytest.mark.asyncio
+async def test_failing_browsers_are_quit():
+    """
+    test a browser whose job raised anything is quit instead of reused
+    """
+    browser_pool = FakeBrowserPool(size=1, scroll_error=RuntimeError('renderer crashed'))
+
+    with pytest.raises(RuntimeError):
+        await browser_pool.scroll('url', 1)
+
+    assert browser_pool.browsers == [] and browser_pool.idle_browsers.empty()
+
+    await browser_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_chrome_is_launched_with_a_service(monkeypatch):
+    """
+    test chrome gets the chromedriver path through a selenium 4 service and launch failures become BrowserError
+    """
+    webdriver = pytest.importorskip('selenium.webdriver')
+
+    launches = []
+
+    def fake_chrome(*args, **kwargs):
+        launches.append((args, kwargs))
+        if len(launches) > 1:
+            raise TypeError('unexpected argument')
+        return 'chrome'
+
+    monkeypatch.setattr(webdriver, 'Chrome', fake_chrome)
+    browser_pool = BrowserPool(chromedriver='/opt/chromedriver')
+
+    browser = browser_pool.launch_browser()
+
+    with pytest.raises(BrowserError):
+        browser_pool.launch_browser()
+
+    args, kwargs = launches[0]
+
+    assert browser == 'chrome' and browser_pool.browsers == ['chrome']
+    assert args == () and kwargs['service'].path == '/opt/chromedriver'
+    assert '--headless' in kwargs['options'].arguments
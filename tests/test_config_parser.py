@@ -0,0 +1,81 @@
+#Builtin imports:
+import json
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config_parser import load_url_parameters, parse_config, read_job_records
+
+
+@pytest.mark.asyncio
+async def test_read_job_records_fills_in_template(tmp_path, capsys):
+    """
+    test job lines become records filled in from the template and invalid lines are skipped
+    """
+    jobs_file = tmp_path.joinpath('jobs.jsonl')
+    with open(jobs_file, 'w') as file:
+        file.write('{"keywords": "cats", "limit": 5}\n\nnot json\n[1, 2]\n{"keywords": "dogs"}\n')
+
+    records = [record async for record in read_job_records(str(jobs_file), {'keywords': '', 'limit': 100})]
+
+    assert records == [{'keywords': 'cats', 'limit': 5}, {'keywords': 'dogs', 'limit': 100}]
+    assert 'line 3' in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_url_parameters_load_outside_repository(tmp_path, monkeypatch):
+    """
+    test the url parameter table is found from any working directory and read once
+    """
+    monkeypatch.chdir(tmp_path)
+
+    url_parameters = load_url_parameters()
+
+    assert 'type' in url_parameters and 'time' in url_parameters
+    assert load_url_parameters() is url_parameters
+
+
+@pytest.mark.asyncio
+async def test_records_inherit_run_wide_limits(tmp_path, monkeypatch):
+    """
+    test records take the in-flight limits of the Settings unless they lower max_in_flight themselves
+    """
+    config_path = tmp_path.joinpath('config.json')
+    with open(config_path, 'w') as config_file:
+        json.dump({'Settings': {'max_in_flight': 64, 'max_in_flight_per_host': 4},
+                   'Records': [{'keywords': 'cats'}, {'keywords': 'dogs', 'max_in_flight': 2}]}, config_file)
+
+    monkeypatch.setattr(sys, 'argv', ['google_images_download_async.py', '-cf', str(config_path)])
+
+    _, records, settings = await parse_config()
+
+    assert settings['max_in_flight'] == 64
+    assert [(record['max_in_flight'], record['max_in_flight_per_host']) for record in records] == [(64, 4), (2, 4)]
+
+
+@pytest.mark.asyncio
+async def test_run_wide_options_of_records_are_reported_once(tmp_path, monkeypatch, capsys):
+    """
+    test records setting run wide options keep the Settings values and each option is reported once
+    """
+    config_path = tmp_path.joinpath('config.json')
+    with open(config_path, 'w') as config_file:
+        json.dump({'Settings': {'max_in_flight_per_host': 4, 'manifest': 'runs.sqlite3'},
+                   'Records': [{'keywords': 'cats', 'max_in_flight_per_host': 8, 'cache_dir': 'cache'},
+                               {'keywords': 'dogs', 'max_in_flight_per_host': 2}]}, config_file)
+
+    monkeypatch.setattr(sys, 'argv', ['google_images_download_async.py', '-cf', str(config_path)])
+
+    _, records, settings = await parse_config()
+    output = capsys.readouterr().out
+
+    assert [(record['max_in_flight_per_host'], record['manifest'], record['cache_dir']) for record in records] == \
+        [(4, 'runs.sqlite3', settings['cache_dir'])] * 2
+    assert output.count('max_in_flight_per_host is a run wide setting') == 1
+    assert output.count('cache_dir is a run wide setting') == 1
@@ -0,0 +1,104 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dedup_index import DedupIndex, link_file
+from google_images_download_async import GoogleImagesDownloader, get_default_record
+
+
+@pytest.mark.asyncio
+async def test_duplicate_urls_wait_for_first_download(tmp_path):
+    """
+    test later claims of a url get the first download's result
+    """
+    dedup_index = DedupIndex()
+
+    assert dedup_index.claim_url('http://a.com/1.jpg') is None
+    first_download = dedup_index.claim_url('http://a.com/1.jpg')
+
+    dedup_index.finish_url('http://a.com/1.jpg', tmp_path.joinpath('1.jpg'), (10, 'abc'))
+
+    assert await first_download == (tmp_path.joinpath('1.jpg'), 10, 'abc')
+    assert dedup_index.duplicate_urls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_url_can_be_claimed_again():
+    """
+    test a failed download releases its claim
+    """
+    dedup_index = DedupIndex()
+
+    dedup_index.claim_url('http://a.com/1.jpg')
+    first_download = dedup_index.claim_url('http://a.com/1.jpg')
+    dedup_index.finish_url('http://a.com/1.jpg', 'Downloads/1.jpg', None)
+
+    assert await first_download is None
+    assert dedup_index.claim_url('http://a.com/1.jpg') is None
+
+
+def test_register_content_returns_first_path():
+    """
+    test identical contents under different paths are reported
+    """
+    dedup_index = DedupIndex()
+
+    assert dedup_index.register_content('abc', 'a/1.jpg') is None
+    assert dedup_index.register_content('abc', 'a/1.jpg') is None
+    assert str(dedup_index.register_content('abc', 'b/2.jpg')) == os.path.join('a', '1.jpg')
+    assert dedup_index.duplicate_contents == 1
+
+
+def test_link_file(tmp_path):
+    """
+    test duplicates share the first file's data and missing sources are reported
+    """
+    source = tmp_path.joinpath('1.jpg')
+    source.write_bytes(b'image')
+    destination = tmp_path.joinpath('2.jpg')
+    destination.write_bytes(b'other image')
+
+    assert link_file(source, destination)
+    assert destination.read_bytes() == b'image'
+    assert os.path.samefile(source, destination)
+    assert not link_file(tmp_path.joinpath('missing.jpg'), tmp_path.joinpath('3.jpg'))
+    assert not os.path.exists(tmp_path.joinpath('3.jpg.part'))
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_releases_its_url_claim(tmp_path):
+    """
+    test a url whose first fetch raises can still be downloaded by the records waiting for it
+    """
+    argument = get_default_record()
+    argument.update({'output_directory': str(tmp_path), 'silent_mode': True})
+    downloader = GoogleImagesDownloader({}, argument)
+    fetches = []
+
+    async def fetch_url_to_file(url, file_path, kind, validators):
+        fetches.append(file_path)
+        if len(fetches) == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError('fetch failed')
+        with open(file_path, 'wb') as file:
+            file.write(b'image')
+        return 5, 'abc'
+
+    downloader.fetch_url_to_file = fetch_url_to_file
+
+    first, second = await asyncio.wait_for(asyncio.gather(
+        downloader.download_url_to_file('http://a.com/1.jpg', tmp_path.joinpath('1.jpg')),
+        downloader.download_url_to_file('http://a.com/1.jpg', tmp_path.joinpath('2.jpg')),
+        return_exceptions=True), timeout=5)
+    await downloader.close()
+
+    assert isinstance(first, RuntimeError)
+    assert second == (5, 'abc')
+    assert fetches == [tmp_path.joinpath('1.jpg'), tmp_path.joinpath('2.jpg')]
@@ -0,0 +1,109 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from download_manifest import DownloadManifest
+
+
+@pytest.mark.asyncio
+async def test_image_records_survive_reopen(tmp_path):
+    """
+    test image outcomes are persisted and the latest outcome wins
+    """
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'), commit_every=1000)
+    await manifest.open()
+    await manifest.record_image('http://a.com/1.jpg', 'Downloads/1.jpg', 'failed')
+    await manifest.record_image('http://a.com/1.jpg', 'Downloads/1.jpg', 'done', 10, 'abc')
+    await manifest.close()
+
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'))
+    await manifest.open()
+    image = await manifest.get_image('http://a.com/1.jpg')
+    missing = await manifest.get_image('http://a.com/2.jpg')
+    await manifest.close()
+
+    assert (image['status'], image['file_size'], image['content_hash']) == ('done', 10, 'abc')
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_images_are_keyed_by_url_and_file_path(tmp_path):
+    """
+    test an image saved to two paths keeps a row for each
+    """
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'))
+    await manifest.open()
+    await manifest.record_image('http://a.com/1.jpg', tmp_path.joinpath('a', '1.jpg'), 'done', 10, 'abc')
+    await manifest.record_image('http://a.com/1.jpg', tmp_path.joinpath('b', '1.jpg'), 'failed')
+    first = await manifest.get_image('http://a.com/1.jpg', tmp_path.joinpath('a', '1.jpg'))
+    latest = await manifest.get_image('http://a.com/1.jpg')
+    copies = await manifest.get_downloaded_copies('http://a.com/1.jpg')
+    await manifest.close()
+
+    assert first['status'] == 'done'
+    assert (latest['file_path'], latest['status']) == (str(tmp_path.joinpath('b', '1.jpg')), 'failed')
+    assert [copy['file_path'] for copy in copies] == [str(tmp_path.joinpath('a', '1.jpg'))]
+
+
+@pytest.mark.asyncio
+async def test_images_without_a_file_are_stored_as_null(tmp_path):
+    """
+    test a failed image that was never written has no file path rather than the string None
+    """
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'))
+    await manifest.open()
+    await manifest.record_image('http://a.com/1.jpg', None, 'failed')
+    image = await manifest.get_image('http://a.com/1.jpg')
+    await manifest.close()
+
+    assert (image['status'], image['file_path']) == ('failed', None)
+
+
+@pytest.mark.asyncio
+async def test_search_results_are_keyed_by_limit_and_offset(tmp_path):
+    """
+    test stored search results are only returned for the same limit and offset
+    """
+    results = [{'image_link': 'http://a.com/1.jpg', 'image_thumbnail_url': 'http://t.com/1.jpg'}]
+
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'))
+    await manifest.open()
+    await manifest.record_search('https://www.google.com/search?q=a', 10, 0, results)
+
+    assert await manifest.get_search('https://www.google.com/search?q=a', 10, 0) == results
+    assert await manifest.get_search('https://www.google.com/search?q=a', 20, 0) is None
+
+    await manifest.close()
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_latest_rows(tmp_path):
+    """
+    test merging a worker manifest adds its rows without overwriting newer ones
+    """
+    worker = DownloadManifest(tmp_path.joinpath('manifest.worker0.sqlite3'))
+    await worker.open()
+    await worker.record_image('http://a.com/1.jpg', 'Downloads/1.jpg', 'failed')
+    await worker.record_image('http://a.com/2.jpg', 'Downloads/2.jpg', 'done', 20, 'def')
+    await worker.record_search('http://google.com/search?q=a', 100, 0, [{'image_link': 'http://a.com/2.jpg'}])
+    await worker.close()
+
+    manifest = DownloadManifest(tmp_path.joinpath('manifest.sqlite3'))
+    await manifest.open()
+    await manifest.record_image('http://a.com/1.jpg', 'Downloads/1.jpg', 'done', 10, 'abc')
+    await manifest.merge(tmp_path.joinpath('manifest.worker0.sqlite3'))
+    first = await manifest.get_image('http://a.com/1.jpg')
+    second = await manifest.get_image('http://a.com/2.jpg')
+    search = await manifest.get_search('http://google.com/search?q=a', 100, 0)
+    await manifest.close()
+
+    assert first['status'] == 'done'
+    assert second['status'] == 'done'
+    assert search == [{'image_link': 'http://a.com/2.jpg'}]
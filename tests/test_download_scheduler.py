@@ -0,0 +1,103 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from download_scheduler import DownloadScheduler
+
+
+@pytest.mark.asyncio
+async def test_run_caps_jobs_in_flight():
+    """
+    test no more than max_in_flight jobs run at once
+    """
+    in_flight = []
+    peak = []
+
+    async def job(number):
+        in_flight.append(number)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(number)
+        return number
+
+    scheduler = DownloadScheduler(max_in_flight=3)
+    results = await scheduler.run([job(number) for number in range(10)])
+    await scheduler.close()
+
+    assert results == list(range(10))
+    assert max(peak) == 3
+
+
+@pytest.mark.asyncio
+async def test_run_caps_the_jobs_of_one_call():
+    """
+    test a call capped below max_in_flight runs at most that many of its jobs while others use the rest
+    """
+    in_flight = {'capped': 0, 'other': 0}
+    peak = {'capped': 0, 'other': 0}
+
+    async def job(name, number):
+        in_flight[name] += 1
+        peak[name] = max(peak[name], in_flight[name])
+        await asyncio.sleep(0.01)
+        in_flight[name] -= 1
+        return number
+
+    scheduler = DownloadScheduler(max_in_flight=6)
+    capped, other = await asyncio.gather(scheduler.run([job('capped', number) for number in range(10)], 2),
+                                         scheduler.run([job('other', number) for number in range(10)]))
+    await scheduler.close()
+
+    assert capped == other == list(range(10))
+    assert peak['capped'] == 2
+    assert peak['other'] >= 4
+
+
+@pytest.mark.asyncio
+async def test_host_slot_caps_requests_per_host():
+    """
+    test requests to one host are capped while other hosts are not held up
+    """
+    in_flight = {'a.com': 0, 'b.com': 0}
+    peak = {'a.com': 0, 'b.com': 0}
+
+    scheduler = DownloadScheduler(max_in_flight=10, max_in_flight_per_host=2)
+
+    async def job(host):
+        async with scheduler.host_slot(f'https://{host}/image.jpg'):
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+
+    await scheduler.run([job('a.com') for _ in range(5)] + [job('b.com') for _ in range(5)])
+    await scheduler.close()
+
+    assert peak == {'a.com': 2, 'b.com': 2}
+
+
+@pytest.mark.asyncio
+async def test_run_returns_job_exceptions():
+    """
+    test a failing job does not stop the worker pool
+    """
+    async def failing_job():
+        raise ValueError('failed')
+
+    async def job():
+        return 'done'
+
+    scheduler = DownloadScheduler(max_in_flight=1)
+
+    with pytest.raises(ValueError):
+        await scheduler.run([failing_job()])
+
+    assert await scheduler.run([job()]) == ['done']
+    await scheduler.close()
@@ -0,0 +1,79 @@
+#Builtin imports:
+import json
+import os
+import sys
+
+#Third party imports:
+import aiohttp
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from download_result import DownloadResult
+from download_service import DownloadService
+
+
+@pytest.mark.asyncio
+async def test_jobs_stream_status_and_results():
+    """
+    test a submitted job runs with its records filled in and streams its events
+    """
+    received_records = []
+
+    async def run_records(records, result_handler):
+        received_records.extend(records)
+        for record in records:
+            await result_handler(DownloadResult(record['url'], f'{record["limit"]}.jpg', 'done'))
+
+    service = DownloadService(run_records, {'url': '', 'limit': 100})
+    address = await service.start('127.0.0.1:0')
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f'http://{address}/jobs', json={'Records': [{'url': 'a'}, {'url': 'b'}]}) as resp:
+                job = await resp.json()
+                assert resp.status == 202
+
+            async with session.get(f'http://{address}/jobs/{job["job_id"]}/events') as resp:
+                events = [json.loads(line) for line in (await resp.text()).splitlines()]
+
+            async with session.get(f'http://{address}/jobs/{job["job_id"]}') as resp:
+                status = await resp.json()
+
+            async with session.post(f'http://{address}/jobs', data='[1]') as resp:
+                assert resp.status == 400
+
+            async with session.get(f'http://{address}/jobs/missing') as resp:
+                assert resp.status == 404
+    finally:
+        await service.close()
+
+    assert received_records == [{'url': 'a', 'limit': 100}, {'url': 'b', 'limit': 100}]
+    assert [event.get('status') for event in events] == ['running', 'done', 'done', 'done']
+    assert [event['image_url'] for event in events if event['event'] == 'result'] == ['a', 'b']
+    assert (status['status'], status['results']) == ('done', {'done': 2})
+
+
+@pytest.mark.asyncio
+async def test_failing_job_reports_error():
+    """
+    test an exception in a job fails it without stopping the service
+    """
+    async def run_records(records, result_handler):
+        if records[0]['url'] == 'bad':
+            raise ValueError('bad record')
+
+    service = DownloadService(run_records, {'url': ''}, max_active_jobs=1)
+    await service.start('127.0.0.1:0')
+
+    try:
+        failing = await service.submit([{'url': 'bad'}])
+        working = await service.submit([{'url': 'good'}])
+        await service.queue.join()
+    finally:
+        await service.close()
+
+    assert (failing.status, failing.error) == ('failed', "ValueError('bad record')")
+    assert working.status == 'done'
@@ -14,7 +14,7 @@ import asyncio
 #Local imports:
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config_parser import parse_config
-from google_images_download_async import GoogleImagesDownloader, expand_arguments
+from google_images_download_async import ArgumentExpander, GoogleImagesDownloader
 
 with open(Path(os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))).joinpath('url_parms.json')) as file:
     url_parm_json_file = json.load(file)
@@ -90,24 +90,22 @@ async def test_download_url_data(capsys):
         captured = capsys.readouterr()
         assert captured.out == test_expected_resp[i][1]
 
-@pytest.mark.asyncio
-async def test_write_to_file(capsys):
-
-    content = b''
-
-    url = 'https://www.python.org/static/opengraph-icon-200x200.png?stuff'
-
-    sub_dir = ''
-
-    gid = GoogleImagesDownloader(url_parm_json_file,{"prefix":'',"suffix":'','silent_mode':True,'output_directory':'','save_source':''})
 
-    await gid.write_to_file(url, content, sub_dir)
-    captured = capsys.readouterr()
-    assert captured.err == ''
-    assert os.path.exists('Downloads/opengraph-icon-200x200.png') == True
+@pytest.mark.asyncio
+async def test_iter_arguments_expands_lazily():
+    """
+    test keyword combinations are yielded one at a time with search terms reset
+    """
+    record = {'url': 'http://127.0.0.1/search', 'similar_images': '', 'keywords_from_file': '',
+              'prefix_keywords': 'red,blue', 'keywords': 'cat,dog', 'suffix_keywords': '', 'limit': 5}
+    arguments = ArgumentExpander(record).iter_arguments()
 
-    shutil.rmtree('Downloads')
+    first = await arguments.__anext__()
+    rest = [argument async for argument in arguments]
 
+    assert (first['url'], first['keywords']) == ('http://127.0.0.1/search', '')
+    assert [(argument['prefix_keywords'], argument['keywords'], argument['url']) for argument in rest] == [
+        ('red', 'cat', ''), ('red', 'dog', ''), ('blue', 'cat', ''), ('blue', 'dog', '')]
 
 try:
     shutil.rmtree('Downloads')
@@ -0,0 +1,56 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from image_filter import ImageFilter
+
+
+@pytest.mark.asyncio
+async def test_meta_data_is_checked_against_bounds_and_formats():
+    """
+    test search results outside the size, aspect and format bounds are rejected and unknown values let through
+    """
+    image_filter = ImageFilter(min_width=500, max_height=1000, formats='jpg,png', max_aspect=2)
+
+    assert image_filter.check_meta_data({'image_width': 640, 'image_height': 480, 'image_format': 'jpeg'}) == ''
+    assert image_filter.check_meta_data({'image_width': 320, 'image_height': 240, 'image_format': 'jpg'})
+    assert image_filter.check_meta_data({'image_width': 640, 'image_height': 1200, 'image_format': 'jpg'})
+    assert image_filter.check_meta_data({'image_width': 3000, 'image_height': 1000, 'image_format': 'png'})
+    assert image_filter.check_meta_data({'image_width': 640, 'image_height': 480, 'image_format': 'gif'})
+    assert image_filter.check_meta_data({'image_width': '', 'image_height': None, 'image_format': ''}) == ''
+
+
+@pytest.mark.asyncio
+async def test_headers_are_checked_against_formats():
+    """
+    test responses whose Content-Type is not an allowed image format are rejected
+    """
+    image_filter = ImageFilter(formats='jpg')
+
+    assert image_filter.check_headers({'Content-Type': 'image/jpeg; charset=binary'}) == ''
+    assert image_filter.check_headers({'Content-Type': 'application/octet-stream'}) == ''
+    assert image_filter.check_headers({}) == ''
+    assert image_filter.check_headers({'Content-Type': 'image/png'})
+    assert image_filter.check_headers({'Content-Type': 'text/html'})
+    assert ImageFilter().check_headers({'Content-Type': 'text/html'}) == ''
+
+
+@pytest.mark.asyncio
+async def test_exact_size_and_format_are_enforced_without_bounds():
+    """
+    test the Google hints exact_size and format become bounds when none are given
+    """
+    image_filter = ImageFilter.from_argument({'exact_size': '640,480', 'format': 'png'})
+    bounded_filter = ImageFilter.from_argument({'exact_size': '640,480', 'min_width': 100,
+                                                'format': 'png', 'allowed_formats': 'jpg,gif'})
+
+    assert (image_filter.min_width, image_filter.max_width, image_filter.min_height, image_filter.max_height,
+            image_filter.formats) == (640, 640, 480, 480, {'png'})
+    assert (bounded_filter.min_width, bounded_filter.max_width, bounded_filter.formats) == (100, 0, {'jpeg', 'gif'})
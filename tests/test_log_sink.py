@@ -0,0 +1,102 @@
+#Builtin imports:
+import json
+import os
+import sys
+import threading
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from log_sink import LogSink
+
+
+@pytest.mark.asyncio
+async def test_records_are_written_in_batches(tmp_path):
+    """
+    test records are buffered until a batch is full and the rest is written on close
+    """
+    log_path = tmp_path.joinpath('logs', 'error_log.txt')
+    log_sink = LogSink(log_path, batch_size=3, flush_interval=60)
+
+    for number in range(4):
+        await log_sink.write(message=f'error {number}')
+
+    with open(log_path) as log_file:
+        batched_lines = log_file.readlines()
+
+    await log_sink.close()
+
+    with open(log_path) as log_file:
+        lines = log_file.readlines()
+
+    assert [line.split(': ', 1)[1] for line in batched_lines] == ['error 0\n', 'error 1\n', 'error 2\n']
+    assert [line.split(': ', 1)[1] for line in lines] == [f'error {number}\n' for number in range(4)]
+    assert lines == sorted(lines)
+
+
+@pytest.mark.asyncio
+async def test_records_are_flushed_after_the_interval(tmp_path):
+    """
+    test a buffered record is written flush_interval seconds later without a full batch
+    """
+    log_path = tmp_path.joinpath('sources.txt')
+    log_sink = LogSink(log_path, flush_interval=0.05)
+
+    await log_sink.write(file_path='/images/cat.jpg', image_url='http://a.com/cat.jpg')
+    assert not log_path.exists()
+
+    await asyncio.sleep(0.2)
+
+    with open(log_path) as log_file:
+        lines = log_file.readlines()
+
+    await log_sink.close()
+
+    assert len(lines) == 1
+    assert lines[0].endswith(': /images/cat.jpg\thttp://a.com/cat.jpg\n')
+
+
+@pytest.mark.asyncio
+async def test_json_records(tmp_path):
+    """
+    test the json log format writes one object per record with its time stamp first
+    """
+    log_path = tmp_path.joinpath('error_log.jsonl')
+    log_sink = LogSink(log_path, log_format='json')
+
+    await log_sink.write(message=ValueError('bad url'))
+    await log_sink.close()
+
+    with open(log_path) as log_file:
+        records = [json.loads(line) for line in log_file]
+
+    assert len(records) == 1
+    assert list(records[0]) == ['time', 'message']
+    assert records[0]['message'] == 'bad url'
+
+
+@pytest.mark.asyncio
+async def test_sinks_share_one_thread_and_reopen_after_close(tmp_path):
+    """
+    test every sink writes on the same thread and a closed sink appends the records written after it
+    """
+    threads = set()
+    log_sinks = [LogSink(tmp_path.joinpath(f'log_{number}.txt')) for number in range(3)]
+
+    for log_sink in log_sinks:
+        await log_sink.write(message='first job')
+        await log_sink.close()
+        threads.add(await log_sink.run(lambda: threading.current_thread()))
+
+    await log_sinks[0].write(message='second job')
+    await log_sinks[0].close()
+
+    with open(tmp_path.joinpath('log_0.txt')) as log_file:
+        lines = log_file.readlines()
+
+    assert len(threads) == 1
+    assert [line.split(': ', 1)[1] for line in lines] == ['first job\n', 'second job\n']
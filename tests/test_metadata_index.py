@@ -0,0 +1,94 @@
+#Builtin imports:
+import os
+import sqlite3
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from download_result import DownloadResult
+from metadata_index import MetadataIndex
+
+
+def build_image_meta_data(number: int) -> dict:
+    """
+    """
+    return {'image_link': f'http://a.com/{number}.jpg', 'image_format': 'jpg', 'image_width': 100 * number,
+            'image_height': 50, 'image_description': f'image {number}', 'image_host': 'a.com',
+            'image_source': 'http://a.com', 'image_thumbnail_url': f'http://t.com/{number}.jpg'}
+
+
+@pytest.mark.asyncio
+async def test_rows_are_written_in_batches(tmp_path):
+    """
+    test results and downloads are buffered until the batch is full or the index is closed
+    """
+    index_path = tmp_path.joinpath('metadata.sqlite3')
+    metadata_index = MetadataIndex(index_path, batch_size=3)
+    await metadata_index.open()
+    await metadata_index.record_results('http://g.com/search', 'cat', [build_image_meta_data(1),
+                                                                       build_image_meta_data(2)])
+    written_before_batch = sqlite3.connect(str(index_path)).execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    await metadata_index.record_download(DownloadResult('http://a.com/1.jpg', 'Downloads/1.jpg', 'done',
+                                                        file_size=10, content_hash='abc', seconds=0.5))
+    written_after_batch = sqlite3.connect(str(index_path)).execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    await metadata_index.record_download(DownloadResult('http://a.com/2.jpg', None, 'failed'))
+    await metadata_index.close()
+
+    connection = sqlite3.connect(str(index_path))
+    results = connection.execute('SELECT image_url, keywords, image_width, position FROM results '
+                                 'ORDER BY position').fetchall()
+    downloads = connection.execute('SELECT image_url, status, file_size FROM downloads ORDER BY image_url').fetchall()
+
+    assert (written_before_batch, written_after_batch) == (0, 2)
+    assert results == [('http://a.com/1.jpg', 'cat', 100, 0), ('http://a.com/2.jpg', 'cat', 200, 1)]
+    assert downloads == [('http://a.com/1.jpg', 'done', 10), ('http://a.com/2.jpg', 'failed', None)]
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_latest_download(tmp_path):
+    """
+    test merging an index adds its results and only replaces older download outcomes
+    """
+    worker_index = MetadataIndex(tmp_path.joinpath('metadata.worker0.sqlite3'))
+    await worker_index.open()
+    await worker_index.record_results('http://g.com/search?page=1', 'dog', [build_image_meta_data(3)])
+    await worker_index.record_download(DownloadResult('http://a.com/3.jpg', 'Downloads/3.jpg', 'failed'))
+    await worker_index.close()
+
+    metadata_index = MetadataIndex(tmp_path.joinpath('metadata.sqlite3'))
+    await metadata_index.open()
+    await metadata_index.record_results('http://g.com/search', 'cat', [build_image_meta_data(3)])
+    await metadata_index.record_download(DownloadResult('http://a.com/3.jpg', 'Downloads/3.jpg', 'done'))
+    await metadata_index.merge(tmp_path.joinpath('metadata.worker0.sqlite3'))
+    await metadata_index.close()
+
+    connection = sqlite3.connect(str(tmp_path.joinpath('metadata.sqlite3')))
+
+    assert connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 2
+    assert connection.execute('SELECT status FROM downloads').fetchall() == [('done',)]
+
+
+@pytest.mark.asyncio
+async def test_downloads_are_kept_per_file_and_member(tmp_path):
+    """
+    test an image saved to several files or archive members keeps a download row for each
+    """
+    index_path = tmp_path.joinpath('metadata.sqlite3')
+    metadata_index = MetadataIndex(index_path)
+    await metadata_index.open()
+
+    for file_path, archive_member in (('a/1.jpg', None), ('b/1.jpg', None), ('images-000000.tar', '1.jpg'),
+                                      ('images-000000.tar', 'cats/1.jpg'), (None, None), (None, None)):
+        await metadata_index.record_download(DownloadResult('http://a.com/1.jpg', file_path, 'done',
+                                                            archive_member=archive_member))
+
+    await metadata_index.close()
+
+    connection = sqlite3.connect(str(index_path))
+
+    assert connection.execute('SELECT COUNT(*) FROM downloads').fetchone()[0] == 5
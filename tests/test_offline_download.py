@@ -0,0 +1,314 @@
+#Builtin imports:
+import hashlib
+import json
+import os
+import sqlite3
+import tarfile
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import google_images_download_async
+from fake_google_server import FakeGoogleServer
+
+
+@pytest_asyncio.fixture
+async def fake_server(request):
+    """
+    Fake Google server started with the options a test parametrizes it with.
+    """
+    server = FakeGoogleServer(**getattr(request, 'param', {}))
+    await server.start()
+
+    yield server
+
+    await server.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 20, 'image_size': 2048, 'error_rate': 0.1,
+                                          'throttle_rate': 0.1}], indirect=True)
+async def test_main_downloads_from_fake_server(fake_server, tmp_path, monkeypatch):
+    """
+    test main() downloads every image of a fake result page, retrying failures
+    """
+    config_path = tmp_path.joinpath('config.json')
+    with open(config_path, 'w') as config_file:
+        json.dump({'Settings': {'output_directory': str(tmp_path), 'retry_base_delay': 0.01},
+                   'Records': [{'url': fake_server.search_url, 'limit': 20, 'silent_mode': True,
+                                'output_directory': str(tmp_path), 'repeat_failure': 3}]}, config_file)
+
+    monkeypatch.setattr(sys, 'argv', ['google_images_download_async.py', '-cf', str(config_path)])
+
+    await google_images_download_async.main()
+
+    with open(tmp_path.joinpath('run_report.json')) as report_file:
+        report = json.load(report_file)
+
+    images = [name for name in os.listdir(tmp_path) if name.endswith('.jpg')]
+
+    assert len(images) == 20
+    assert report['phases']['write']['total']['bytes'] == 20 * 2048
+    assert report['phases']['request']['total']['errors'] > 0
+    assert report['counters']['requests'] == report['phases']['request']['total']['count']
+    assert all(fake_server.requests[f'/images/image_{number}.jpg'] <= 2 for number in range(20))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 10, 'image_size': 1024}], indirect=True)
+async def test_main_shards_records_across_workers(fake_server, tmp_path, monkeypatch):
+    """
+    test records are downloaded by worker processes whose manifests, indexes, logs and metrics are merged
+    """
+    config_path = tmp_path.joinpath('config.json')
+    records = [{'url': f'{fake_server.search_url}&page={number}', 'limit': 10, 'silent_mode': True,
+                'output_directory': str(tmp_path), 'image_directory': f'record_{number}',
+                'save_source': 'sources.txt'} for number in range(3)]
+    with open(config_path, 'w') as config_file:
+        json.dump({'Settings': {'output_directory': str(tmp_path), 'workers': 2},
+                   'Records': records}, config_file)
+
+    monkeypatch.setattr(sys, 'argv', ['google_images_download_async.py', '-cf', str(config_path)])
+
+    await google_images_download_async.main()
+
+    with open(tmp_path.joinpath('run_report.json')) as report_file:
+        report = json.load(report_file)
+    with open(tmp_path.joinpath('sources.txt')) as sources_file:
+        sources = sources_file.readlines()
+    output_files = sorted(os.listdir(tmp_path))
+    manifest = sqlite3.connect(str(tmp_path.joinpath('manifest.sqlite3')))
+    metadata_index = sqlite3.connect(str(tmp_path.joinpath('metadata.sqlite3')))
+
+    assert report['phases']['parse']['total']['count'] == 3
+    assert len(sources) == 30
+    assert manifest.execute('SELECT COUNT(*) FROM searches').fetchone()[0] == 3
+    assert manifest.execute("SELECT COUNT(*) FROM images WHERE status = 'done'").fetchone()[0] == 30
+    assert manifest.execute('SELECT COUNT(DISTINCT image_url) FROM images').fetchone()[0] == 10
+    assert metadata_index.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 30
+    assert metadata_index.execute("SELECT COUNT(*) FROM downloads WHERE status = 'done'").fetchone()[0] == 30
+    assert metadata_index.execute('SELECT COUNT(DISTINCT image_url) FROM downloads').fetchone()[0] == 10
+    assert output_files == ['config.json', 'manifest.sqlite3', 'metadata.sqlite3', 'record_0', 'record_1',
+                            'record_2', 'run_report.json', 'sources.txt']
+    assert all(len(os.listdir(tmp_path.joinpath(f'record_{number}'))) == 10 for number in range(3))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 5, 'image_size': 512}], indirect=True)
+async def test_main_streams_jobs_file(fake_server, tmp_path, monkeypatch):
+    """
+    test main() downloads the records of a JSON lines jobs file
+    """
+    jobs_path = tmp_path.joinpath('jobs.jsonl')
+    with open(jobs_path, 'w') as jobs_file:
+        for number in range(4):
+            jobs_file.write(json.dumps({'url': f'{fake_server.search_url}&page={number}', 'limit': 5,
+                                        'image_directory': f'record_{number}', 'silent_mode': True}) + '\n')
+
+    monkeypatch.setattr(sys, 'argv', ['google_images_download_async.py', '-jf', str(jobs_path),
+                                      '-o', str(tmp_path), '-mar', '2'])
+
+    await google_images_download_async.main()
+
+    assert all(len(os.listdir(tmp_path.joinpath(f'record_{number}'))) == 5 for number in range(4))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 5, 'image_size': 512}], indirect=True)
+async def test_search_and_download_yields_results(fake_server, tmp_path):
+    """
+    test results are yielded with their metadata and files written
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 5, 'output_directory': str(tmp_path), 'silent_mode': True})]
+
+    assert sorted(result.meta_data['image_description'] for result in results) == [
+        f'Synthetic image {number}' for number in range(5)]
+    assert all(result.status == 'done' and result.file_size == 512 and result.seconds >= 0 for result in results)
+    assert all(os.path.getsize(result.file_path) == 512 for result in results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 256}], indirect=True)
+async def test_search_and_download_returns_bytes(fake_server, tmp_path):
+    """
+    test images are handed back as bytes without being written
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 3, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'manifest': ''}, return_bytes=True)]
+
+    assert sorted(result.content[:12] for result in results) == [b'image_0.jpg\n', b'image_1.jpg\n',
+                                                                  b'image_2.jpg\n']
+    assert all(result.file_path is None and len(result.content) == 256 for result in results)
+    assert not any(name.endswith('.jpg') for name in os.listdir(tmp_path))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 40, 'image_size': 256}], indirect=True)
+async def test_search_and_download_stops_when_left_early(fake_server, tmp_path):
+    """
+    test leaving the iteration after the first result cancels the record instead of waiting on the full queue
+    """
+    results = google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 40, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'max_in_flight': 2})
+
+    async for result in results:
+        # let the downloads fill the queue before leaving
+        await asyncio.sleep(0.2)
+        break
+
+    await asyncio.wait_for(results.aclose(), timeout=10)
+
+    assert result.status == 'done'
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.jpg')]) < 40
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 256}], indirect=True)
+async def test_tar_output_keeps_file_names(fake_server, tmp_path):
+    """
+    test records can write their images to tar shards with prefix and suffix naming
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 3, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'image_directory': 'cats', 'prefix': 'big', 'suffix': 'v1', 'output_format': 'tar'})]
+
+    with tarfile.open(tmp_path.joinpath('images-000000.tar')) as tar:
+        names = sorted(tar.getnames())
+
+    assert names == sorted([f'cats/big image_{number} v1.jpg' for number in range(3)] +
+                           [f'cats/big image_{number} v1.json' for number in range(3)])
+    assert all(result.file_path == tmp_path.joinpath('images-000000.tar') for result in results)
+    assert not os.path.exists(tmp_path.joinpath('cats'))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(('.download', '.part'))]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 5, 'image_size': 1024}], indirect=True)
+async def test_filtered_results_are_not_requested(fake_server, tmp_path):
+    """
+    test search results rejected by their metadata are reported without requesting their images
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 5, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'min_width': 1024})]
+
+    assert [result.status for result in results] == ['filtered'] * 5
+    assert not any(path.startswith('/images/') for path in fake_server.requests)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 1048576, 'truncate_rate': 1}],
+                         indirect=True)
+async def test_broken_off_downloads_are_resumed(fake_server, tmp_path):
+    """
+    test images whose first transfer breaks off half way are completed with Range requests
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 3, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'retry_base_delay': 0.01, 'repeat_failure': 3})]
+
+    expected_hashes = [hashlib.sha256(f'image_{number}.jpg\n'.encode('utf-8').ljust(1048576, b'\0')).hexdigest()
+                       for number in range(3)]
+
+    assert all(result.status == 'done' for result in results)
+    assert sorted(result.content_hash for result in results) == sorted(expected_hashes)
+    assert all(os.path.getsize(result.file_path) == 1048576 for result in results)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+    assert fake_server.image_bytes_sent < 3 * 1048576 * 5 // 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 65536, 'truncate_rate': 1,
+                                          'refuse_ranges': True}], indirect=True)
+async def test_refused_ranges_restart_without_a_retry(fake_server, tmp_path):
+    """
+    test a resumed download whose range is refused is fetched whole at once without spending a retry
+    """
+    results = [result async for result in google_images_download_async.search_and_download(
+        {'url': fake_server.search_url, 'limit': 3, 'output_directory': str(tmp_path), 'silent_mode': True,
+         'retry_base_delay': 0.01, 'repeat_failure': 1})]
+
+    assert [result.status for result in results] == ['done'] * 3
+    assert all(os.path.getsize(result.file_path) == 65536 for result in results)
+    assert fake_server.requests == {f'/images/image_{number}.jpg': 3 for number in range(3)}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 4, 'image_size': 4096}], indirect=True)
+async def test_refresh_skips_unchanged_pages_and_images(fake_server, tmp_path):
+    """
+    test a refresh revalidates the recorded page and images without transferring or writing them again
+    """
+    record = {'url': fake_server.search_url, 'limit': 4, 'output_directory': str(tmp_path), 'silent_mode': True}
+
+    first_results = [result async for result in google_images_download_async.search_and_download(record)]
+    image_bytes_sent = fake_server.image_bytes_sent
+    modified_times = {result.file_path: os.stat(result.file_path).st_mtime_ns for result in first_results}
+
+    refresh_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'refresh': True})]
+
+    assert [result.status for result in first_results] == ['done'] * 4
+    assert [result.status for result in refresh_results] == ['unchanged'] * 4
+    assert all(result.content_hash and result.file_size == 4096 for result in refresh_results)
+    assert fake_server.image_bytes_sent == image_bytes_sent
+    assert fake_server.requests == {f'/images/image_{number}.jpg': 2 for number in range(4)}
+    assert {result.file_path: os.stat(result.file_path).st_mtime_ns for result in refresh_results} == modified_times
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 512}], indirect=True)
+async def test_resume_links_images_other_records_downloaded(fake_server, tmp_path):
+    """
+    test a resumed record whose images another record saved to a different directory gets its own copies
+    """
+    record = {'url': fake_server.search_url, 'limit': 3, 'output_directory': str(tmp_path), 'silent_mode': True}
+
+    first_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'image_directory': 'a'})]
+    other_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'image_directory': 'b', 'resume': True})]
+    resumed_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'image_directory': 'b', 'resume': True})]
+
+    manifest = sqlite3.connect(str(tmp_path.joinpath('manifest.sqlite3')))
+
+    assert [result.status for result in first_results] == ['done'] * 3
+    assert [result.status for result in other_results + resumed_results] == ['skipped'] * 6
+    assert sorted(os.listdir(tmp_path.joinpath('b'))) == [f'image_{number}.jpg' for number in range(3)]
+    assert all(os.path.getsize(result.file_path) == 512 for result in other_results)
+    assert fake_server.requests == {f'/images/image_{number}.jpg': 1 for number in range(3)}
+    assert manifest.execute("SELECT COUNT(*) FROM images WHERE status = 'done'").fetchone()[0] == 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fake_server', [{'number_of_images': 3, 'image_size': 512}], indirect=True)
+async def test_resume_from_another_directory(fake_server, tmp_path, monkeypatch):
+    """
+    test a run resumed from another working directory finds the images a relative output directory recorded
+    """
+    record = {'url': fake_server.search_url, 'limit': 3, 'silent_mode': True}
+
+    monkeypatch.chdir(tmp_path)
+    first_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'output_directory': 'downloads'})]
+
+    monkeypatch.chdir(tmp_path.parent)
+    resumed_results = [result async for result in google_images_download_async.search_and_download(
+        {**record, 'output_directory': str(tmp_path.joinpath('downloads')), 'resume': True})]
+
+    manifest = sqlite3.connect(str(tmp_path.joinpath('downloads', 'manifest.sqlite3')))
+
+    assert [result.status for result in first_results] == ['done'] * 3
+    assert [result.status for result in resumed_results] == ['skipped'] * 3
+    assert fake_server.requests == {f'/images/image_{number}.jpg': 1 for number in range(3)}
+    assert manifest.execute('SELECT COUNT(*) FROM images').fetchone()[0] == 3
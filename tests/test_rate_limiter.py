@@ -0,0 +1,52 @@
+#Builtin imports:
+import os
+import sys
+import time
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from rate_limiter import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_unlimited_hosts_do_not_wait():
+    """
+    test image hosts run at full speed when no delay is configured
+    """
+    rate_limiter = RateLimiter(search_delay=10, image_delay=0)
+
+    start = time.perf_counter()
+    for _ in range(50):
+        await rate_limiter.acquire('https://images.example.com/image.jpg')
+
+    assert time.perf_counter() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_delay_is_applied_per_host():
+    """
+    test requests to one host are spaced by the delay while other hosts are not
+    """
+    rate_limiter = RateLimiter(search_delay=0.05, image_delay=0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[rate_limiter.acquire('https://www.google.com/search?q=a') for _ in range(4)])
+    await rate_limiter.acquire('https://encrypted-tbn0.gstatic.com/images?q=a')
+
+    assert time.perf_counter() - start >= 0.15
+    assert list(rate_limiter.buckets) == ['www.google.com']
+
+
+def test_is_search_host():
+    """
+    test google search hosts and image CDNs get separate budgets
+    """
+    assert RateLimiter.is_search_host('www.google.com')
+    assert RateLimiter.is_search_host('google.co.uk')
+    assert not RateLimiter.is_search_host('encrypted-tbn0.gstatic.com')
+    assert not RateLimiter.is_search_host('images.example.com')
@@ -0,0 +1,51 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from result_parser import iter_image_meta_data
+from synthetic_pages import build_result_page, build_image_meta_data
+
+
+def test_iter_image_meta_data_yields_every_item_in_order():
+    """
+    test every rg_meta div is decoded in page order
+    """
+    page = build_result_page(25, padding=64)
+
+    items = list(iter_image_meta_data(page))
+
+    assert items == [build_image_meta_data(number) for number in range(25)]
+
+
+def test_iter_image_meta_data_skips_undecodable_items():
+    """
+    test a broken item does not stop the items after it
+    """
+    page = ('<div class="rg_meta notranslate">{"ou":"a"}</div>' +
+            '<div class="rg_meta notranslate">{not json}</div>' +
+            '<div class="rg_meta notranslate">{"ou":"b\\u003d"}</div>')
+
+    assert list(iter_image_meta_data(page)) == [{'ou': 'a'}, {'ou': 'b='}]
+
+
+def test_iter_image_meta_data_is_lazy():
+    """
+    test items are produced one at a time
+    """
+    items = iter_image_meta_data(build_result_page(3, padding=0))
+
+    assert next(items)['ou'].endswith('image_0.jpg')
+    assert next(items)['ou'].endswith('image_1.jpg')
+
+
+def test_iter_image_meta_data_without_results():
+    """
+    test pages without rg_meta divs yield nothing
+    """
+    assert list(iter_image_meta_data('<html><body>no results</body></html>')) == []
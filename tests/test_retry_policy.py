@@ -0,0 +1,93 @@
+#Builtin imports:
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+#Third party imports:
+import aiohttp
+import pytest
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from retry_policy import RetryPolicy, CircuitBreaker, parse_retry_after
+from google_images_download_async import DownloadError
+
+
+def test_classify():
+    """
+    test errors are sorted into retryable and final classes
+    """
+    assert RetryPolicy.classify(asyncio.TimeoutError()) == 'timeout'
+    assert RetryPolicy.classify(DownloadError('url', 429)) == 'throttled'
+    assert RetryPolicy.classify(DownloadError('url', 503)) == 'server'
+    assert RetryPolicy.classify(DownloadError('url', 404)) == 'client'
+    assert RetryPolicy.classify(DownloadError('url', 416)) == 'range'
+    assert RetryPolicy.classify(aiohttp.ClientOSError(104, 'Connection reset by peer')) == 'disconnected'
+
+
+def test_get_retry_delay():
+    """
+    test backoff grows with attempts, stops at max_retries and skips client errors
+    """
+    retry_policy = RetryPolicy(base_delay=1, max_delay=30)
+
+    assert 0 <= retry_policy.get_retry_delay(asyncio.TimeoutError(), 1, 3) <= 1
+    assert 0 <= retry_policy.get_retry_delay(asyncio.TimeoutError(), 3, 3) <= 4
+    assert retry_policy.get_retry_delay(asyncio.TimeoutError(), 4, 3) is None
+    assert retry_policy.get_retry_delay(DownloadError('url', 404), 1, 3) is None
+
+
+def test_refused_ranges_do_not_count_against_the_host():
+    """
+    test a refused byte range is neither retried with backoff nor counted towards the circuit breaker
+    """
+    retry_policy = RetryPolicy(breaker_threshold=1)
+
+    retry_policy.record_failure('http://a.com/1.jpg', DownloadError('http://a.com/1.jpg', 416))
+
+    assert retry_policy.get_retry_delay(DownloadError('url', 416), 1, 3) is None
+    assert retry_policy.allow('http://a.com/1.jpg')
+
+
+def test_get_retry_delay_honours_retry_after():
+    """
+    test Retry-After is waited for unless it is longer than max_delay
+    """
+    retry_policy = RetryPolicy(base_delay=0.1, max_delay=30)
+
+    assert retry_policy.get_retry_delay(DownloadError('url', 429, 10), 1, 3) == 10
+    assert retry_policy.get_retry_delay(DownloadError('url', 429, 60), 1, 3) is None
+
+
+def test_parse_retry_after():
+    """
+    test Retry-After given in seconds or as a date
+    """
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=100), usegmt=True)
+
+    assert parse_retry_after('5') == 5
+    assert 90 < parse_retry_after(retry_at) <= 100
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """
+    test a host is skipped after threshold failures and retried after the cooldown
+    """
+    circuit_breaker = CircuitBreaker(threshold=2, cooldown=0)
+
+    circuit_breaker.record_failure('a.com')
+    assert circuit_breaker.allow('a.com')
+    circuit_breaker.record_failure('a.com')
+    assert 'a.com' in circuit_breaker.opened
+    assert circuit_breaker.allow('a.com')
+    circuit_breaker.record_success('a.com')
+    assert 'a.com' not in circuit_breaker.opened
+
+    circuit_breaker = CircuitBreaker(threshold=1, cooldown=60)
+    circuit_breaker.record_failure('a.com')
+    assert not circuit_breaker.allow('a.com')
+    assert circuit_breaker.allow('b.com')
@@ -0,0 +1,98 @@
+#Builtin imports:
+import json
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from run_metrics import RunMetrics
+
+
+def test_report_totals_phases_per_host():
+    """
+    test observations are totalled per phase and broken down per host
+    """
+    metrics = RunMetrics()
+    metrics.observe('request', 0.02, 'a.example', size=100)
+    metrics.observe('request', 0.3, 'b.example', size=50, error=True)
+    metrics.observe('parse', 0.001, size=1000)
+
+    report = metrics.to_report()
+    request = report['phases']['request']
+
+    assert request['total']['count'] == 2
+    assert request['total']['errors'] == 1
+    assert request['total']['bytes'] == 150
+    assert request['hosts']['a.example']['latency_histogram']['0.025'] == 1
+    assert request['hosts']['b.example']['latency_histogram']['0.5'] == 1
+    assert report['phases']['parse']['hosts'] == {}
+
+
+def test_time_phase_counts_exceptions_as_errors():
+    """
+    test a block raising is recorded as a failed observation
+    """
+    metrics = RunMetrics()
+
+    with pytest.raises(ValueError):
+        with metrics.time_phase('write') as timer:
+            timer.size = 10
+            raise ValueError()
+
+    with metrics.time_phase('write') as timer:
+        timer.failed = True
+
+    phase_metrics = metrics.phases[('write', '')]
+
+    assert phase_metrics.count == 2
+    assert phase_metrics.errors == 2
+    assert phase_metrics.bytes == 10
+
+
+@pytest.mark.asyncio
+async def test_write_report_and_prometheus(tmp_path):
+    """
+    test the JSON report and Prometheus text file are written
+    """
+    metrics = RunMetrics()
+    metrics.observe('search', 0.2, 'www.google.com')
+    metrics.set_counter('coalesced_requests', 3)
+
+    await metrics.write_report(tmp_path.joinpath('report', 'run_report.json'))
+    await metrics.write_prometheus(tmp_path.joinpath('metrics.prom'))
+
+    with open(tmp_path.joinpath('report', 'run_report.json')) as report_file:
+        report = json.load(report_file)
+    with open(tmp_path.joinpath('metrics.prom')) as prometheus_file:
+        prometheus = prometheus_file.read()
+
+    assert report['counters'] == {'coalesced_requests': 3}
+    assert ('google_images_download_phase_seconds_bucket{phase="search",host="www.google.com",le="+Inf"} 1'
+            in prometheus)
+    assert 'google_images_download_coalesced_requests 3' in prometheus
+    assert not os.path.exists(tmp_path.joinpath('metrics.prom.part'))
+
+
+def test_merge_adds_worker_metrics():
+    """
+    test phases and counters of a worker run are added to the coordinator's
+    """
+    metrics = RunMetrics()
+    metrics.observe('request', 0.02, 'a.example', size=100)
+    metrics.set_counter('requests', 2)
+    worker_metrics = RunMetrics()
+    worker_metrics.observe('request', 0.02, 'a.example', size=50)
+    worker_metrics.observe('parse', 0.001)
+    worker_metrics.set_counter('requests', 3)
+
+    metrics.merge(worker_metrics)
+
+    assert metrics.phases[('request', 'a.example')].count == 2
+    assert metrics.phases[('request', 'a.example')].bytes == 150
+    assert metrics.phases[('parse', '')].count == 1
+    assert metrics.counters == {'requests': 5}
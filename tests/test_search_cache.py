@@ -0,0 +1,87 @@
+#Builtin imports:
+import os
+import sys
+import time
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from search_cache import SearchCache
+
+
+@pytest.mark.asyncio
+async def test_get_returns_stored_page(tmp_path):
+    """
+    test pages are returned until they expire
+    """
+    search_cache = SearchCache(tmp_path, ttl=60)
+
+    assert await search_cache.get('0 https://www.google.com/search?q=a') is None
+
+    await search_cache.put('0 https://www.google.com/search?q=a', '<html>a</html>')
+
+    assert await search_cache.get('0 https://www.google.com/search?q=a') == '<html>a</html>'
+    assert await search_cache.get('2 https://www.google.com/search?q=a') is None
+    assert (search_cache.hits, search_cache.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_expired_pages_are_removed(tmp_path):
+    """
+    test pages older than the ttl are treated as missing
+    """
+    search_cache = SearchCache(tmp_path, ttl=60)
+    await search_cache.put('a', 'page')
+
+    cache_file_path = search_cache.get_cache_file_path('a')
+    os.utime(cache_file_path, (time.time() - 120, time.time() - 120))
+
+    assert await search_cache.get('a') is None
+    assert not cache_file_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_pages_are_evicted(tmp_path):
+    """
+    test the cache stays within max_bytes by dropping the least recently used page
+    """
+    search_cache = SearchCache(tmp_path, max_bytes=250)
+
+    await search_cache.put('a', 'a' * 100)
+    await search_cache.put('b', 'b' * 100)
+    os.utime(search_cache.get_cache_file_path('a'), (time.time() - 10, time.time()))
+    os.utime(search_cache.get_cache_file_path('b'), (time.time() - 20, time.time()))
+    await search_cache.get('b')
+    await search_cache.put('c', 'c' * 100)
+
+    assert await search_cache.get('a') is None
+    assert await search_cache.get('b') == 'b' * 100
+    assert await search_cache.get('c') == 'c' * 100
+
+
+@pytest.mark.asyncio
+async def test_cache_directory_is_only_scanned_when_over_budget(tmp_path, monkeypatch):
+    """
+    test puts keep a running size and only scan the directory on the first put and once over max_bytes
+    """
+    search_cache = SearchCache(tmp_path, max_bytes=450)
+    scans = []
+    evict = search_cache.evict
+
+    async def counted_evict():
+        scans.append(search_cache.cache_size)
+        await evict()
+
+    monkeypatch.setattr(search_cache, 'evict', counted_evict)
+
+    for key in 'abcd':
+        await search_cache.put(key, key * 100)
+    await search_cache.put('a', 'a' * 50)
+    await search_cache.put('e', 'e' * 150)
+
+    assert scans == [None, 500]
+    assert search_cache.cache_size == sum(path.stat().st_size for path in tmp_path.glob('*.html')) <= 450
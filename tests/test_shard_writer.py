@@ -0,0 +1,102 @@
+#Builtin imports:
+import json
+import os
+import sys
+import tarfile
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shard_writer import ShardWriter
+
+
+@pytest.mark.asyncio
+async def test_samples_are_split_into_indexed_shards(tmp_path):
+    """
+    test images and metadata go to size capped shards and the index points at their data
+    """
+    shard_writer = ShardWriter(tmp_path, max_shard_bytes=10240)
+
+    for number in range(4):
+        await shard_writer.add(f'cats/image_{number}.jpg', bytes([number]) * 3000,
+                               {'image_url': f'http://a.com/image_{number}.jpg'})
+
+    await shard_writer.close()
+
+    with open(tmp_path.joinpath('images-index.jsonl')) as index_file:
+        index = [json.loads(line) for line in index_file]
+
+    assert sorted(os.listdir(tmp_path)) == ['images-000000.tar', 'images-000001.tar', 'images-index.jsonl']
+    assert [entry['shard'] for entry in index] == ['images-000000.tar'] * 2 + ['images-000001.tar'] * 2
+
+    with tarfile.open(tmp_path.joinpath('images-000001.tar')) as tar:
+        assert tar.getnames() == ['cats/image_2.jpg', 'cats/image_2.json', 'cats/image_3.jpg', 'cats/image_3.json']
+        assert json.load(tar.extractfile('cats/image_3.json')) == {'image_url': 'http://a.com/image_3.jpg'}
+
+    with open(tmp_path.joinpath(index[3]['shard']), 'rb') as shard:
+        shard.seek(index[3]['offset'])
+        assert shard.read(index[3]['size']) == bytes([3]) * 3000
+
+
+@pytest.mark.asyncio
+async def test_new_writer_continues_numbering(tmp_path):
+    """
+    test a later run starts a new shard instead of overwriting earlier ones
+    """
+    for run in range(2):
+        shard_writer = ShardWriter(tmp_path)
+        await shard_writer.add(f'image_{run}.jpg', b'x', {})
+        await shard_writer.close()
+
+    with open(tmp_path.joinpath('images-index.jsonl')) as index_file:
+        index = [json.loads(line) for line in index_file]
+
+    assert [entry['shard'] for entry in index] == ['images-000000.tar', 'images-000001.tar']
+
+
+@pytest.mark.asyncio
+async def test_files_are_copied_into_shards(tmp_path):
+    """
+    test an image added from a file is stored and indexed like one added from memory
+    """
+    image_path = tmp_path.joinpath('image.download')
+    image_path.write_bytes(b'y' * 5000)
+
+    shard_writer = ShardWriter(tmp_path.joinpath('shards'))
+    shard_path, member_name = await shard_writer.add_file('image.jpg', image_path, {'image_url': 'http://a.com/1.jpg'})
+    await shard_writer.close()
+
+    with open(tmp_path.joinpath('shards', 'images-index.jsonl')) as index_file:
+        index = json.loads(index_file.readline())
+
+    with tarfile.open(shard_path) as tar:
+        assert tar.extractfile(member_name).read() == b'y' * 5000
+
+    with open(shard_path, 'rb') as shard:
+        shard.seek(index['offset'])
+        assert shard.read(index['size']) == b'y' * 5000
+
+
+@pytest.mark.asyncio
+async def test_finished_shards_are_complete_before_close(tmp_path):
+    """
+    test finish() leaves a readable shard and index behind and the next image starts a new shard
+    """
+    shard_writer = ShardWriter(tmp_path)
+    await shard_writer.add('image_0.jpg', b'x', {})
+    await shard_writer.finish()
+
+    with tarfile.open(tmp_path.joinpath('images-000000.tar')) as tar:
+        assert tar.getnames() == ['image_0.jpg', 'image_0.json']
+
+    with open(tmp_path.joinpath('images-index.jsonl')) as index_file:
+        assert [json.loads(line)['member'] for line in index_file] == ['image_0.jpg']
+
+    shard_path, _ = await shard_writer.add('image_1.jpg', b'y', {})
+    await shard_writer.close()
+
+    assert shard_path.name == 'images-000001.tar'
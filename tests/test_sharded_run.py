@@ -0,0 +1,40 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import google_images_download_async
+from sharded_run import WorkerError, get_worker_file_name, run_workers
+
+
+def test_worker_file_names():
+    """
+    test each worker writes its own copy of a file next to the original
+    """
+    assert get_worker_file_name('logs/error_log.txt', 1) == os.path.join('logs', 'error_log.worker1.txt')
+
+
+@pytest.mark.asyncio
+async def test_failed_workers_are_raised_after_merging(tmp_path, capsys):
+    """
+    test a run whose workers all fail raises WorkerError and still reports its empty metrics
+    """
+    settings = {'workers': 2, 'output_directory': str(tmp_path), 'manifest': '', 'metadata_index': '',
+                'resume': False, 'metrics_report': 'run_report.json', 'prometheus_file': ''}
+    arguments = [{'url': 'http://127.0.0.1:1/search', 'output_directory': str(tmp_path)} for _ in range(2)]
+
+    # the incomplete settings make every worker fail creating its context
+    with pytest.raises(WorkerError) as error:
+        await run_workers(google_images_download_async.run_worker, {}, arguments, settings)
+
+    await google_images_download_async.write_run_metrics(error.value.metrics, settings)
+
+    assert sorted(error.value.failures) == [0, 1]
+    assert 'Requests: 0 sent, 0 coalesced' in capsys.readouterr().out
+    assert os.path.exists(tmp_path.joinpath('run_report.json'))
@@ -0,0 +1,70 @@
+#Builtin imports:
+import os
+import sys
+
+#Third party imports:
+import pytest
+import pytest_asyncio
+import asyncio
+
+#Local imports:
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    """
+    test concurrent callers with the same key share one call
+    """
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return f'page {url}'
+
+    single_flight = SingleFlight()
+    results = await asyncio.gather(*[single_flight.run(url, fetch, url) for url in ('a', 'a', 'a', 'b')])
+
+    assert results == ['page a', 'page a', 'page a', 'page b']
+    assert calls == ['a', 'b']
+    assert (single_flight.calls, single_flight.coalesced) == (4, 2)
+    assert single_flight.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_finished_calls_are_not_reused():
+    """
+    test a call made after the first one finished runs again
+    """
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        return url
+
+    single_flight = SingleFlight()
+    await single_flight.run('a', fetch, 'a')
+    await single_flight.run('a', fetch, 'a')
+
+    assert calls == ['a', 'a']
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    """
+    test other callers still get the result when the first caller is cancelled
+    """
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'page'
+
+    single_flight = SingleFlight()
+    first = asyncio.ensure_future(single_flight.run('a', fetch))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(single_flight.run('a', fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 'page'